@@ -10,6 +10,7 @@ import numpy as np
 import pickle
 import json
 import logging
+from datetime import datetime
 from pathlib import Path
 from sklearn.model_selection import train_test_split, cross_val_score
 from sklearn.preprocessing import StandardScaler
@@ -17,6 +18,12 @@ from xgboost import XGBClassifier
 from lightgbm import LGBMClassifier
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import accuracy_score, precision_score, recall_score, roc_auc_score, f1_score, confusion_matrix
+from training_scheduler import (TrainingScheduler, _fit_member, best_iteration, cached_split, member_spec,
+                                time_ordered_validation)
+from dataset_cache import DatasetCache
+from walk_forward_cv import WalkForwardCV
+from hyperparam_search import load_best_params
+from model_store import CANDIDATE, ModelStore
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -40,7 +47,13 @@ class EnhancedModelTrainer:
         self.metrics = {}
         self.model_weights = {}
         self.feature_names = []
+        self.match_dates = None
+        self.train_dates = None
+        self.cv_summary = None
+        self.best_iterations = {}
         self.scaler = StandardScaler()
+        self.dataset_cache = DatasetCache()
+        self._split_paths = None
         
     def load_features(self):
         """Load engineered features"""
@@ -63,6 +76,7 @@ class EnhancedModelTrainer:
         feature_cols = [col for col in feature_cols if df[col].dtype in ['float64', 'int64']]
         
         self.feature_names = feature_cols
+        self.match_dates = pd.to_datetime(df['date'], errors='coerce') if 'date' in df.columns else None
         
         X = df[feature_cols].fillna(0)
         y = df['home_win'] if 'home_win' in df.columns else (df['home_score'] > df['away_score']).astype(int)
@@ -81,6 +95,9 @@ class EnhancedModelTrainer:
             X, y, test_size=test_size, random_state=42, stratify=y if len(np.unique(y)) > 1 else None
         )
         
+        if self.match_dates is not None:
+            self.train_dates = self.match_dates.loc[self.X_train.index].to_numpy()
+        
         # Scale features
         self.X_train = self.scaler.fit_transform(self.X_train)
         self.X_test = self.scaler.transform(self.X_test)
@@ -88,77 +105,126 @@ class EnhancedModelTrainer:
         logger.info(f"✅ Train set: {len(self.X_train)} samples")
         logger.info(f"   Test set: {len(self.X_test)} samples")
     
+    def member_specs(self):
+        """Estimator class + optimized hyperparameters for every ensemble member"""
+        specs = self._default_member_specs()
+        
+        # Overrides from the last hyperparameter search (scripts/hyperparam_search.py)
+        for name, params in load_best_params().items():
+            if name in specs:
+                specs[name]['params'].update(params)
+        return specs
+    
+    def _default_member_specs(self):
+        """Hand-tuned hyperparameters (used when no search results exist)"""
+        return {
+            'xgboost': member_spec(
+                XGBClassifier,
+                n_estimators=200,           # More trees than baseline
+                max_depth=6,                # Slightly deeper trees
+                learning_rate=0.05,         # Lower learning rate for better generalization
+                subsample=0.8,              # Subsample 80% of training data
+                colsample_bytree=0.8,       # Subsample 80% of features
+                min_child_weight=1,
+                gamma=1,                    # Regularization
+                reg_alpha=0.1,              # L1 regularization
+                reg_lambda=1,               # L2 regularization
+                random_state=42,
+                use_label_encoder=False,
+                eval_metric='logloss',
+            ),
+            'lightgbm': member_spec(
+                LGBMClassifier,
+                n_estimators=200,
+                max_depth=7,
+                learning_rate=0.05,
+                num_leaves=31,
+                subsample=0.8,
+                colsample_bytree=0.8,
+                min_child_samples=5,
+                reg_alpha=0.1,
+                reg_lambda=1,
+                random_state=42,
+                verbose=-1,
+            ),
+            'random_forest': member_spec(
+                RandomForestClassifier,
+                n_estimators=200,
+                max_depth=15,
+                min_samples_split=5,
+                min_samples_leaf=2,
+                max_features='sqrt',
+                bootstrap=True,
+                random_state=42,
+            ),
+        }
+    
+    def _early_stopping_split(self):
+        """Training rows split into fitting rows and the most recent rows for early stopping"""
+        fit_idx, valid_idx = time_ordered_validation(len(self.X_train), self.train_dates)
+        y_train = np.asarray(self.y_train)
+        return self.X_train[fit_idx], y_train[fit_idx], self.X_train[valid_idx], y_train[valid_idx]
+    
+    def _train_member(self, name, label):
+        """Train a single member in-process using every core"""
+        logger.info(f"Training {label}...")
+        spec = self.member_specs()[name]
+        X_fit, y_fit, X_valid, y_valid = self._early_stopping_split()
+        if self._split_paths is None:
+            self._split_paths = cached_split(self.dataset_cache, X_fit, y_fit, X_valid, y_valid)
+            self.dataset_cache.report('training datasets')
+        _, model, _ = _fit_member(name, spec, -1, X_fit, y_fit, X_valid, y_valid, split=self._split_paths)
+        self.models[name] = model
+        best = best_iteration(model)
+        if best:
+            self.best_iterations[name] = best
+        logger.info(f"✅ {label} trained" + (f" (best iteration {best})" if best else ''))
+        return model
+    
     def train_xgboost(self):
         """Train optimized XGBoost model"""
-        logger.info("Training XGBoost (optimized hyperparameters)...")
-        
-        model = XGBClassifier(
-            n_estimators=200,           # More trees than baseline
-            max_depth=6,                # Slightly deeper trees
-            learning_rate=0.05,         # Lower learning rate for better generalization
-            subsample=0.8,              # Subsample 80% of training data
-            colsample_bytree=0.8,       # Subsample 80% of features
-            min_child_weight=1,
-            gamma=1,                    # Regularization
-            reg_alpha=0.1,              # L1 regularization
-            reg_lambda=1,               # L2 regularization
-            random_state=42,
-            use_label_encoder=False,
-            eval_metric='logloss',
-            n_jobs=-1
-        )
-        
-        model.fit(self.X_train, self.y_train, verbose=0)
-        self.models['xgboost'] = model
-        logger.info("✅ XGBoost trained")
-        
-        return model
+        return self._train_member('xgboost', 'XGBoost (optimized hyperparameters)')
     
     def train_lightgbm(self):
         """Train optimized LightGBM model"""
-        logger.info("Training LightGBM (optimized hyperparameters)...")
-        
-        model = LGBMClassifier(
-            n_estimators=200,
-            max_depth=7,
-            learning_rate=0.05,
-            num_leaves=31,
-            subsample=0.8,
-            colsample_bytree=0.8,
-            min_child_samples=5,
-            reg_alpha=0.1,
-            reg_lambda=1,
-            random_state=42,
-            verbose=-1,
-            n_jobs=-1
-        )
-        
-        model.fit(self.X_train, self.y_train)
-        self.models['lightgbm'] = model
-        logger.info("✅ LightGBM trained")
-        
-        return model
+        return self._train_member('lightgbm', 'LightGBM (optimized hyperparameters)')
     
     def train_random_forest(self):
         """Train RandomForest as third model"""
-        logger.info("Training RandomForest...")
-        
-        model = RandomForestClassifier(
-            n_estimators=200,
-            max_depth=15,
-            min_samples_split=5,
-            min_samples_leaf=2,
-            max_features='sqrt',
-            bootstrap=True,
-            random_state=42,
-            n_jobs=-1
-        )
-        
-        model.fit(self.X_train, self.y_train)
-        self.models['random_forest'] = model
-        logger.info("✅ RandomForest trained")
-        
-        return model
+        return self._train_member('random_forest', 'RandomForest')
+    
+    def train_all_models(self, parallel=True):
+        """Train every member; in parallel processes with a split core budget by default"""
+        if not parallel:
+            self.train_xgboost()
+            self.train_lightgbm()
+            self.train_random_forest()
+            return self.models
+        
+        logger.info("Training ensemble members in parallel...")
+        start = datetime.now()
+        scheduler = TrainingScheduler(dataset_cache=self.dataset_cache)
+        self.models.update(scheduler.train(self.member_specs(), *self._early_stopping_split()))
+        self.best_iterations.update(scheduler.best_iterations)
+        logger.info(f"✅ {len(self.models)} models trained in {(datetime.now() - start).total_seconds():.1f}s")
+        return self.models
+    
+    def walk_forward_evaluate(self, X, y, n_folds=5, unit='season'):
+        """Time-ordered CV of every member; persists out-of-fold predictions for stacking/calibration"""
+        if self.match_dates is None:
+            logger.warning("⚠️  No date column - skipping walk-forward CV")
+            return None
+        
+        cv = WalkForwardCV(n_folds=n_folds, unit=unit)
+        try:
+            oof, self.cv_summary = cv.run(self.member_specs(), X.to_numpy(), np.asarray(y), self.match_dates)
+        except ValueError as e:
+            logger.warning(f"⚠️  Walk-forward CV skipped: {e}")
+            return None
+        
+        cv.save(oof, self.cv_summary)
+        cv.print_summary(self.cv_summary)
+        return self.cv_summary
     
     def evaluate_model(self, name, model, y_pred, y_pred_proba=None):
         """Evaluate model performance"""
@@ -298,13 +364,18 @@ class EnhancedModelTrainer:
             'models': self.models,
             'weights': self.model_weights,
             'scaler': self.scaler,
-            'feature_names': self.feature_names
+            'feature_names': self.feature_names,
+            'best_iterations': self.best_iterations,
         }
         
         ensemble_path = MODELS_DIR / "ensemble_model_v2.pkl"
         pickle.dump(ensemble_dict, open(ensemble_path, 'wb'))
         logger.info(f"  Saved ensemble to {ensemble_path}")
         
+        # Register as the store candidate (promote with: model_store.py promote candidate production)
+        model_id = ModelStore().put_bundle(ensemble_dict, version='v2', metrics=self.metrics, aliases=[CANDIDATE])
+        logger.info(f"  Registered ensemble as model {model_id} ({CANDIDATE})")
+        
         # Save metrics
         metrics_path = MODELS_DIR / "model_metrics_v2.json"
         with open(metrics_path, 'w') as f:
@@ -358,12 +429,14 @@ class EnhancedModelTrainer:
         logger.info("=" * 70)
         
         X, y, feature_cols = self.load_features()
+        
+        # Realistic (time-ordered) estimate before the random hold-out split
+        self.walk_forward_evaluate(X, y)
+        
         self.split_data(X, y, test_size=0.2)
         
         # Train all models
-        self.train_xgboost()
-        self.train_lightgbm()
-        self.train_random_forest()
+        self.train_all_models()
         
         # Evaluate models
         self.evaluate_all_models()
@@ -3,6 +3,10 @@
 Phase 4: Backtesting
 Validates model on historical 2024 data (out-of-sample)
 Tests if the model actually makes money
+The games and features here are simulated (uniform random): the baseline
+ensemble_model.pkl takes its own short feature layout (see predict_game), not
+the live 48 features, so point-in-time features cannot be rebuilt for it. For the live v5 model on real results and
+as-of features, run: python scripts/05_backtest_v2.py --asof
 """
 
 import pandas as pd
@@ -3,8 +3,21 @@
 Phase 3: Enhanced Backtesting & Validation
 Tests improved model on 2024 data with detailed metrics
 Compares performance to baseline model
+The simulated engines score uniform random features: the v2 model takes the
+30-column training layout, which the live pipeline cannot rebuild for past
+fixtures. --asof instead backtests the live 48-feature v5 model on real
+results, with the features it would have seen at prediction time.
+
+Usage:
+    python scripts/05_backtest_v2.py                          # per-game engine, 100 games
+    python scripts/05_backtest_v2.py --batch --games 200000   # vectorized engine
+    python scripts/05_backtest_v2.py --batch --seeds 20 --backend dask   # 20 simulated seasons as tasks
+    python scripts/05_backtest_v2.py --asof --results data/raw/games_2024-25.csv --lead-minutes 120
 """
 
+import argparse
+import copy
+import time
 import pandas as pd
 import numpy as np
 import pickle
@@ -17,6 +30,77 @@ from pathlib import Path
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from backtest_cache import BacktestCache, model_key, params_key
+from data_versioning import code_version
+from execution import BACKENDS, get_backend
+
+TEAMS = [
+    'Manchester City', 'Liverpool', 'Arsenal', 'Chelsea', 'Tottenham',
+    'Newcastle', 'Manchester United', 'Aston Villa', 'Brighton', 'Wolverhampton',
+    'Fulham', 'Bournemouth', 'Brentford', 'Everton', 'West Ham',
+    'Crystal Palace', 'Nottingham Forest', 'Leicester', 'Southampton', 'Ipswich'
+]
+BIG_FAVOURITES = ['Manchester City', 'Liverpool', 'Arsenal', 'Chelsea']   # vegas line -150
+FAVOURITES = ['Newcastle', 'Tottenham', 'Manchester United']             # vegas line -120
+GAMES_PER_WEEK = 5
+BET_SIZE = 150  # flat stake, settled at even money (as in 05_backtest)
+
+# (low, high) of the uniform simulated feature columns
+FEATURE_RANGES = np.array([
+    (1.5, 2.5),    # Home form
+    (1.0, 2.0),
+    (1.0, 2.5),
+    (0.7, 2.0),
+    (1.2, 2.3),
+    (1.0, 2.0),
+    (0.8, 1.8),
+    (0.7, 1.7),
+    (0.5, 1.5),    # Momentum
+    (0.4, 1.3),
+    (0.8, 1.8),    # Defensive
+    (0.6, 1.6),
+    (-0.5, 1.0),   # Goal diff
+    (-1.0, 0.5),
+    (1.0, 2.5),    # Home/Away splits
+    (0.7, 2.0),
+    (0.3, 0.7),    # H2H
+    (1, 7),        # Rest days
+    (1, 7),
+    (50, 250),     # Travel distance
+    (0, 1),        # Travel fatigue
+    (-0.1, 0.2),
+    (0, 1),        # Weather
+    (-0.1, 0.2),   # Ref bias
+    (0, 0.5),      # Motivation
+    (0, 0.5),
+    (0, 3),        # Injuries
+    (0, 3),
+    (0.7, 1.0),
+    (0.7, 1.0),
+])
+
+
+def vegas_line_for(home):
+    """Moneyline for the home side by team tier"""
+    if home in BIG_FAVOURITES:
+        return -150
+    if home in FAVOURITES:
+        return -120
+    return 100
+
+
+def vegas_probability(vegas_line):
+    """Implied home-win probability of a moneyline (scalar or array)"""
+    return 1 - (np.abs(vegas_line) / (np.abs(vegas_line) + 100))
+
+
+def member_weights(model_dict):
+    """{member name: weight} looked up by name and normalized to sum to 1 (equal when none stored)"""
+    models = model_dict['models']
+    weights = model_dict.get('weights') or {name: 1.0 for name in models}
+    total = sum(weights.get(name, 0.0) for name in models)
+    return {name: weights.get(name, 0.0) / total for name in models}
+
 
 class EnhancedBacktestEngine:
     def __init__(self, model_path='models/ensemble_model_v2.pkl', baseline_model_path='models/ensemble_model.pkl'):
@@ -30,6 +114,7 @@ class EnhancedBacktestEngine:
         self.results = []
         self.v2_results = []
         self.baseline_results = []
+        self.pnl = {}
         
     def _load_model(self, model_path, label):
         """Load model with error handling"""
@@ -56,22 +141,17 @@ class EnhancedBacktestEngine:
     
     def generate_backtest_games(self, num_games=100):
         """Generate realistic 2024 game scenarios for backtesting"""
-        teams = [
-            'Manchester City', 'Liverpool', 'Arsenal', 'Chelsea', 'Tottenham',
-            'Newcastle', 'Manchester United', 'Aston Villa', 'Brighton', 'Wolverhampton',
-            'Fulham', 'Bournemouth', 'Brentford', 'Everton', 'West Ham',
-            'Crystal Palace', 'Nottingham Forest', 'Leicester', 'Southampton', 'Ipswich'
-        ]
+        teams = TEAMS
         
         games = []
         np.random.seed(42)
         
         dates = pd.date_range(start='2024-01-01', end='2024-12-31', freq='W')
         
-        for date in dates[:num_games // 5]:
+        for date in dates[:num_games // GAMES_PER_WEEK]:
             available = teams.copy()
             
-            for _ in range(5):
+            for _ in range(GAMES_PER_WEEK):
                 if len(available) < 2:
                     available = teams.copy()
                 
@@ -98,12 +178,7 @@ class EnhancedBacktestEngine:
                     result = 'Away Win'
                 
                 # Vegas line
-                if home in ['Manchester City', 'Liverpool', 'Arsenal', 'Chelsea']:
-                    vegas_line = -150
-                elif home in ['Newcastle', 'Tottenham', 'Manchester United']:
-                    vegas_line = -120
-                else:
-                    vegas_line = 100
+                vegas_line = vegas_line_for(home)
                 
                 games.append({
                     'date': date,
@@ -123,39 +198,8 @@ class EnhancedBacktestEngine:
         if model_dict is None:
             return {'prediction': None, 'confidence': 0.5, 'pass_filter': False}
         
-        # Generate realistic features
-        features = np.array([
-            np.random.uniform(1.5, 2.5),  # Home form
-            np.random.uniform(1.0, 2.0),
-            np.random.uniform(1.0, 2.5),
-            np.random.uniform(0.7, 2.0),
-            np.random.uniform(1.2, 2.3),
-            np.random.uniform(1.0, 2.0),
-            np.random.uniform(0.8, 1.8),
-            np.random.uniform(0.7, 1.7),
-            np.random.uniform(0.5, 1.5),  # Momentum
-            np.random.uniform(0.4, 1.3),
-            np.random.uniform(0.8, 1.8),  # Defensive
-            np.random.uniform(0.6, 1.6),
-            np.random.uniform(-0.5, 1.0),  # Goal diff
-            np.random.uniform(-1.0, 0.5),
-            np.random.uniform(1.0, 2.5),  # Home/Away splits
-            np.random.uniform(0.7, 2.0),
-            np.random.uniform(0.3, 0.7),  # H2H
-            np.random.uniform(1, 7),     # Rest days
-            np.random.uniform(1, 7),
-            np.random.uniform(50, 250),  # Travel distance
-            np.random.uniform(0, 1),     # Travel fatigue
-            np.random.uniform(-0.1, 0.2),
-            np.random.uniform(0, 1),     # Weather
-            np.random.uniform(-0.1, 0.2), # Ref bias
-            np.random.uniform(0, 0.5),   # Motivation
-            np.random.uniform(0, 0.5),
-            np.random.uniform(0, 3),     # Injuries
-            np.random.uniform(0, 3),
-            np.random.uniform(0.7, 1.0),
-            np.random.uniform(0.7, 1.0),
-        ])
+        # Generate realistic features (one uniform draw per FEATURE_RANGES column)
+        features = np.random.uniform(FEATURE_RANGES[:, 0], FEATURE_RANGES[:, 1])
         
         features = features.reshape(1, -1)
         
@@ -166,19 +210,11 @@ class EnhancedBacktestEngine:
             
             if 'models' in model_dict and isinstance(model_dict['models'], dict):
                 # Ensemble prediction
-                predictions = []
-                probas = []
-                
-                for model in model_dict['models'].values():
-                    pred = model.predict(features)[0]
-                    proba = model.predict_proba(features)[0, 1]
-                    predictions.append(pred)
-                    probas.append(proba)
-                
-                weights = model_dict.get('weights', {v: 1/len(model_dict['models']) for v in model_dict['models']})
+                weights = member_weights(model_dict)
                 
                 # Weighted ensemble
-                confidence = np.sum([probas[i] * list(weights.values())[i] for i in range(len(probas))])
+                confidence = sum(weights[name] * model.predict_proba(features)[0, 1]
+                                 for name, model in model_dict['models'].items())
                 prediction_idx = 1 if confidence > 0.5 else 0
             else:
                 # Single model
@@ -190,7 +226,7 @@ class EnhancedBacktestEngine:
             prediction = 'Home Win' if prediction_idx == 1 else 'Away/Draw'
             
             # Vegas probability
-            vegas_prob = 1 - (abs(vegas_line) / (abs(vegas_line) + 100))
+            vegas_prob = vegas_probability(vegas_line)
             our_prob = confidence
             edge = (our_prob - vegas_prob) * 100
             
@@ -365,6 +401,8 @@ class EnhancedBacktestEngine:
                 'baseline': self.baseline_results
             }
         }
+        if self.pnl:
+            report_data['pnl'] = self.pnl
         
         with open(filename, 'w') as f:
             json.dump(report_data, f, indent=2)
@@ -373,16 +411,303 @@ class EnhancedBacktestEngine:
         return filename
 
 
+class BatchBacktestEngine(EnhancedBacktestEngine):
+    """
+    Vectorized backtest: one feature matrix for all games, one scoring call per
+    model member, and filters / correctness / P&L computed with NumPy masks.
+    Produces the same v2/baseline result records and report as the per-game engine.
+    With a BacktestCache, per-game scores are reused per (model, simulated dataset) and
+    filter outcomes per threshold, so only new models / thresholds are computed.
+    """
+    
+    def __init__(self, model_path='models/ensemble_model_v2.pkl', baseline_model_path='models/ensemble_model.pkl',
+                 cache=None):
+        super().__init__(model_path, baseline_model_path)
+        self.cache = cache
+        # Cached scores are only valid for the scoring code that produced them
+        scoring = code_version((Path(__file__).name,))['source_hash']
+        self.model_keys = {
+            'v2': f"{model_key(self.model_v2, model_path)}@{scoring}" if self.model_v2 else None,
+            'baseline': (f"{model_key(self.model_baseline, baseline_model_path)}@{scoring}"
+                         if self.model_baseline else None),
+        }
+    
+    def generate_backtest_arrays(self, num_games=100, seed=42):
+        """
+        Column arrays of simulated games with the same result and score distributions as
+        generate_backtest_games, but not the same games: they come from a seeded Generator,
+        and a team may play more than once in a week
+        """
+        rng = np.random.default_rng(seed)
+        teams = np.array(TEAMS)
+        
+        # Distinct home/away pair per game
+        home_idx = rng.integers(0, len(teams), num_games)
+        away_idx = (home_idx + rng.integers(1, len(teams), num_games)) % len(teams)
+        home = teams[home_idx]
+        
+        # Realistic result distribution: 45% home, 30% draw, 25% away
+        rand = rng.random(num_games)
+        is_home, is_draw = rand < 0.45, (rand >= 0.45) & (rand < 0.75)
+        draw_goals = rng.integers(1, 3, num_games)
+        goals_home = np.select([is_home, is_draw], [rng.integers(1, 4, num_games), draw_goals],
+                               rng.integers(0, 2, num_games))
+        goals_away = np.select([is_home, is_draw], [rng.integers(0, 2, num_games), draw_goals],
+                               rng.integers(1, 4, num_games))
+        
+        actual_result = np.where(goals_home > goals_away, 'Home Win',
+                                 np.where(goals_home == goals_away, 'Draw', 'Away Win'))
+        weeks = pd.date_range(start='2024-01-01', periods=-(-num_games // GAMES_PER_WEEK), freq='W')
+        
+        return {
+            'date': np.repeat(weeks.values, GAMES_PER_WEEK)[:num_games],
+            'home': home,
+            'away': teams[away_idx],
+            'goals_home': goals_home,
+            'goals_away': goals_away,
+            'vegas_line': np.select([np.isin(home, BIG_FAVOURITES), np.isin(home, FAVOURITES)], [-150, -120], 100),
+            'actual_result': actual_result,
+        }
+    
+    def score_batch(self, model_dict, features):
+        """
+        Home-win confidence and pick for every game in one pass per model
+        Returns: (confidence, pick_home) arrays, or None when the model is missing/fails
+        """
+        if model_dict is None:
+            return None
+        
+        try:
+            if 'scaler' in model_dict and model_dict['scaler'] is not None:
+                features = model_dict['scaler'].transform(features)
+            
+            if 'models' in model_dict and isinstance(model_dict['models'], dict):
+                weights = member_weights(model_dict)
+                confidence = np.zeros(len(features))
+                for name, model in model_dict['models'].items():
+                    confidence += weights[name] * model.predict_proba(features)[:, 1]
+                pick_home = confidence > 0.5
+            else:
+                model = model_dict.get('model', list(model_dict.values())[0])
+                confidence = model.predict_proba(features)[:, 1]
+                pick_home = model.predict(features) == 1
+            return confidence, pick_home
+        
+        except Exception as e:
+            print(f"Error in batch prediction: {e}")
+            return None
+    
+    def backtest(self, num_games=100, seed=42):
+        """Run the vectorized backtest"""
+        print(f"\n🔄 Batch backtesting {num_games:,} simulated games...")
+        print("=" * 80)
+        start = time.perf_counter()
+        
+        games = self.generate_backtest_arrays(num_games, seed)
+        self.games_tested = num_games
+        # The simulated games are fully determined by these parameters
+        dataset_key = params_key({'games': 'simulated_v2', 'num_games': num_games, 'seed': seed,
+                                  'features': FEATURE_RANGES.tolist()})
+        
+        # One feature matrix, shared by both models
+        rng = np.random.default_rng(seed + 1)
+        features = rng.uniform(FEATURE_RANGES[:, 0], FEATURE_RANGES[:, 1], size=(num_games, len(FEATURE_RANGES)))
+        
+        for key, model_dict, results in (('v2', self.model_v2, self.v2_results),
+                                         ('baseline', self.model_baseline, self.baseline_results)):
+            if model_dict is None:
+                continue
+            
+            def score(model_dict=model_dict):
+                scored = self.score_batch(model_dict, features)
+                if scored is None:
+                    return None
+                return pd.DataFrame({'confidence': scored[0], 'pick_home': scored[1]})
+            
+            if self.cache is not None:
+                scores = self.cache.predictions(self.model_keys[key], dataset_key, score)
+            else:
+                scores = score()
+            if scores is None:
+                continue
+            
+            params = {'threshold': self.confidence_threshold, 'bet_size': BET_SIZE}
+            compute = lambda scores=scores: self.confidence_filter(games, scores, **params)
+            if self.cache is not None:
+                self.pnl[key], bets = self.cache.outcome(self.model_keys[key], dataset_key, 'confidence_filter',
+                                                         params, compute)
+            else:
+                self.pnl[key], bets = compute()
+            results.extend(bets.drop(columns='profit').to_dict('records'))
+        
+        if self.cache is not None:
+            stats = self.cache.report()
+            print(f"♻️  Backtest cache: {stats['hits']} cached / {stats['misses']} computed")
+        print(f"⏱️  Scored {num_games:,} games in {time.perf_counter() - start:.2f}s")
+        return self.generate_report()
+    
+    @staticmethod
+    def confidence_filter(games, scores, threshold, bet_size=BET_SIZE):
+        """
+        Bets passing the confidence filter, with correctness and flat-stake P&L (NumPy masks)
+        Returns: (summary dict, per-bet DataFrame)
+        """
+        confidence = scores['confidence'].to_numpy()
+        pick_home = scores['pick_home'].to_numpy()
+        actual_home = games['actual_result'] == 'Home Win'
+        
+        passed = confidence >= threshold
+        correct = np.where(pick_home, actual_home, ~actual_home)
+        profit = np.where(correct, bet_size, -bet_size)
+        edge = (confidence - vegas_probability(games['vegas_line'])) * 100
+        
+        idx = np.flatnonzero(passed)
+        bets = pd.DataFrame({
+            'game_id': idx,
+            'game': np.char.add(np.char.add(games['home'][idx], ' vs '), games['away'][idx]),
+            'prediction': np.where(pick_home[idx], 'Home Win', 'Away/Draw'),
+            'actual': games['actual_result'][idx],
+            'confidence': np.round(confidence[idx] * 100, 1),
+            'correct': correct[idx],
+            'profit': profit[idx],
+        })
+        
+        total_pl = float(profit[passed].sum())
+        summary = {
+            'bets': len(idx),
+            'total_pl': total_pl,
+            'roi': total_pl / (len(idx) * bet_size) * 100 if len(idx) else 0.0,
+            'avg_edge': float(edge[passed].mean()) if len(idx) else 0.0,
+        }
+        return summary, bets
+
+
+def asof_backtest(games_path, model_path='models/ensemble_model_v5_proper.pkl', threshold=0.65,
+                  lead_minutes=0, odds=None, bet_size=BET_SIZE):
+    """
+    Backtest the live 48-feature model on played fixtures, each scored on its
+    point-in-time features (asof_features.py) instead of random ones. Flat stakes
+    settle at the best price recorded before the prediction time, else at even money.
+    Returns: summary dict
+    """
+    from asof_features import AsOfFeatureEngine
+    from prediction_pipeline import LiveFeatureEngineer, PredictionGenerator
+    
+    engine = AsOfFeatureEngine(pd.read_csv(games_path), odds=odds)
+    X, frame = engine.build(lead_minutes=lead_minutes)
+    played = frame[['home_score', 'away_score']].notna().all(axis=1).to_numpy()
+    X, frame = X[played], frame[played].reset_index(drop=True)
+    
+    # Features come from the as-of engine, so the live engineer never fetches anything
+    generator = PredictionGenerator(Path(model_path), feature_engineer=LiveFeatureEngineer.from_data({}, []))
+    generator.explainer = None
+    predictions = generator.predict_features(X, list(zip(frame['home_team'], frame['away_team'])))
+    
+    home_score, away_score = frame['home_score'].to_numpy(), frame['away_score'].to_numpy()
+    actual = np.where(home_score > away_score, 'Home Win', np.where(home_score == away_score, 'Draw', 'Away Win'))
+    pick = np.array([p['prediction'] for p in predictions])
+    confidence = np.array([p['confidence'] for p in predictions])
+    side = np.select([pick == 'Home Win', pick == 'Draw'], [0, 1], 2)
+    price = frame[['odds_home', 'odds_draw', 'odds_away']].to_numpy()[np.arange(len(frame)), side]
+    priced = ~np.isnan(price)
+    
+    correct = pick == actual
+    passed = confidence >= threshold
+    profit = np.where(correct, bet_size * (np.where(priced, price, 2.0) - 1), -bet_size)[passed]
+    bets = int(passed.sum())
+    return {
+        'model': str(model_path),
+        'fixtures': int(len(frame)),
+        'lead_minutes': lead_minutes,
+        'accuracy': float(correct.mean()) if len(frame) else None,
+        'threshold': threshold,
+        'bets': bets,
+        'priced_bets': int((passed & priced).sum()),
+        'wins': int(correct[passed].sum()),
+        'win_rate': float(correct[passed].mean()) if bets else None,
+        'total_pl': float(profit.sum()),
+        'roi': float(profit.sum() / (bets * bet_size) * 100) if bets else 0.0,
+    }
+
+
+def backtest_scenario(engine, num_games, seed):
+    """Worker: one simulated season of the batch backtest; returns (seed, {model: P&L summary})"""
+    engine.v2_results, engine.baseline_results, engine.pnl = [], [], {}
+    engine.backtest(num_games=num_games, seed=seed)
+    return seed, dict(engine.pnl)
+
+
+def run_scenarios(engine, num_games, seeds, backend=None, address=None):
+    """
+    Simulated seasons (one per seed) as execution-backend tasks; the engine and its
+    models are put() into the object store once. Returns: {seed: {model: P&L summary}}
+    """
+    with get_backend(backend, address=address) as executor:
+        if not executor.shared_filesystem:
+            engine = copy.copy(engine)
+            engine.cache = None  # the cache index lives on this host's disk
+        shared = executor.put(engine)
+        futures = [executor.submit(backtest_scenario, shared, num_games, seed) for seed in seeds]
+        results = dict(executor.result(future) for future in executor.as_completed(futures))
+    return {seed: results[seed] for seed in seeds}
+
+
 def main():
+    parser = argparse.ArgumentParser(description='Enhanced V2 vs baseline backtest')
+    parser.add_argument('--batch', action='store_true', help='use the vectorized batch engine')
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--no-cache', action='store_true', help='batch engine: recompute instead of using the backtest cache')
+    parser.add_argument('--seeds', type=int, default=1, help='batch engine: simulated seasons to run as tasks')
+    parser.add_argument('--backend', choices=BACKENDS, default=None, help='execution backend for --seeds (default: process)')
+    parser.add_argument('--address', default=None, help='Dask scheduler / Ray cluster address')
+    parser.add_argument('--asof', action='store_true', help='v5 model on point-in-time features of real results')
+    parser.add_argument('--results', type=Path, default=Path('data/raw/games_2024-25.csv'),
+                        help='--asof: results CSV (date, home/away team and score)')
+    parser.add_argument('--odds', nargs='+', help='--asof: odds snapshot .jsonl / tracker files or directories')
+    parser.add_argument('--lead-minutes', type=float, default=0, help='--asof: predict this long before kickoff')
+    parser.add_argument('--threshold', type=float, default=0.65, help='--asof: minimum confidence to bet')
+    args = parser.parse_args()
+    
     print("🎯 Phase 3: Enhanced Backtest Validation")
     print("=" * 80)
     
+    if args.asof:
+        from asof_features import load_odds_snapshots
+        summary = asof_backtest(args.results, threshold=args.threshold, lead_minutes=args.lead_minutes,
+                                odds=load_odds_snapshots(args.odds) if args.odds else None)
+        print(f"\n🕰️  As-of backtest: {summary['fixtures']:,} played fixtures, accuracy "
+              + (f"{summary['accuracy']:.1%}" if summary['accuracy'] is not None else 'n/a'))
+        print(f"  {summary['bets']:,} bets at >= {summary['threshold']:.0%} confidence "
+              f"({summary['priced_bets']:,} at recorded odds): P&L ${summary['total_pl']:+,.2f} "
+              f"(ROI {summary['roi']:+.1f}%)")
+        os.makedirs('results', exist_ok=True)
+        with open('results/backtest_asof.json', 'w') as f:
+            json.dump({'generated_at': datetime.now().isoformat(), **summary}, f, indent=2)
+        return
+    
     # Initialize backtester
-    backtester = EnhancedBacktestEngine()
+    if args.batch:
+        backtester = BatchBacktestEngine(cache=None if args.no_cache else BacktestCache())
+    else:
+        backtester = EnhancedBacktestEngine()
+    
+    if args.batch and args.seeds > 1:
+        scenarios = run_scenarios(backtester, args.games, range(42, 42 + args.seeds), args.backend, args.address)
+        print(f"\n📊 {args.seeds} simulated seasons of {args.games:,} games")
+        for key in ('v2', 'baseline'):
+            pnl = [s[key] for s in scenarios.values() if key in s]
+            if pnl:
+                total = np.array([p['total_pl'] for p in pnl])
+                roi = np.array([p['roi'] for p in pnl])
+                print(f"  {key:<9} P&L mean ${total.mean():+,.2f} (min ${total.min():+,.2f}, max ${total.max():+,.2f}), "
+                      f"ROI mean {roi.mean():+.1f}%")
+        return
     
     # Run backtest
-    report = backtester.backtest(num_games=100)
+    report = backtester.backtest(num_games=args.games)
     print(report)
+    for key, pnl in backtester.pnl.items():
+        print(f"  {key:<9} P&L: ${pnl['total_pl']:+,.2f} over {pnl['bets']:,} bets (ROI {pnl['roi']:+.1f}%)")
     
     # Save results
     backtester.save_results()
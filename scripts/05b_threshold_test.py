@@ -1,8 +1,15 @@
 #!/usr/bin/env python3
 """
 Test different confidence thresholds to find optimal
+Games are scored once; every threshold (or confidence x edge grid cell) is then
+evaluated from cumulative sums over the scored bets, so large grids are instant.
+
+Usage:
+    python scripts/05b_threshold_test.py                # the six standard thresholds
+    python scripts/05b_threshold_test.py --grid         # 40 x 25 confidence x edge sweep
 """
 
+import argparse
 import pandas as pd
 import numpy as np
 import pickle
@@ -18,67 +25,123 @@ backtest_module = importlib.util.module_from_spec(spec)
 spec.loader.exec_module(backtest_module)
 BacktestEngine = backtest_module.BacktestEngine
 
-def test_all_thresholds():
-    """Test multiple confidence thresholds"""
+BET_SIZE = 150          # flat stake, even-money settlement (as in 05_backtest)
+MIN_BETS = 20           # grid cells with fewer bets are not eligible as optimal
+REGION_TOLERANCE = 2.0  # ROI points below the best that still count as the optimal region
+
+
+def score_games(model_path='models/ensemble_model.pkl', num_games=100):
+    """
+    Single inference pass over the backtest games
+    Returns: DataFrame with confidence, edge and correct per game
+    """
+    backtester = BacktestEngine(model_path)
+    games = backtester.generate_backtest_games()
+    if num_games > len(games):
+        raise ValueError(f"Asked for {num_games} games but the backtest engine only generates {len(games)}")
+    games = games[:num_games]
     
-    print("🔍 Testing Different Confidence Thresholds")
-    print("=" * 70)
+    rows = []
+    for game in games:
+        pred_result = backtester.predict_game(game['home'], game['away'], game['vegas_line'])
+        if pred_result['prediction'] == 'Home Win':
+            is_correct = game['result'] == 'Home Win'
+        else:
+            is_correct = game['result'] != 'Home Win'
+        rows.append({'confidence': pred_result['confidence'], 'edge': pred_result['edge'], 'correct': is_correct})
     
-    thresholds = [0.50, 0.55, 0.60, 0.65, 0.70, 0.75]
+    return pd.DataFrame(rows)
+
+
+class ThresholdSweep:
+    """Bets / win rate / P&L / ROI for any confidence x edge threshold grid from one scored set"""
+    
+    def __init__(self, confidence, edge, correct, bet_size=BET_SIZE):
+        self.confidence = np.asarray(confidence, dtype=float)
+        self.edge = np.asarray(edge, dtype=float)
+        self.correct = np.asarray(correct, dtype=bool)
+        self.bet_size = bet_size
     
-    results_summary = []
+    @staticmethod
+    def _bins(values, thresholds):
+        """Index of the highest threshold each value clears (-1 = clears none)"""
+        return np.searchsorted(thresholds, values, side='right') - 1
     
-    for threshold in thresholds:
-        # Create backtester with this threshold
-        backtester = BacktestEngine('models/ensemble_model.pkl')
-        backtester.confidence_threshold = threshold
+    def sweep(self, confidence_thresholds, edge_thresholds=None):
+        """
+        Evaluate every (confidence >= c, edge >= e) cell
+        Bets are histogrammed into threshold bins once; reverse cumulative sums over
+        both axes then give the count for every cell: O(bets + grid)
+        Returns: tidy DataFrame, one row per cell
+        """
+        conf_t = np.sort(np.asarray(confidence_thresholds, dtype=float))
+        edge_t = np.sort(np.asarray(edge_thresholds if edge_thresholds is not None else [-np.inf], dtype=float))
         
-        # Generate games
-        games = backtester.generate_backtest_games()[:100]
-        backtester.games_tested = len(games)
+        conf_bin = self._bins(self.confidence, conf_t)
+        edge_bin = self._bins(self.edge, edge_t)
+        eligible = (conf_bin >= 0) & (edge_bin >= 0)
+        flat = conf_bin[eligible] * len(edge_t) + edge_bin[eligible]
+        size = len(conf_t) * len(edge_t)
         
-        # Run backtest
-        for game in games:
-            pred_result = backtester.predict_game(game['home'], game['away'], game['vegas_line'])
-            
-            if not pred_result['pass_filter']:
-                continue
-            
-            backtester.bets_placed += 1
-            
-            actual_result = game['result']
-            is_correct = False
-            if pred_result['prediction'] == 'Home Win' and actual_result == 'Home Win':
-                is_correct = True
-            elif pred_result['prediction'] == 'Away/Draw' and actual_result != 'Home Win':
-                is_correct = True
-            
-            bet_size = 150
-            if is_correct:
-                profit = bet_size
-                backtester.wins += 1
-            else:
-                profit = -bet_size
-                backtester.losses += 1
-            
-            backtester.total_pl += profit
+        def cells(weights=None):
+            hist = np.bincount(flat, weights=weights, minlength=size).reshape(len(conf_t), len(edge_t))
+            return hist[::-1, ::-1].cumsum(axis=0).cumsum(axis=1)[::-1, ::-1]
         
-        # Calculate metrics
-        win_rate = (backtester.wins / backtester.bets_placed * 100) if backtester.bets_placed > 0 else 0
-        roi = (backtester.total_pl / (backtester.bets_placed * 150)) * 100 if backtester.bets_placed > 0 else 0
+        bets = cells()
+        wins = cells(self.correct[eligible].astype(float))
+        losses = bets - wins
+        total_pl = (wins - losses) * self.bet_size
+        with np.errstate(invalid='ignore', divide='ignore'):
+            win_rate = np.where(bets > 0, wins / bets * 100, 0.0)
+            roi = np.where(bets > 0, total_pl / (bets * self.bet_size) * 100, 0.0)
         
-        results_summary.append({
-            'threshold': threshold,
-            'bets': backtester.bets_placed,
-            'wins': backtester.wins,
-            'losses': backtester.losses,
-            'win_rate': win_rate,
-            'total_pl': backtester.total_pl,
-            'roi': roi
+        conf_grid, edge_grid = np.meshgrid(conf_t, edge_t, indexing='ij')
+        return pd.DataFrame({
+            'threshold': conf_grid.ravel(),
+            'min_edge': edge_grid.ravel(),
+            'bets': bets.ravel().astype(int),
+            'wins': wins.ravel().astype(int),
+            'losses': losses.ravel().astype(int),
+            'win_rate': win_rate.ravel(),
+            'total_pl': total_pl.ravel(),
+            'roi': roi.ravel(),
         })
-        
-        print(f"\nThreshold: {threshold*100:.0f}%")
-        print(f"  Bets: {backtester.bets_placed} | Win Rate: {win_rate:.1f}% | P&L: ${backtester.total_pl:+.0f} | ROI: {roi:+.1f}%")
+    
+    @staticmethod
+    def optimal_region(table, min_bets=MIN_BETS, tolerance=REGION_TOLERANCE):
+        """
+        Best cell by ROI (with at least min_bets) and the threshold box of cells within
+        `tolerance` ROI points of it
+        """
+        eligible = table[table['bets'] >= min_bets]
+        if eligible.empty:
+            return None
+        best = eligible.loc[eligible['roi'].idxmax()]
+        region = eligible[eligible['roi'] >= best['roi'] - tolerance]
+        return {
+            'best': best.to_dict(),
+            'cells': int(len(region)),
+            'threshold_range': (float(region['threshold'].min()), float(region['threshold'].max())),
+            'edge_range': (float(region['min_edge'].min()), float(region['min_edge'].max())),
+        }
+
+
+def test_all_thresholds():
+    """Test multiple confidence thresholds"""
+    
+    print("🔍 Testing Different Confidence Thresholds")
+    print("=" * 70)
+    
+    thresholds = [0.50, 0.55, 0.60, 0.65, 0.70, 0.75]
+    
+    # One scoring pass; every threshold is then a cumulative-sum lookup
+    scored = score_games()
+    table = ThresholdSweep(scored['confidence'], scored['edge'], scored['correct']).sweep(thresholds)
+    results_summary = table.drop(columns='min_edge').to_dict('records')
+    
+    for result in results_summary:
+        print(f"\nThreshold: {result['threshold']*100:.0f}%")
+        print(f"  Bets: {result['bets']} | Win Rate: {result['win_rate']:.1f}% | P&L: ${result['total_pl']:+.0f} | ROI: {result['roi']:+.1f}%")
     
     # Find best threshold
     print("\n" + "=" * 70)
@@ -105,5 +168,42 @@ def test_all_thresholds():
     
     return results_summary
 
+
+def sweep_grid(n_confidence=40, n_edge=25, num_games=100):
+    """Full confidence x edge sweep (n_confidence * n_edge cells) from a single scoring pass"""
+    scored = score_games(num_games=num_games)
+    sweeper = ThresholdSweep(scored['confidence'], scored['edge'], scored['correct'])
+    table = sweeper.sweep(np.linspace(0.50, 0.90, n_confidence),
+                          np.linspace(scored['edge'].min(), scored['edge'].max(), n_edge))
+    
+    print(f"\n🔍 Confidence x Edge sweep: {len(table)} cells over {len(scored)} scored games")
+    print("=" * 70)
+    print(table.sort_values('roi', ascending=False).head(20).to_string(index=False, float_format='%.2f'))
+    
+    region = sweeper.optimal_region(table, min_bets=min(MIN_BETS, max(1, len(scored) // 10)))
+    print("\n" + "=" * 70)
+    if region is None:
+        print("❌ No cell has enough bets to pick an optimal region")
+    else:
+        best = region['best']
+        print(f"🏆 BEST: confidence ≥ {best['threshold']*100:.1f}%, edge ≥ {best['min_edge']:.1f} - "
+              f"{best['bets']:.0f} bets, {best['win_rate']:.1f}% win rate, ROI {best['roi']:+.1f}%")
+        print(f"📐 Optimal region ({region['cells']} cells within {REGION_TOLERANCE} ROI pts): "
+              f"confidence {region['threshold_range'][0]*100:.1f}-{region['threshold_range'][1]*100:.1f}%, "
+              f"edge {region['edge_range'][0]:.1f} to {region['edge_range'][1]:.1f}")
+    return table, region
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Confidence / edge threshold sweep')
+    parser.add_argument('--grid', action='store_true', help='2-D confidence x edge sweep')
+    parser.add_argument('--games', type=int, default=100)
+    args = parser.parse_args()
+    
+    if args.grid:
+        return sweep_grid(num_games=args.games)
+    return test_all_thresholds()
+
+
 if __name__ == '__main__':
-    results = test_all_thresholds()
+    results = main()
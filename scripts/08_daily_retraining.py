@@ -3,8 +3,18 @@
 """
 Daily Model Retraining Pipeline
 Automatically retrains V5 Proper with latest data
+
+Daily runs warm-start the existing ensemble on newly settled matches
+(extra boosting rounds / extra forest trees); a full rebuild from scratch
+happens once the last full training is FULL_REBUILD_DAYS old.
+
+Usage:
+    python scripts/08_daily_retraining.py            # auto: incremental or full
+    python scripts/08_daily_retraining.py --full     # force a full rebuild
+    python scripts/08_daily_retraining.py --compare  # incremental vs full accuracy
 """
 
+import copy
 import pickle
 import pandas as pd
 import numpy as np
@@ -13,15 +23,32 @@ from datetime import datetime, timedelta
 from pathlib import Path
 from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import train_test_split
+from sklearn.metrics import accuracy_score, log_loss
 from xgboost import XGBClassifier
+import lightgbm as lgb
 from lightgbm import LGBMClassifier
 from sklearn.ensemble import RandomForestClassifier
 from catboost import CatBoostClassifier
+import argparse
 import logging
+import time
+
+from training_scheduler import TrainingScheduler, member_spec, time_ordered_validation
+from dataset_cache import DatasetCache
+from data_versioning import code_version, dataset_version, diff_partitions, is_unchanged, partition_labels
+from drift_monitor import DriftMonitor
+from model_store import CANDIDATE, ModelStore, production_features
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+NON_FEATURE_COLS = ['game_id', 'date', 'home_team', 'away_team', 'home_score', 'away_score', 'home_win']
+
+FULL_REBUILD_DAYS = 7         # rebuild from scratch at least this often to bound drift
+INCREMENTAL_ROUNDS = 20       # boosting rounds added per incremental update
+INCREMENTAL_RF_TREES = 10     # forest trees added per incremental update
+MIN_NEW_ROWS = 10             # wait for at least this many settled matches
+
 class DailyRetrainingPipeline:
     """Handles automatic daily model retraining"""
     
@@ -30,14 +57,33 @@ class DailyRetrainingPipeline:
         self.data_dir = Path("data")
         self.log_dir = Path("logs")
         self.log_dir.mkdir(exist_ok=True)
+        self.best_iterations = {}
+        self.dataset_stats = None
         
+    @property
+    def retrained_model_path(self):
+        return self.model_dir / 'ensemble_model_v5_proper_retrained.pkl'
+    
+    @property
+    def retrained_metadata_path(self):
+        return self.model_dir / 'v5_proper_retrained_metadata.json'
+    
     def check_concept_drift(self):
         """
         Check if model has concept drift
-        Drift detected if accuracy drops >2% on recent data
+        Drift detected by the streaming monitor (feature PSI, rolling Brier, ADWIN);
+        a full rebuild is also due once the last full training is FULL_REBUILD_DAYS old
         """
+        drift = DriftMonitor.load().status()
+        if drift['retrain']:
+            logger.warning(f"⚠️  Drift monitor: {'; '.join(drift['reasons'])} - retraining recommended")
+            return True
+        
         try:
-            with open(self.model_dir / 'v5_proper_metadata.json', 'r') as f:
+            metadata_path = self.retrained_metadata_path
+            if not metadata_path.exists():
+                metadata_path = self.model_dir / 'v5_proper_metadata.json'
+            with open(metadata_path, 'r') as f:
                 metadata = json.load(f)
             
             last_trained = metadata.get('trained_date')
@@ -45,13 +91,26 @@ class DailyRetrainingPipeline:
             
             logger.info(f"Last trained: {days_since} days ago")
             
-            if days_since >= 7:
+            if days_since >= FULL_REBUILD_DAYS:
                 logger.warning(f"⚠️  Model is {days_since} days old - retraining recommended")
                 return True
             
             return False
-        except:
-            return False
+        except (OSError, ValueError, TypeError) as e:
+            # Missing/corrupt metadata means we cannot vouch for the model - rebuild
+            logger.warning(f"⚠️  Could not read training metadata ({e}) - treating model as stale")
+            return True
+    
+    def load_previous_metadata(self):
+        """Metadata of the last retrain (None if there is none)"""
+        if not self.retrained_metadata_path.exists():
+            return None
+        try:
+            with open(self.retrained_metadata_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️  Could not read {self.retrained_metadata_path}: {e}")
+            return None
     
     def fetch_latest_data(self):
         """Fetch latest game results and update training data"""
@@ -67,6 +126,51 @@ class DailyRetrainingPipeline:
             logger.error("Could not load data")
             return None
     
+    def prepare_features(self, df):
+        """Split the engineered frame into features and home-win target"""
+        feature_cols = [c for c in df.columns if c not in NON_FEATURE_COLS]
+        X = df[feature_cols].fillna(0)
+        y = df['home_win'].astype(int) if 'home_win' in df.columns else (df['home_score'] > df['away_score']).astype(int)
+        return X, y, feature_cols
+    
+    def load_existing_model(self):
+        """Load the last retrained ensemble (None if missing or unreadable)"""
+        if not self.retrained_model_path.exists():
+            return None
+        try:
+            with open(self.retrained_model_path, 'rb') as f:
+                return pickle.load(f)
+        except Exception as e:
+            logger.warning(f"⚠️  Could not load {self.retrained_model_path}: {e}")
+            return None
+    
+    def _after_last_update(self, df, bundle):
+        """Mask of rows settled after the existing model was last trained/updated"""
+        if 'date' in df.columns and bundle.get('last_match_date'):
+            dates = pd.to_datetime(df['date'], errors='coerce')
+            return (dates > pd.Timestamp(bundle['last_match_date'])).to_numpy()
+        return np.asarray(df.index >= bundle.get('trained_rows', len(df)))
+    
+    def select_new_rows(self, df, bundle, changes=None):
+        """
+        Rows to update the existing model with: every row of new data partitions plus
+        the rows of changed partitions settled after the last update (just the latter
+        test, over all rows, when partition changes are unknown)
+        """
+        after = self._after_last_update(df, bundle)
+        if changes is None:
+            return df[after]
+        labels = partition_labels(df)
+        return df[np.isin(labels, changes['new']) | (np.isin(labels, changes['changed']) & after)]
+    
+    def corrected_partitions(self, df, bundle, changed):
+        """Changed partitions with no rows after the last update, i.e. corrected history"""
+        if not changed:
+            return []
+        labels = partition_labels(df)
+        after = self._after_last_update(df, bundle)
+        return [label for label in changed if not after[labels == label].any()]
+    
     def calculate_model_accuracy(self, model, X_test, y_test):
         """Calculate accuracy on recent games"""
         try:
@@ -75,56 +179,107 @@ class DailyRetrainingPipeline:
         except:
             return 0
     
-    def retrain_models(self, X_train, y_train):
-        """Retrain all 4 models"""
+    def member_specs(self):
+        """Estimator class + hyperparameters for the 4 V5 members"""
+        return {
+            'xgboost': member_spec(XGBClassifier, n_estimators=200, max_depth=7, learning_rate=0.05,
+                                   subsample=0.85, colsample_bytree=0.85, random_state=42, verbosity=0),
+            'lightgbm': member_spec(LGBMClassifier, n_estimators=200, max_depth=7, learning_rate=0.05,
+                                    subsample=0.85, colsample_bytree=0.85, random_state=42, verbosity=-1),
+            'randomforest': member_spec(RandomForestClassifier, n_estimators=150, max_depth=12, random_state=42),
+            'catboost': member_spec(CatBoostClassifier, iterations=200, depth=7, learning_rate=0.05,
+                                    random_state=42, verbose=0),
+        }
+    
+    def retrain_models(self, X_train, y_train, dates=None):
+        """
+        Retrain all 4 models (concurrently, see training_scheduler.py)
+        Boosters early-stop on the most recent training rows; their best
+        iteration counts are left in self.best_iterations. XGBoost / CatBoost
+        train from cached binary datasets (hit/saved stats in self.dataset_stats).
+        """
         logger.info("Retraining models...")
         
         scaler = StandardScaler()
         X_train_scaled = scaler.fit_transform(X_train)
+        y_train = np.asarray(y_train)
+        fit_idx, valid_idx = time_ordered_validation(len(X_train_scaled), dates)
         
-        models = {}
-        
-        try:
-            logger.info("  Training XGBoost...")
-            xgb = XGBClassifier(n_estimators=200, max_depth=7, learning_rate=0.05, 
-                               subsample=0.85, colsample_bytree=0.85, random_state=42, verbosity=0)
-            xgb.fit(X_train_scaled, y_train)
-            models['xgboost'] = xgb
-        except Exception as e:
-            logger.error(f"XGBoost failed: {e}")
+        # Members that fail are logged by the scheduler and left out of the ensemble
+        scheduler = TrainingScheduler(dataset_cache=DatasetCache())
+        models = scheduler.train(self.member_specs(), X_train_scaled[fit_idx], y_train[fit_idx],
+                                 X_train_scaled[valid_idx], y_train[valid_idx])
+        self.best_iterations = scheduler.best_iterations
+        self.dataset_stats = scheduler.dataset_stats
         
-        try:
-            logger.info("  Training LightGBM...")
-            lgb = LGBMClassifier(n_estimators=200, max_depth=7, learning_rate=0.05,
-                                subsample=0.85, colsample_bytree=0.85, random_state=42, verbosity=-1)
-            lgb.fit(X_train_scaled, y_train)
-            models['lightgbm'] = lgb
-        except Exception as e:
-            logger.error(f"LightGBM failed: {e}")
+        return models, scaler
+    
+    def retrain_incremental(self, models, scaler, X_new, y_new, best_iterations=None):
+        """
+        Warm-start every member on newly settled matches only.
+        Boosters continue from their existing trees (xgb_model= / init_model=),
+        cut back to their early-stopping best iteration first so the trees fitted
+        past it are not kept; RandomForest grows INCREMENTAL_RF_TREES extra trees
+        via warm_start.
+        The scaler is kept as-is so the existing trees see the same inputs.
+        A member that fails keeps its previous version.
+        """
+        logger.info(f"Incrementally updating models on {len(X_new)} new matches...")
+        X_new_scaled = scaler.transform(X_new)
+        best_iterations = best_iterations or {}
+        updated = dict(models)
         
-        try:
-            logger.info("  Training RandomForest...")
-            rf = RandomForestClassifier(n_estimators=150, max_depth=12, random_state=42, n_jobs=-1)
-            rf.fit(X_train_scaled, y_train)
-            models['randomforest'] = rf
-        except Exception as e:
-            logger.error(f"RandomForest failed: {e}")
+        for name, model in models.items():
+            model_type = type(model).__name__
+            try:
+                if model_type == 'XGBClassifier':
+                    best = best_iterations.get(name)
+                    base = model.get_booster()[:best] if best else model.get_booster()
+                    booster = XGBClassifier(**model.get_params())
+                    # No validation set here: early stopping (set at full training) must be off
+                    booster.set_params(n_estimators=INCREMENTAL_ROUNDS, early_stopping_rounds=None)
+                    booster.fit(X_new_scaled, y_new, xgb_model=base)
+                    updated[name] = booster
+                elif model_type == 'LGBMClassifier':
+                    best = best_iterations.get(name)
+                    base = model.booster_
+                    if best:
+                        base = lgb.Booster(model_str=base.model_to_string(num_iteration=best))
+                    booster = LGBMClassifier(**model.get_params())
+                    booster.set_params(n_estimators=INCREMENTAL_ROUNDS)
+                    booster.fit(X_new_scaled, y_new, init_model=base)
+                    updated[name] = booster
+                elif model_type == 'CatBoostClassifier':
+                    booster = CatBoostClassifier(**model.get_params())
+                    booster.set_params(iterations=INCREMENTAL_ROUNDS)
+                    booster.fit(X_new_scaled, y_new, init_model=model)
+                    updated[name] = booster
+                elif model_type == 'RandomForestClassifier':
+                    # Grow a copy: the previous bundle keeps its forest untouched if fitting fails
+                    forest = copy.deepcopy(model)
+                    forest.set_params(warm_start=True, n_estimators=model.n_estimators + INCREMENTAL_RF_TREES)
+                    forest.fit(X_new_scaled, y_new)
+                    updated[name] = forest
+                else:
+                    logger.warning(f"  {name}: no incremental path for {model_type}, keeping previous model")
+                    continue
+                logger.info(f"  ✅ {name} updated")
+            except Exception as e:
+                logger.error(f"  {name} incremental update failed, keeping previous model: {e}")
         
-        try:
-            logger.info("  Training CatBoost...")
-            cat = CatBoostClassifier(iterations=200, depth=7, learning_rate=0.05, 
-                                    random_state=42, verbose=0)
-            cat.fit(X_train_scaled, y_train)
-            models['catboost'] = cat
-        except Exception as e:
-            logger.error(f"CatBoost failed: {e}")
-        
-        return models, scaler
+        return updated
     
-    def save_retrained_model(self, models, scaler, features):
+    def save_retrained_model(self, models, scaler, features, df=None, previous=None, mode='full', versions=None):
         """Save retrained model with metadata"""
         logger.info("Saving retrained model...")
         
+        now = datetime.now().isoformat()
+        previous = previous or {}
+        last_match_date = None
+        if df is not None and 'date' in df.columns:
+            latest = pd.to_datetime(df['date'], errors='coerce').max()
+            last_match_date = latest.isoformat() if pd.notna(latest) else None
+        
         # Calculate new accuracies (would need test data)
         ensemble = {
             'models': models,
@@ -132,60 +287,223 @@ class DailyRetrainingPipeline:
             'weights': {k: 0.25 for k in models.keys()},  # Equal weights
             'features': features,
             'version': 'V5_Proper_Retrained',
-            'trained_date': datetime.now().isoformat(),
-            'retraining_count': 1,  # Increment this on each retrain
+            # trained_date = last FULL training; incremental updates only move updated_date
+            'trained_date': now if mode == 'full' else previous.get('trained_date', now),
+            'updated_date': now,
+            'mode': mode,
+            'retraining_count': previous.get('retraining_count', 0) + 1,
+            'trained_rows': len(df) if df is not None else previous.get('trained_rows'),
+            'last_match_date': last_match_date or previous.get('last_match_date'),
             'no_betting_odds': True,
         }
+        if mode == 'full':
+            ensemble['best_iterations'] = dict(self.best_iterations)
+            ensemble['dataset_cache'] = self.dataset_stats
+        else:
+            # Continued boosters were cut at their best iteration before the new rounds,
+            # so every tree they now hold counts: drop their early-stopping cut-off
+            ensemble['best_iterations'] = {name: best for name, best in previous.get('best_iterations', {}).items()
+                                           if name not in models or models[name] is previous.get('models', {}).get(name)}
+        if versions:
+            ensemble.update(versions)
         
-        model_path = self.model_dir / 'ensemble_model_v5_proper_retrained.pkl'
+        model_path = self.retrained_model_path
         with open(model_path, 'wb') as f:
             pickle.dump(ensemble, f)
         
-        logger.info(f"✅ Model saved: {model_path}")
+        store = ModelStore()
+        model_id = store.put_bundle(ensemble, aliases=[CANDIDATE])
+        store.prune()   # a model a day: keep the store bounded
+        
+        metadata = {k: v for k, v in ensemble.items() if k not in ('models', 'scaler')}
+        metadata['model_file'] = model_path.name
+        metadata['model_id'] = model_id
+        metadata['members'] = list(models.keys())
+        with open(self.retrained_metadata_path, 'w') as f:
+            json.dump(metadata, f, indent=2)
+        
+        logger.info(f"✅ Model saved: {model_path} ({mode}, store id {model_id} = {CANDIDATE})")
         return model_path
     
-    def run_full_pipeline(self):
-        """Execute full retraining pipeline"""
+    def run_full_pipeline(self, mode='auto'):
+        """
+        Execute retraining pipeline
+        mode='auto': full rebuild when due, otherwise incremental update on new matches
+        mode='full' / 'incremental': force one path
+        """
         logger.info("=" * 80)
         logger.info("DAILY RETRAINING PIPELINE")
         logger.info("=" * 80)
         
-        # Check drift
-        if not self.check_concept_drift():
-            logger.info("✅ No significant drift detected - skipping retraining")
-            return False
-        
         # Fetch data
         df = self.fetch_latest_data()
         if df is None:
             logger.error("❌ Failed to fetch data")
             return False
         
+        # Skip entirely when neither the data nor the training code changed
+        versions = {'dataset_version': dataset_version(df), 'code_version': code_version()}
+        previous_meta = self.load_previous_metadata()
+        if mode == 'auto' and is_unchanged(previous_meta, versions['dataset_version'], versions['code_version']):
+            logger.info(f"✅ Dataset {versions['dataset_version']['dataset_hash'][:12]} and training code "
+                        f"unchanged - skipping retraining")
+            return False
+        
+        changes = diff_partitions((previous_meta or {}).get('dataset_version'), versions['dataset_version'])
+        versions['partition_changes'] = changes
+        for kind in ('new', 'changed', 'removed'):
+            if changes[kind]:
+                logger.info(f"  {kind} partitions: {', '.join(changes[kind])}")
+        
+        # Check drift (model age since last full rebuild)
+        full_due = mode == 'full' or (mode == 'auto' and self.check_concept_drift())
+        
         # Prepare for retraining
-        feature_cols = [c for c in df.columns if c not in 
-                       ['game_id', 'date', 'home_team', 'away_team', 'home_score', 'away_score', 'home_win']]
-        feature_cols = [c for c in feature_cols if c in df.columns]
+        X, y, feature_cols = self.prepare_features(df)
         
-        X = df[feature_cols].fillna(0)
-        y = df['home_win'].astype(int) if 'home_win' in df.columns else (df['home_score'] > df['away_score']).astype(int)
+        existing = None if full_due else self.load_existing_model()
+        if existing is not None and existing.get('features') != feature_cols:
+            logger.warning("⚠️  Feature set changed since last training - full rebuild required")
+            existing = None
+        
+        if existing is None:
+            if mode == 'incremental':
+                logger.error("❌ No compatible model to update incrementally")
+                return False
+            return self._run_full_rebuild(df, X, y, feature_cols, versions)
+        
+        if changes['removed']:
+            logger.warning("⚠️  Partitions removed from the dataset - full rebuild required")
+            return self._run_full_rebuild(df, X, y, feature_cols, versions)
+        
+        touched = changes if previous_meta and 'dataset_version' in previous_meta else None
+        corrected = self.corrected_partitions(df, existing, changes['changed']) if touched else []
+        if corrected:
+            # Already-trained rows changed: appending trees cannot undo what they learned
+            logger.warning(f"⚠️  Historical partitions corrected ({', '.join(corrected)}) - full rebuild required")
+            return self._run_full_rebuild(df, X, y, feature_cols, versions)
+        
+        new_rows = self.select_new_rows(df, existing, touched)
+        if len(new_rows) < MIN_NEW_ROWS:
+            logger.info(f"✅ Only {len(new_rows)} new matches (< {MIN_NEW_ROWS}) - skipping update")
+            return False
+        
+        y_new = y.loc[new_rows.index]
+        if y_new.nunique() < 2:
+            logger.info("✅ New matches contain a single outcome class - waiting for more data")
+            return False
         
+        start = time.perf_counter()
+        models = self.retrain_incremental(existing['models'], existing['scaler'], X.loc[new_rows.index], y_new,
+                                          existing.get('best_iterations'))
+        self.save_retrained_model(models, existing['scaler'], feature_cols, df=df, previous=existing,
+                                  mode='incremental', versions=versions)
+        
+        logger.info("=" * 80)
+        logger.info(f"✅ INCREMENTAL UPDATE COMPLETE in {time.perf_counter() - start:.1f}s")
+        logger.info("=" * 80)
+        return True
+    
+    def _run_full_rebuild(self, df, X, y, feature_cols, versions=None):
+        """Retrain every member from scratch on the full dataset"""
+        start = time.perf_counter()
         X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+        dates = pd.to_datetime(df.loc[X_train.index, 'date'], errors='coerce').to_numpy() if 'date' in df.columns else None
         
         # Retrain
-        models, scaler = self.retrain_models(X_train, y_train)
+        models, scaler = self.retrain_models(X_train, y_train, dates)
         
         if not models:
             logger.error("❌ No models trained")
             return False
         
         # Save
-        self.save_retrained_model(models, scaler, feature_cols)
+        self.save_retrained_model(models, scaler, feature_cols, df=df, previous=self.load_existing_model(),
+                                  mode='full', versions=versions)
+        
+        # Any full retrain answers the drift alarms, or they would force a rebuild every
+        # day. The live monitor sees the production model's inputs, so only a retrain on
+        # that same schema can supply its reference; otherwise live rows rebuild it.
+        monitor = DriftMonitor.load()
+        if list(feature_cols) == production_features():
+            monitor.reset_after_retrain(X_train.to_numpy(), feature_cols)
+        else:
+            monitor.reset_after_retrain()
+            logger.info(f"Retrained on {len(feature_cols)} features, not the live model's schema - "
+                        f"drift reference rebuilt from live data, performance alarms cleared")
+        monitor.save()
         
         logger.info("=" * 80)
-        logger.info("✅ RETRAINING COMPLETE")
+        logger.info(f"✅ RETRAINING COMPLETE in {time.perf_counter() - start:.1f}s")
         logger.info("=" * 80)
         return True
+    
+    def _ensemble_scores(self, models, scaler, X, y):
+        """Equal-weight ensemble accuracy and log-loss"""
+        X_scaled = scaler.transform(X)
+        proba = np.mean([m.predict_proba(X_scaled)[:, 1] for m in models.values()], axis=0)
+        return accuracy_score(y, (proba > 0.5).astype(int)), log_loss(y, proba, labels=[0, 1])
+    
+    def compare_incremental_vs_full(self, new_fraction=0.15, holdout_fraction=0.15):
+        """
+        Chronological comparison: base model + incremental update on the newest
+        matches vs a full retrain on the same rows, both scored on a later holdout
+        """
+        df = self.fetch_latest_data()
+        if df is None:
+            return None
+        if 'date' in df.columns:
+            df = df.assign(_date=pd.to_datetime(df['date'], errors='coerce')).sort_values('_date').drop(columns='_date')
+        X, y, _ = self.prepare_features(df)
+        
+        n = len(df)
+        holdout_start = int(n * (1 - holdout_fraction))
+        new_start = int(holdout_start * (1 - new_fraction))
+        X_base, y_base = X.iloc[:new_start], y.iloc[:new_start]
+        X_new, y_new = X.iloc[new_start:holdout_start], y.iloc[new_start:holdout_start]
+        X_hold, y_hold = X.iloc[holdout_start:], y.iloc[holdout_start:]
+        
+        base_models, base_scaler = self.retrain_models(X_base, y_base)
+        
+        start = time.perf_counter()
+        incremental = self.retrain_incremental(base_models, base_scaler, X_new, y_new, self.best_iterations)
+        incremental_s = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        full_models, full_scaler = self.retrain_models(X.iloc[:holdout_start], y.iloc[:holdout_start])
+        full_s = time.perf_counter() - start
+        
+        inc_acc, inc_loss = self._ensemble_scores(incremental, base_scaler, X_hold, y_hold)
+        full_acc, full_loss = self._ensemble_scores(full_models, full_scaler, X_hold, y_hold)
+        
+        print("\nIncremental vs full retrain (chronological holdout):")
+        print("-" * 64)
+        print(f"  Rows: base={len(X_base)} new={len(X_new)} holdout={len(X_hold)}")
+        print(f"  {'Mode':<14} {'Train s':>10} {'Accuracy':>10} {'Log-loss':>10}")
+        print(f"  {'incremental':<14} {incremental_s:>10.2f} {inc_acc:>10.4f} {inc_loss:>10.4f}")
+        print(f"  {'full':<14} {full_s:>10.2f} {full_acc:>10.4f} {full_loss:>10.4f}")
+        print("-" * 64)
+        comparison = {
+            'timestamp': datetime.now().isoformat(),
+            'rows': {'base': len(X_base), 'new': len(X_new), 'holdout': len(X_hold)},
+            'incremental': {'train_s': incremental_s, 'accuracy': inc_acc, 'log_loss': inc_loss},
+            'full': {'train_s': full_s, 'accuracy': full_acc, 'log_loss': full_loss},
+        }
+        comparison_path = self.log_dir / 'retraining_comparison.json'
+        with open(comparison_path, 'w') as f:
+            json.dump(comparison, f, indent=2)
+        logger.info(f"💾 Saved comparison to {comparison_path}")
+        return comparison
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Daily V5 retraining')
+    parser.add_argument('--full', action='store_true', help='force a full rebuild')
+    parser.add_argument('--incremental', action='store_true', help='force an incremental update')
+    parser.add_argument('--compare', action='store_true', help='compare incremental vs full retrain accuracy')
+    args = parser.parse_args()
+    
     pipeline = DailyRetrainingPipeline()
-    pipeline.run_full_pipeline()
+    if args.compare:
+        pipeline.compare_incremental_vs_full()
+    else:
+        pipeline.run_full_pipeline(mode='full' if args.full else 'incremental' if args.incremental else 'auto')
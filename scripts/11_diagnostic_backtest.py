@@ -17,6 +17,9 @@ from pathlib import Path
 from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import train_test_split
 
+from backtest_cache import BacktestCache, model_key
+from data_versioning import code_version, dataset_version
+
 print("🔍 DIAGNOSTIC BACKTEST - Feb 7 Failure Analysis")
 print("=" * 80)
 
@@ -153,18 +156,28 @@ print("=" * 80)
 
 # Compare home vs away accuracy
 try:
-    X_scaled = scaler.fit_transform(X)
-    
-    # Get ensemble predictions
-    probs = []
-    for model_name, model in ensemble['models'].items():
-        try:
-            prob = model.predict_proba(X_scaled)[:, 1]
-            probs.append(prob * ensemble['weights'][model_name])
-        except:
-            pass
+    def score_all_games():
+        X_scaled = scaler.fit_transform(X)
+        
+        # Get ensemble predictions
+        probs = []
+        for model_name, model in ensemble['models'].items():
+            try:
+                prob = model.predict_proba(X_scaled)[:, 1]
+                probs.append(prob * ensemble['weights'][model_name])
+            except:
+                pass
+        
+        return pd.DataFrame({'ensemble_pred': np.mean(probs, axis=0)})
     
-    ensemble_pred = np.mean(probs, axis=0)
+    # Per-game scores are cached per (model artifact + this scoring code, dataset version)
+    cache = BacktestCache()
+    scoring = code_version((Path(__file__).name,))['source_hash']
+    scores = cache.predictions(f"{model_key(ensemble, model_path)}@{scoring}", dataset_version(df)['dataset_hash'],
+                               score_all_games)
+    ensemble_pred = scores['ensemble_pred'].values
+    if cache.hits:
+        print("  ♻️  Using cached ensemble predictions (model and data unchanged)")
     
     # Analyze by PPG difference (proxy for team quality)
     if 'home_ppg' in feature_cols and 'away_ppg' in feature_cols:
@@ -3,9 +3,9 @@ Multi-league predictions - expand beyond EPL to LaLiga, Serie A, Bundesliga, Lig
 Using the same V5 Proper ensemble model architecture
 """
 
+import os
 import pandas as pd
 import numpy as np
-import pickle
 import requests
 import json
 from datetime import datetime, timedelta
@@ -14,6 +14,8 @@ import sys
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from model_store import load_bundle
+
 # League configurations
 LEAGUES = {
     'EPL': {
@@ -65,8 +67,7 @@ LEAGUES = {
 
 # Model paths
 MODEL_DIR = Path(__file__).parent.parent / 'models'
-V5_MODEL = MODEL_DIR / 'ensemble_model_v5_proper.pkl'
-FEATURE_SCALER = MODEL_DIR / 'feature_scaler_v5.pkl'
+V5_MODEL = MODEL_DIR / 'ensemble_model_v5_proper.pkl'  # fallback when the model store has no production alias
 
 
 class MultiLeaguePredictor:
@@ -76,22 +77,25 @@ class MultiLeaguePredictor:
         self.api_key = os.getenv('FOOTBALL_DATA_API_KEY', '')
     
     def _load_model(self):
-        """Load ensemble model"""
+        """Load ensemble bundle (model store 'production' alias, else the V5 pickle)"""
         try:
-            with open(V5_MODEL, 'rb') as f:
-                return pickle.load(f)
+            return load_bundle(fallback_path=V5_MODEL)
         except Exception as e:
             print(f'Error loading model: {e}')
             return None
     
     def _load_scaler(self):
-        """Load feature scaler"""
-        try:
-            with open(FEATURE_SCALER, 'rb') as f:
-                return pickle.load(f)
-        except Exception as e:
-            print(f'Error loading scaler: {e}')
+        """Feature scaler saved inside the ensemble bundle"""
+        if not self.model:
             return None
+        return self.model.get('scaler')
+    
+    def _ensemble_proba(self, features_scaled):
+        """Weighted average of member class probabilities"""
+        models = self.model['models']
+        weights = self.model.get('weights', {})
+        probas = [model.predict_proba(features_scaled) for model in models.values()]
+        return np.average(probas, axis=0, weights=[weights.get(name, 1.0 / len(models)) for name in models])
     
     def fetch_matches(self, league_code):
         """Fetch upcoming matches for league"""
@@ -209,12 +213,15 @@ class MultiLeaguePredictor:
             features_scaled = self.scaler.transform(features)
             
             # Get probability predictions
-            probabilities = self.model.predict_proba(features_scaled)[0]
+            probabilities = self._ensemble_proba(features_scaled)[0]
             
-            # Assuming [Home, Draw, Away]
-            home_prob = probabilities[0]
-            draw_prob = probabilities[1]
-            away_prob = probabilities[2]
+            if len(probabilities) == 3:
+                # [Home, Draw, Away]
+                home_prob, draw_prob, away_prob = probabilities
+            else:
+                # Binary home-win model (V5): [not home win, home win]
+                home_prob, draw_prob, away_prob = probabilities[1], 0.0, probabilities[0]
+                probabilities = np.array([home_prob, draw_prob, away_prob])
             
             # Determine winner
             max_prob_idx = np.argmax(probabilities)
@@ -319,5 +326,4 @@ def main():
 
 
 if __name__ == '__main__':
-    import os
     main()
@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""
+Point-in-Time (As-Of) Feature Reconstruction
+Rebuilds, for every historical fixture, the feature vector the live pipeline
+would have produced at prediction time instead of feeding random features to
+backtests:
+  - standings (played / W-D-L / points / goals / position) as of the kickoff,
+    reconstructed from results or taken from recorded standings snapshots
+  - home/away splits and last-5 form over the live 60-day recent-matches window
+  - the latest odds snapshot per fixture (line movement tracker format)
+Every join is a strict as-of search (searchsorted on (group, time) keys sorted
+once), vectorized over all fixtures: only rows with a timestamp strictly before
+the prediction time are visible, so a match's own result and anything later
+can never leak into its features. The 48 values come from the same
+live_feature_values() used by prediction_pipeline.
+
+Usage:
+    python scripts/asof_features.py                                   # data/raw/games_2024-25.csv
+    python scripts/asof_features.py --games data/raw/games.csv --odds line_movement --lead-minutes 120
+"""
+
+import argparse
+import json
+import logging
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from explanations import METADATA_PATH
+from prediction_pipeline import live_feature_values
+from walk_forward_cv import period_labels
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+GAMES_PATH = BASE_DIR / "data" / "raw" / "games_2024-25.csv"
+OUTPUT_PATH = BASE_DIR / "data" / "processed" / "asof_features.parquet"
+
+DEFAULT_LEAGUE = 'EPL'
+DEFAULT_KICKOFF = '15:00'   # when the results have dates only
+RECENT_DAYS = 60            # LiveFeatureEngineer._fetch_recent_matches window
+FORM_GAMES = 5
+GROUP_STRIDE = 10 ** 10     # (group, time) key = group * stride + POSIX seconds
+
+STANDING_FIELDS = ('played', 'won', 'draw', 'lost', 'points', 'goals_for', 'goals_against')
+
+
+def to_seconds(values):
+    """Timestamps (naive = UTC) -> int64 POSIX seconds"""
+    stamps = pd.to_datetime(pd.Series(values).reset_index(drop=True), utc=True)
+    return stamps.dt.tz_convert(None).to_numpy('datetime64[s]').astype(np.int64)
+
+
+def normalize_matches(matches):
+    """
+    Fixture/result frame with match_id, league, kickoff, season, home_team, away_team,
+    home_score, away_score (NaN for unplayed); accepts the raw games CSV columns
+    (game_id, date, optional time / kickoff / league)
+    """
+    df = pd.DataFrame(matches).reset_index(drop=True)
+    out = pd.DataFrame({
+        'match_id': (df['match_id'] if 'match_id' in df else df.get('game_id', pd.Series(df.index))).astype(str),
+        'league': df['league'] if 'league' in df else DEFAULT_LEAGUE,
+        'home_team': df['home_team'],
+        'away_team': df['away_team'],
+        'home_score': pd.to_numeric(df.get('home_score', pd.Series(np.nan, index=df.index)), errors='coerce'),
+        'away_score': pd.to_numeric(df.get('away_score', pd.Series(np.nan, index=df.index)), errors='coerce'),
+    })
+    if 'kickoff' in df and pd.api.types.is_datetime64_any_dtype(df['kickoff']):
+        out['kickoff'] = df['kickoff']
+    else:
+        dates = pd.to_datetime(df['date']).dt.strftime('%Y-%m-%d')
+        times = df.get('time', df.get('kickoff', pd.Series(DEFAULT_KICKOFF, index=df.index)))
+        out['kickoff'] = pd.to_datetime(dates + ' ' + times.fillna(DEFAULT_KICKOFF).astype(str))
+    out['season'] = period_labels(out['kickoff'], 'season').astype(int)
+    return out.sort_values('kickoff', kind='stable').reset_index(drop=True)
+
+
+def load_odds_snapshots(sources):
+    """
+    Best price per side for every snapshot in tracker files / .jsonl streams
+    Returns: DataFrame match_id, timestamp, home, draw, away
+    """
+    from event_backtest import SIDES, iter_snapshot_stream, snapshot_paths
+
+    rows = []
+    for path in snapshot_paths(sources):
+        for timestamp, _, _, match_id, books in iter_snapshot_stream(path):
+            best = {side: max((odds[side] for odds in books.values() if odds.get(side)), default=np.nan)
+                    for side in SIDES}
+            rows.append({'match_id': str(match_id), 'timestamp': timestamp, **best})
+    frame = pd.DataFrame(rows, columns=['match_id', 'timestamp', *SIDES])
+    frame['timestamp'] = pd.to_datetime(frame['timestamp'], unit='s')
+    return frame
+
+
+class AsOfIndex:
+    """Rows sorted by (group, time); lookups only ever see rows strictly before the query time"""
+
+    def __init__(self, groups, times):
+        groups, times = np.asarray(groups, dtype=np.int64), np.asarray(times, dtype=np.int64)
+        self.order = np.lexsort((times, groups))
+        self.groups = groups[self.order]
+        self.times = times[self.order]
+        self.keys = self.groups * GROUP_STRIDE + self.times
+
+    def position(self, groups, times):
+        """Sorted position just after the group's last row with time < the query time (any shape)"""
+        keys = np.asarray(groups, dtype=np.int64) * GROUP_STRIDE + np.asarray(times, dtype=np.int64)
+        return np.searchsorted(self.keys, keys, side='left')
+
+    def latest(self, groups, times):
+        """Sorted row of the group's last entry strictly before the query time (-1 = none)"""
+        groups = np.asarray(groups, dtype=np.int64)
+        times = np.asarray(times, dtype=np.int64)
+        row = self.position(groups, times) - 1
+        found = row >= 0
+        found[found] = self.groups[row[found]] == groups[found]
+        assert (self.times[row[found]] < times[found]).all()
+        return np.where(found, row, -1)
+
+
+def _window_sum(cumulative, start, end):
+    """Sum of sorted rows [start, end) from a cumulative array with a leading zero"""
+    return cumulative[end] - cumulative[start]
+
+
+class AsOfFeatureEngine:
+    """Vectorized point-in-time team stats, odds and live feature vectors for historical fixtures"""
+
+    def __init__(self, matches, standings=None, odds=None, recent_days=RECENT_DAYS):
+        """
+        matches: fixtures/results (see normalize_matches); results feed the standings and form
+        standings: optional recorded standings snapshots (timestamp, team, [league], position,
+                   played, won, draw, lost, points, goals_for, goals_against)
+        odds: optional odds snapshots (match_id, timestamp, home, draw, away)
+        """
+        self.matches = normalize_matches(matches)
+        self.recent_seconds = int(recent_days * 86400)
+        self.teams = pd.Index(sorted(set(self.matches['home_team']) | set(self.matches['away_team'])
+                                     | (set(standings['team']) if standings is not None else set())))
+        self.leagues = pd.Index(sorted(set(self.matches['league'])))
+        self.min_season = int(self.matches['season'].min()) if len(self.matches) else 0
+        self._index_results()
+        self._index_standings(standings)
+        self._index_odds(odds)
+
+    # ---- keys ----------------------------------------------------------
+
+    def _codes(self, leagues, teams):
+        """Integer codes; unknown leagues / teams get a spare code that has no rows"""
+        league_code = self.leagues.get_indexer(np.asarray(leagues))
+        team_code = self.teams.get_indexer(np.asarray(teams))
+        league_code[league_code < 0] = len(self.leagues)
+        team_code[team_code < 0] = len(self.teams)
+        return league_code, team_code
+
+    def _season_group(self, league_code, season, team_code):
+        return (league_code * 1000 + (np.asarray(season) - self.min_season)) * (len(self.teams) + 1) + team_code
+
+    def _team_group(self, league_code, team_code):
+        return league_code * (len(self.teams) + 1) + team_code
+
+    # ---- indexes -------------------------------------------------------
+
+    def _index_results(self):
+        played = self.matches.dropna(subset=['home_score', 'away_score'])
+        n = len(played)
+        home_goals = played['home_score'].to_numpy(dtype=np.int64)
+        away_goals = played['away_score'].to_numpy(dtype=np.int64)
+        league_code, home_code = self._codes(played['league'], played['home_team'])
+        _, away_code = self._codes(played['league'], played['away_team'])
+
+        # One row per team per played match
+        is_home = np.repeat([True, False], n)
+        goals_for = np.concatenate([home_goals, away_goals])
+        goals_against = np.concatenate([away_goals, home_goals])
+        won, draw = goals_for > goals_against, goals_for == goals_against
+        games = {
+            'league': np.tile(league_code, 2),
+            'season': np.tile(played['season'].to_numpy(), 2),
+            'team': np.concatenate([home_code, away_code]),
+            'time': np.tile(to_seconds(played['kickoff']), 2),
+            'played': np.ones(2 * n, dtype=np.int64),
+            'won': won.astype(np.int64),
+            'draw': draw.astype(np.int64),
+            'lost': (goals_for < goals_against).astype(np.int64),
+            'points': 3 * won + draw,
+            'goals_for': goals_for,
+            'goals_against': goals_against,
+            'home': is_home.astype(np.int64),
+            'home_won': (is_home & won).astype(np.int64),
+            'home_for': np.where(is_home, goals_for, 0),
+            'home_against': np.where(is_home, goals_against, 0),
+            'away': (~is_home).astype(np.int64),
+            'away_won': (~is_home & won).astype(np.int64),
+            'away_for': np.where(is_home, 0, goals_for),
+            'away_against': np.where(is_home, 0, goals_against),
+        }
+
+        def cumulative(index, columns):
+            return {c: np.concatenate([[0], np.cumsum(games[c][index.order])]) for c in columns}
+
+        self.season_index = AsOfIndex(self._season_group(games['league'], games['season'], games['team']),
+                                      games['time'])
+        self.season_cum = cumulative(self.season_index, STANDING_FIELDS)
+        self.recent_index = AsOfIndex(self._team_group(games['league'], games['team']), games['time'])
+        self.recent_cum = cumulative(self.recent_index, ('played', 'points', 'home', 'home_won', 'home_for',
+                                                         'home_against', 'away', 'away_won', 'away_for',
+                                                         'away_against'))
+
+        # Season membership (every scheduled team is in the table, even before its first game)
+        self.members = {}
+        for column in ('home_team', 'away_team'):
+            for (league, season), teams in self.matches.groupby(['league', 'season'])[column]:
+                self.members.setdefault((league, season), set()).update(teams)
+
+    def _index_standings(self, standings):
+        self.standings = None
+        if standings is None or not len(standings):
+            return
+        frame = pd.DataFrame(standings).reset_index(drop=True)
+        leagues = frame['league'] if 'league' in frame else pd.Series(DEFAULT_LEAGUE, index=frame.index)
+        league_code, team_code = self._codes(leagues, frame['team'])
+        # Snapshots only apply within their own season
+        season = period_labels(frame['timestamp'], 'season').astype(int)
+        self.standings_index = AsOfIndex(self._season_group(league_code, season, team_code),
+                                         to_seconds(frame['timestamp']))
+        self.standings = {c: frame[c].to_numpy(dtype=float)[self.standings_index.order]
+                          for c in ('position',) + STANDING_FIELDS}
+
+    def _index_odds(self, odds):
+        self.odds = None
+        if odds is None or not len(odds):
+            return
+        frame = pd.DataFrame(odds).reset_index(drop=True)
+        self.odds_ids = pd.Index(frame['match_id'].astype(str).unique())
+        self.odds_index = AsOfIndex(self.odds_ids.get_indexer(frame['match_id'].astype(str)),
+                                    to_seconds(frame['timestamp']))
+        self.odds = {c: frame[c].to_numpy(dtype=float)[self.odds_index.order] for c in ('home', 'draw', 'away')}
+
+    # ---- point-in-time lookups -----------------------------------------
+
+    def _standings_as_of(self, league_code, season, team_code, times):
+        """Season-to-date table fields from results strictly before each time"""
+        group = self._season_group(league_code, season, team_code)
+        start = self.season_index.position(group, 0)
+        end = self.season_index.position(group, times)
+        return {c: _window_sum(self.season_cum[c], start, end) for c in STANDING_FIELDS}
+
+    def _positions(self, leagues, seasons, teams, times):
+        """League position as of each time: points, goal difference, goals scored, then name"""
+        positions = np.zeros(len(times), dtype=np.int64)
+        keys = pd.DataFrame({'league': leagues, 'season': seasons})
+        for (league, season), rows in keys.groupby(['league', 'season']).indices.items():
+            members = pd.Index(sorted(self.members.get((league, season), set()) | set(teams[rows])))
+            league_code, team_code = self._codes(np.full(len(members), league), members)
+            # (teams x queries) table for this league season
+            table = self._standings_as_of(league_code[:, None], season, team_code[:, None], times[rows][None, :])
+            goal_difference = table['goals_for'] - table['goals_against']
+            score = table['points'] * 1_000_000 + (goal_difference + 1000) * 1000 + table['goals_for']
+            order = np.argsort(-score, axis=0, kind='stable')   # members are in name order
+            rank = np.empty_like(order)
+            np.put_along_axis(rank, order, np.arange(len(members))[:, None].repeat(len(rows), axis=1), axis=0)
+            positions[rows] = rank[members.get_indexer(teams[rows]), np.arange(len(rows))] + 1
+        return positions
+
+    def team_stats(self, leagues, seasons, teams, times):
+        """
+        LiveFeatureEngineer._compute_team_stats for each (league, season, team) as of each
+        POSIX-second time, using only results / snapshots strictly before it.
+        Returns: {stat: array}
+        """
+        leagues, teams = np.asarray(leagues, dtype=object), np.asarray(teams, dtype=object)
+        seasons, times = np.asarray(seasons, dtype=np.int64), np.asarray(times, dtype=np.int64)
+        league_code, team_code = self._codes(leagues, teams)
+
+        table = self._standings_as_of(league_code, seasons, team_code, times)
+        table['position'] = self._positions(leagues, seasons, teams, times)
+        if self.standings is not None:
+            # Recorded snapshots win over the reconstruction wherever one exists
+            row = self.standings_index.latest(self._season_group(league_code, seasons, team_code), times)
+            found = row >= 0
+            for field, values in self.standings.items():
+                table[field] = np.where(found, values[row], table[field])
+
+        played = np.maximum(table['played'], 1)
+        stats = {
+            'position': table['position'],
+            'points_per_game': table['points'] / played,
+            'goals_per_game': table['goals_for'] / played,
+            'goals_allowed_per_game': table['goals_against'] / played,
+            'win_rate': table['won'] / played,
+            'goal_difference': table['goals_for'] - table['goals_against'],
+        }
+
+        # Recent-matches window [time - RECENT_DAYS, time)
+        group = self._team_group(league_code, team_code)
+        start = self.recent_index.position(group, np.maximum(times - self.recent_seconds, 0))
+        end = self.recent_index.position(group, times)
+        recent = {c: _window_sum(cum, start, end) for c, cum in self.recent_cum.items()}
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for side in ('home', 'away'):
+                n = recent[side]
+                stats[f'{side}_win_rate'] = np.where(n > 0, recent[f'{side}_won'] / n, stats['win_rate'])
+                stats[f'{side}_goals_per_game'] = np.where(n > 0, recent[f'{side}_for'] / n, stats['goals_per_game'])
+                stats[f'{side}_conceded_per_game'] = np.where(n > 0, recent[f'{side}_against'] / n,
+                                                              stats['goals_allowed_per_game'])
+            form_start = np.maximum(start, end - FORM_GAMES)
+            form_games = end - form_start
+            form_points = _window_sum(self.recent_cum['points'], form_start, end)
+            stats['form_last_5_ppg'] = np.where(form_games > 0, form_points / form_games, stats['points_per_game'])
+        return stats
+
+    def odds_as_of(self, match_ids, times):
+        """Latest best prices strictly before each time; NaN where no snapshot exists yet"""
+        n = len(times)
+        if self.odds is None:
+            return {f'odds_{side}': np.full(n, np.nan) for side in ('home', 'draw', 'away')}
+        codes = self.odds_ids.get_indexer(np.asarray(match_ids, dtype=str))
+        row = np.where(codes >= 0, self.odds_index.latest(np.maximum(codes, 0), times), -1)
+        return {f'odds_{side}': np.where(row >= 0, values[row], np.nan) for side, values in self.odds.items()}
+
+    # ---- feature vectors -----------------------------------------------
+
+    def build(self, fixtures=None, lead_minutes=0):
+        """
+        Point-in-time live feature vectors
+        fixtures: frame like normalize_matches accepts (default: every known match)
+        lead_minutes: predict this long before kickoff (the as-of time)
+        Returns: (X (n, 48) float64, frame with fixture columns, as_of and odds)
+        """
+        fixtures = self.matches if fixtures is None else normalize_matches(fixtures)
+        as_of = to_seconds(fixtures['kickoff']) - int(lead_minutes * 60)
+        leagues, seasons = fixtures['league'].to_numpy(), fixtures['season'].to_numpy()
+
+        home = self.team_stats(leagues, seasons, fixtures['home_team'].to_numpy(), as_of)
+        away = self.team_stats(leagues, seasons, fixtures['away_team'].to_numpy(), as_of)
+        X = np.column_stack(np.broadcast_arrays(*live_feature_values(home, away))).astype(np.float64)
+
+        frame = fixtures.copy()
+        frame['as_of'] = pd.to_datetime(as_of, unit='s')
+        for column, values in self.odds_as_of(fixtures['match_id'].to_numpy(), as_of).items():
+            frame[column] = values
+        logger.info(f"🕰️  Rebuilt point-in-time features for {len(frame):,} fixtures")
+        return X, frame
+
+
+def feature_names(n_features=48, metadata_path=METADATA_PATH):
+    try:
+        with open(metadata_path) as f:
+            names = json.load(f).get('features') or []
+    except (OSError, ValueError):
+        names = []
+    return names if len(names) == n_features else [f"f{i}" for i in range(n_features)]
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description='Point-in-time feature reconstruction')
+    parser.add_argument('--games', type=Path, default=GAMES_PATH, help='results CSV (date, home/away team and score)')
+    parser.add_argument('--standings', type=Path, help='standings snapshots CSV (timestamp, team, ...)')
+    parser.add_argument('--odds', nargs='+', help='odds snapshot .jsonl / tracker files or directories')
+    parser.add_argument('--lead-minutes', type=float, default=0, help='prediction time before kickoff')
+    parser.add_argument('--output', type=Path, default=OUTPUT_PATH)
+    args = parser.parse_args()
+
+    engine = AsOfFeatureEngine(
+        pd.read_csv(args.games),
+        standings=pd.read_csv(args.standings) if args.standings else None,
+        odds=load_odds_snapshots(args.odds) if args.odds else None,
+    )
+    X, frame = engine.build(lead_minutes=args.lead_minutes)
+    output = pd.concat([frame, pd.DataFrame(X, columns=feature_names(X.shape[1]))], axis=1)
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    tmp = args.output.with_suffix('.tmp')
+    output.to_parquet(tmp, index=False)
+    tmp.replace(args.output)
+    logger.info(f"💾 Saved {len(output):,} point-in-time feature rows to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
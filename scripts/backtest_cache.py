@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Backtest Result Cache
+Parquet store with a SQLite index for backtest pieces:
+  - per-game predictions, keyed by (model artifact hash, dataset hash); callers
+    append a hash of their scoring code to the model key (data_versioning.code_version)
+    so a scoring change is a miss, not a stale hit
+  - strategy outcomes, keyed by (model, dataset, strategy name, parameter hash)
+Callers pass a compute function for each piece; it only runs on a miss, so
+re-running a backtest with the same model and data, or comparing models and
+thresholds, recomputes only what is missing.
+
+Usage:
+    python scripts/backtest_cache.py            # list cached entries
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+CACHE_DIR = BASE_DIR / "data" / "cache" / "backtests"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    model_key TEXT NOT NULL,
+    dataset_key TEXT NOT NULL,
+    path TEXT NOT NULL,
+    rows INTEGER NOT NULL,
+    created_at TEXT NOT NULL,
+    PRIMARY KEY (model_key, dataset_key)
+);
+CREATE TABLE IF NOT EXISTS outcomes (
+    model_key TEXT NOT NULL,
+    dataset_key TEXT NOT NULL,
+    strategy TEXT NOT NULL,
+    params_key TEXT NOT NULL,
+    params TEXT NOT NULL,
+    path TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    PRIMARY KEY (model_key, dataset_key, strategy, params_key)
+);
+"""
+
+
+def file_hash(path):
+    """SHA-1 of a file's bytes (16 hex chars), None when missing"""
+    path = Path(path)
+    if not path.exists():
+        return None
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def model_key(bundle=None, path=None):
+    """Model store id when the bundle came from the store, else the artifact file hash"""
+    if isinstance(bundle, dict) and bundle.get('model_id'):
+        return bundle['model_id']
+    return file_hash(path) if path is not None else None
+
+
+def params_key(params):
+    return hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+class BacktestCache:
+    """Parquet pieces + SQLite index; get-or-compute for predictions and strategy outcomes"""
+
+    def __init__(self, root=CACHE_DIR):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.root / 'index.db'
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+        self.hits = 0
+        self.misses = 0
+
+    def _connect(self):
+        conn = sqlite3.connect(self.index_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _write(self, frame, name):
+        path = self.root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix('.tmp')
+        frame.to_parquet(tmp, index=False)
+        tmp.replace(path)
+        return path
+
+    def predictions(self, model, dataset, compute):
+        """
+        Per-game predictions for (model, dataset); compute() -> DataFrame runs only on a miss.
+        A None key (unhashable model/data) disables caching for the call.
+        """
+        if model is None or dataset is None:
+            return compute()
+        with self._connect() as conn:
+            row = conn.execute('SELECT path FROM predictions WHERE model_key = ? AND dataset_key = ?',
+                               (model, dataset)).fetchone()
+        if row and Path(row['path']).exists():
+            self.hits += 1
+            return pd.read_parquet(row['path'])
+
+        self.misses += 1
+        frame = compute()
+        if frame is None:
+            return None
+        path = self._write(frame, f"predictions/{model}_{dataset}.parquet")
+        with self._connect() as conn:
+            conn.execute('INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?, ?)',
+                         (model, dataset, str(path), len(frame), datetime.now().isoformat()))
+        return frame
+
+    def outcome(self, model, dataset, strategy, params, compute):
+        """
+        Strategy outcome for one parameter set; compute() -> (summary dict, per-bet DataFrame)
+        runs only on a miss. Returns: (summary, bets)
+        """
+        if model is None or dataset is None:
+            return compute()
+        key = params_key(params)
+        with self._connect() as conn:
+            row = conn.execute('SELECT path, summary FROM outcomes WHERE model_key = ? AND dataset_key = ? '
+                               'AND strategy = ? AND params_key = ?', (model, dataset, strategy, key)).fetchone()
+        if row and Path(row['path']).exists():
+            self.hits += 1
+            return json.loads(row['summary']), pd.read_parquet(row['path'])
+
+        self.misses += 1
+        summary, bets = compute()
+        path = self._write(bets, f"outcomes/{model}_{dataset}_{strategy}_{key}.parquet")
+        with self._connect() as conn:
+            conn.execute('INSERT OR REPLACE INTO outcomes VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                         (model, dataset, strategy, key, json.dumps(params, sort_keys=True, default=str),
+                          str(path), json.dumps(summary, default=float), datetime.now().isoformat()))
+        return summary, bets
+
+    def list_outcomes(self, model=None, dataset=None, strategy=None):
+        """Cached strategy summaries (for comparing models / parameter sets without recomputing)"""
+        clauses, args = [], []
+        for column, value in (('model_key', model), ('dataset_key', dataset), ('strategy', strategy)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                args.append(value)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        with self._connect() as conn:
+            rows = conn.execute(f"SELECT * FROM outcomes {where} ORDER BY created_at", args).fetchall()
+        return [{**dict(row), 'params': json.loads(row['params']), 'summary': json.loads(row['summary'])}
+                for row in rows]
+
+    def report(self, label='backtest cache'):
+        logger.info(f"♻️  {label}: {self.hits} cached / {self.misses} computed")
+        return {'hits': self.hits, 'misses': self.misses}
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    cache = BacktestCache()
+    with cache._connect() as conn:
+        predictions = conn.execute('SELECT * FROM predictions ORDER BY created_at').fetchall()
+    print(f"\n🗄️  BACKTEST CACHE ({cache.root})")
+    print("-" * 90)
+    for row in predictions:
+        print(f"  predictions  model {row['model_key']:<18} data {row['dataset_key'][:16]:<18} {row['rows']:>9,} rows")
+    for row in cache.list_outcomes():
+        summary = ', '.join(f"{k}={v:.4g}" if isinstance(v, float) else f"{k}={v}"
+                            for k, v in row['summary'].items())
+        print(f"  {row['strategy']:<12} model {row['model_key']:<18} {json.dumps(row['params'])}  {summary}")
+    print("-" * 90)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Monte Carlo Bankroll Simulator
+Resamples settled (paper trading) or backtested bets into many bankroll paths
+and compares staking plans:
+  - flat:         fixed stake per bet (paper trading uses 150)
+  - proportional: fixed fraction of the current bankroll
+  - kelly:        fractional Kelly on the model probability and decimal odds
+Each chunk of paths is one (paths x bets) NumPy array operation, chunks bound
+memory and can be spread over an execution backend. Reports risk of ruin,
+max-drawdown distribution and CAGR percentiles per plan.
+
+Usage:
+    python scripts/bankroll_simulator.py                                  # paper trading bets
+    python scripts/bankroll_simulator.py --source results/backtest_results_v2.json --paths 200000
+"""
+
+import argparse
+import json
+import logging
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from execution import BACKENDS, get_backend
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+PAPER_TRADING_PATH = BASE_DIR / "paper_trading" / "daily_results.json"
+OUTPUT_PATH = BASE_DIR / "results" / "bankroll_simulation.json"
+
+STARTING_BANKROLL = 10000
+FLAT_STAKE = 150
+PROPORTIONAL_FRACTION = 0.015   # 150 / 10000
+KELLY_FRACTION = 0.25           # quarter Kelly
+MAX_STAKE_FRACTION = 0.05       # never stake more than 5% of the bankroll
+EVEN_ODDS = 2.0                 # backtests settle at even money
+RUIN_FRACTION = 0.2             # bankroll below 20% of the start counts as ruin
+BETS_PER_YEAR = 300             # default betting volume when the source has no dates
+CHUNK_PATHS = 10000             # paths per array operation (bounds memory)
+MIN_SETTLED_BETS = 30           # fewer settled bets than this: no trustworthy bootstrap
+
+STRATEGIES = ('flat', 'proportional', 'kelly')
+DRAWDOWN_PERCENTILES = (50, 90, 99)
+CAGR_PERCENTILES = (5, 25, 50, 75, 95)
+
+
+def _bet_from_record(record):
+    """(probability, decimal odds, won or None) from a paper-trading or backtest record"""
+    result = str(record.get('result', record.get('correct', ''))).upper()
+    if result in ('WIN', 'TRUE', '✅ WIN'):
+        won = True
+    elif result in ('LOSS', 'FALSE', '❌ LOSS'):
+        won = False
+    else:
+        won = None  # pending / push
+    odds = float(record.get('odds') or EVEN_ODDS)
+    confidence = record.get('confidence')
+    if confidence is None:
+        prob = 1 / odds  # no model probability recorded: assume the market price
+    else:
+        prob = float(confidence) / (100 if float(confidence) > 1 else 1)
+        if record.get('prediction') == 'Away/Draw':
+            prob = 1 - prob  # 05_backtest_v2 records the home-win probability for every pick
+    return prob, odds, won
+
+
+def load_bets(path=PAPER_TRADING_PATH):
+    """
+    Bets from paper trading (daily_results.json), a 05_backtest_v2 result file
+    ('v2' detailed results) or a plain list of records.
+    Returns: dict of arrays prob, odds, won (NaN = unsettled) and bets_per_year
+    """
+    with open(path) as f:
+        data = json.load(f)
+
+    if isinstance(data, dict) and 'bets' in data:
+        records = []
+        for entry in data['bets']:
+            records.extend(entry['matches'] if 'matches' in entry else [entry])
+        dates = [entry['date'] for entry in data['bets'] if entry.get('date')]
+    elif isinstance(data, dict) and 'detailed_results' in data:
+        records, dates = data['detailed_results'].get('v2', []), []
+    else:
+        records, dates = list(data), [r['date'] for r in data if r.get('date')]
+
+    bets = [_bet_from_record(r) for r in records]
+    if not bets:
+        raise ValueError(f"No bets in {path}")
+    prob, odds, won = zip(*bets)
+
+    bets_per_year = BETS_PER_YEAR
+    if len(dates) >= 2:
+        span_days = (datetime.fromisoformat(max(dates)[:10]) - datetime.fromisoformat(min(dates)[:10])).days
+        if span_days >= 7:
+            bets_per_year = len(bets) / span_days * 365
+    return {
+        'prob': np.array(prob, dtype=float),
+        'odds': np.array(odds, dtype=float),
+        'won': np.array([np.nan if w is None else float(w) for w in won]),
+        'bets_per_year': bets_per_year,
+    }
+
+
+def stake_fractions(strategy, prob, odds):
+    """Bankroll fraction staked per bet for the multiplicative plans"""
+    if strategy == 'proportional':
+        return np.full(np.shape(prob), PROPORTIONAL_FRACTION)
+    edge = prob * odds - 1
+    kelly = np.clip(edge / (odds - 1), 0.0, None) * KELLY_FRACTION
+    return np.minimum(kelly, MAX_STAKE_FRACTION)
+
+
+def _simulate_chunk(seed, n_paths, horizon, bets, outcome, strategies, bankroll):
+    """
+    One chunk of paths for every strategy
+    Returns: {strategy: {'final', 'max_drawdown', 'ruined'}} (arrays of n_paths)
+    """
+    rng = np.random.default_rng(seed)
+    pool = bets if outcome == 'probability' else {k: v[~np.isnan(bets['won'])] for k, v in bets.items()
+                                                 if k != 'bets_per_year'}
+    idx = rng.integers(0, len(pool['prob']), size=(n_paths, horizon))
+    prob, odds = pool['prob'][idx], pool['odds'][idx]
+    won = rng.random((n_paths, horizon)) < prob if outcome == 'probability' else pool['won'][idx] > 0.5
+    # Return per unit staked
+    unit_return = np.where(won, odds - 1, -1.0)
+
+    results = {}
+    for strategy in strategies:
+        if strategy == 'flat':
+            path = bankroll + np.cumsum(FLAT_STAKE * unit_return, axis=1)
+        else:
+            growth = 1 + stake_fractions(strategy, prob, odds) * unit_return
+            path = bankroll * np.cumprod(growth, axis=1)
+        # Betting stops at ruin: freeze each ruined path at its value when it crossed the line
+        alive = np.logical_and.accumulate(path > RUIN_FRACTION * bankroll, axis=1)
+        ruined = ~alive[:, -1]
+        at_ruin = path[np.arange(n_paths), np.argmin(alive, axis=1)]
+        path = np.where(alive | ~ruined[:, None], path, at_ruin[:, None])
+
+        peaks = np.maximum.accumulate(np.maximum(path, bankroll), axis=1)
+        max_drawdown = ((peaks - path) / peaks).max(axis=1)
+        results[strategy] = {'final': path[:, -1], 'max_drawdown': max_drawdown, 'ruined': ruined}
+    return results
+
+
+def _summarize(chunks, strategy, bankroll, years):
+    final = np.concatenate([c[strategy]['final'] for c in chunks])
+    max_drawdown = np.concatenate([c[strategy]['max_drawdown'] for c in chunks])
+    ruined = np.concatenate([c[strategy]['ruined'] for c in chunks])
+    cagr = np.where(final > 0, np.power(np.maximum(final, 1e-12) / bankroll, 1 / years) - 1, -1.0)
+    return {
+        'paths': int(len(final)),
+        'ruin_probability': float(ruined.mean()),
+        'max_drawdown': {f"p{q}": float(np.percentile(max_drawdown, q)) for q in DRAWDOWN_PERCENTILES},
+        'cagr': {f"p{q}": float(np.percentile(cagr, q)) for q in CAGR_PERCENTILES},
+        'final_bankroll_median': float(np.median(final)),
+        'profitable_paths': float((final > bankroll).mean()),
+    }
+
+
+def simulate(bets, n_paths=100000, horizon=None, strategies=STRATEGIES, outcome=None,
+             bankroll=STARTING_BANKROLL, seed=42, chunk_paths=CHUNK_PATHS, n_workers=1,
+             backend=None, address=None):
+    """
+    Monte Carlo over bankroll paths
+    horizon: bets per path (default one year at the source's betting rate)
+    outcome: 'bootstrap' (resample settled results) or 'probability' (Bernoulli on the model
+             probability); defaults to bootstrap when enough bets are settled.
+             'probability' assumes the model is calibrated, so it shows what the model
+             believes, not what it has earned - the report carries a warning
+    Returns: {strategy: summary} plus run parameters under '_run'
+    """
+    settled = int((~np.isnan(bets['won'])).sum())
+    if outcome is None:
+        outcome = 'bootstrap' if settled >= MIN_SETTLED_BETS else 'probability'
+    if outcome == 'bootstrap' and settled == 0:
+        raise ValueError("No settled bets to bootstrap from - use outcome='probability'")
+    warning = None
+    if settled < MIN_SETTLED_BETS:
+        if outcome == 'probability':
+            warning = (f"only {settled} settled bets (< {MIN_SETTLED_BETS}): outcomes drawn from the model's own "
+                       f"probabilities - results assume a calibrated model, not realised performance")
+        else:
+            warning = f"only {settled} settled bets (< {MIN_SETTLED_BETS}): bootstrap resamples a tiny record"
+        logger.warning(f"⚠️ {warning}")
+    horizon = horizon or max(1, int(round(bets['bets_per_year'])))
+    years = horizon / bets['bets_per_year']
+
+    sizes = [min(chunk_paths, n_paths - start) for start in range(0, n_paths, chunk_paths)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    strategies = tuple(strategies)
+    logger.info(f"🎲 {n_paths:,} paths x {horizon} bets ({outcome}, {len(sizes)} chunks, {n_workers} worker(s))")
+
+    if n_workers > 1 or backend:
+        with get_backend(backend, max_workers=n_workers, address=address) as executor:
+            shared = executor.put(bets)
+            futures = [executor.submit(_simulate_chunk, s, size, horizon, shared, outcome, strategies, bankroll)
+                       for s, size in zip(seeds, sizes)]
+            chunks = [executor.result(f) for f in futures]
+    else:
+        chunks = [_simulate_chunk(s, size, horizon, bets, outcome, strategies, bankroll)
+                  for s, size in zip(seeds, sizes)]
+
+    report = {strategy: _summarize(chunks, strategy, bankroll, years) for strategy in strategies}
+    report['_run'] = {'paths': n_paths, 'horizon_bets': horizon, 'years': round(years, 3), 'outcome': outcome,
+                      'starting_bankroll': bankroll, 'source_bets': int(len(bets['prob'])), 'settled_bets': settled,
+                      'warning': warning}
+    return report
+
+
+def print_report(report):
+    run = report['_run']
+    print("\n💰 BANKROLL SIMULATION")
+    print("=" * 84)
+    print(f"  {run['paths']:,} paths x {run['horizon_bets']} bets ({run['years']:.2f} years, {run['outcome']}), "
+          f"from {run['source_bets']} bets ({run['settled_bets']} settled)")
+    if run.get('warning'):
+        print(f"  ⚠️  WARNING: {run['warning']}")
+    print("-" * 84)
+    print(f"{'Plan':<14} {'Ruin':>7} {'DD p50':>8} {'DD p90':>8} {'DD p99':>8} "
+          f"{'CAGR p5':>9} {'p50':>8} {'p95':>8} {'Median $':>10}")
+    print("-" * 84)
+    for strategy, s in report.items():
+        if strategy.startswith('_'):
+            continue
+        dd, cagr = s['max_drawdown'], s['cagr']
+        print(f"{strategy:<14} {s['ruin_probability']:>6.1%} {dd['p50']:>8.1%} {dd['p90']:>8.1%} {dd['p99']:>8.1%} "
+              f"{cagr['p5']:>9.1%} {cagr['p50']:>8.1%} {cagr['p95']:>8.1%} {s['final_bankroll_median']:>10,.0f}")
+    print("=" * 84)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description='Monte Carlo bankroll / staking simulator')
+    parser.add_argument('--source', type=Path, default=PAPER_TRADING_PATH,
+                        help='paper trading daily_results.json or a backtest result file')
+    parser.add_argument('--paths', type=int, default=100000)
+    parser.add_argument('--horizon', type=int, help='bets per path (default: one year)')
+    parser.add_argument('--outcome', choices=('bootstrap', 'probability'))
+    parser.add_argument('--bankroll', type=float, default=STARTING_BANKROLL)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--backend', choices=BACKENDS)
+    parser.add_argument('--address')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    bets = load_bets(args.source)
+    report = simulate(bets, n_paths=args.paths, horizon=args.horizon, outcome=args.outcome,
+                      bankroll=args.bankroll, seed=args.seed, n_workers=args.workers,
+                      backend=args.backend, address=args.address)
+    print_report(report)
+
+    OUTPUT_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with open(OUTPUT_PATH, 'w') as f:
+        json.dump({'generated_at': datetime.now().isoformat(), 'source': str(args.source), **report}, f, indent=2)
+    logger.info(f"💾 Saved simulation to {OUTPUT_PATH}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Feature Dataset Versioning
+Content hashes for the engineered feature data, partitioned by season (or by
+fixed row blocks when there is no date column), plus a code version for the
+training scripts. Retraining compares these against the model metadata to
+skip runs where nothing changed and to find the partitions that did.
+"""
+
+import hashlib
+import logging
+import subprocess
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from walk_forward_cv import period_labels
+
+logger = logging.getLogger(__name__)
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+PARTITION_ROWS = 1000       # row-block size when the data has no date column
+
+# Sources whose changes should force a retrain even on identical data
+TRAINING_SOURCES = [
+    '08_daily_retraining.py',
+    'training_scheduler.py',
+    'data_versioning.py',
+    'dataset_cache.py',
+    'walk_forward_cv.py',
+]
+
+
+def partition_labels(df):
+    """Season label per row ('undated' for unparseable dates), or row-block label without dates"""
+    if 'date' in df.columns:
+        seasons = period_labels(df['date'], 'season')
+        return np.array([f"season_{int(s)}" if not pd.isna(s) else 'undated' for s in seasons])
+    return np.array([f"rows_{i // PARTITION_ROWS}" for i in range(len(df))])
+
+
+def _hash_frame(frame):
+    digest = hashlib.sha1()
+    digest.update(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def dataset_version(df):
+    """
+    Hash every partition of a feature frame.
+    Returns: {'dataset_hash', 'partitions': {label: hash}, 'rows', 'columns'}
+    """
+    labels = partition_labels(df)
+    partitions = {label: _hash_frame(df[labels == label]) for label in sorted(set(labels))}
+
+    digest = hashlib.sha1()
+    digest.update('|'.join(map(str, df.columns)).encode())
+    for label, part_hash in partitions.items():
+        digest.update(f"{label}:{part_hash}".encode())
+
+    return {
+        'dataset_hash': digest.hexdigest(),
+        'partitions': partitions,
+        'rows': int(len(df)),
+        'columns': int(len(df.columns)),
+    }
+
+
+def code_version(sources=TRAINING_SOURCES):
+    """Hash of the training sources, with the git commit when available"""
+    digest = hashlib.sha1()
+    for name in sources:
+        path = SCRIPTS_DIR / name
+        if path.exists():
+            digest.update(path.read_bytes())
+    version = {'source_hash': digest.hexdigest()[:16]}
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=SCRIPTS_DIR,
+                                capture_output=True, text=True, timeout=5)
+        if commit.returncode == 0:
+            version['git_commit'] = commit.stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        pass
+    return version
+
+
+def diff_partitions(previous, current):
+    """Partitions added, changed and removed between two dataset_version() results"""
+    old = (previous or {}).get('partitions', {})
+    new = current.get('partitions', {})
+    return {
+        'new': sorted(label for label in new if label not in old),
+        'changed': sorted(label for label in new if label in old and old[label] != new[label]),
+        'removed': sorted(label for label in old if label not in new),
+    }
+
+
+def is_unchanged(previous, current_data, current_code):
+    """True when both the dataset hash and the training code match the previous run"""
+    if not previous:
+        return False
+    return (previous.get('dataset_version', {}).get('dataset_hash') == current_data['dataset_hash']
+            and previous.get('code_version', {}).get('source_hash') == current_code['source_hash'])
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Binary Booster Dataset Cache
+Stores train/validation splits as LightGBM binary datasets, XGBoost binary
+DMatrix files and quantized CatBoost pools, keyed by a hash of the feature
+data and split. Repeated CV folds, search runs and retrains load the binned
+files instead of re-binning from pandas, and the cache reports how much
+construction time each hit saved.
+Tree members are scale-invariant, so cached datasets are stored unscaled.
+The cache is capped at MAX_CACHE_BYTES: after each build the least recently
+used entries are removed until it fits.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+CACHE_DIR = BASE_DIR / "data" / "cache" / "datasets"
+MAX_CACHE_BYTES = int(os.getenv('DATASET_CACHE_MAX_BYTES', 2 * 1024 ** 3))
+
+
+def data_hash(X, y, train_idx, test_idx):
+    """Content hash of a split: same data + same split -> same cached files"""
+    digest = hashlib.sha1()
+    digest.update(str(X.shape).encode())
+    digest.update(np.ascontiguousarray(X).tobytes())
+    digest.update(np.ascontiguousarray(y).tobytes())
+    digest.update(np.asarray(train_idx, dtype=np.int64).tobytes())
+    digest.update(np.asarray(test_idx, dtype=np.int64).tobytes())
+    return digest.hexdigest()[:16]
+
+
+def load_split(paths):
+    """In-memory arrays of a materialized split, for workers that cannot read the cache directory"""
+    return {key: np.load(path) for key, path in paths.items() if path.endswith('.npy')}
+
+
+def array(split, key):
+    """X_train/y_train/X_test/y_test from either a path dict (memory-mapped) or load_split() arrays"""
+    value = split[key]
+    return np.load(value, mmap_mode='r') if isinstance(value, str) else value
+
+
+def load_lgb(split):
+    import lightgbm as lgb
+    if 'lgb_train' in split:
+        return lgb.Dataset(split['lgb_train']).construct()
+    return lgb.Dataset(split['X_train'], label=split['y_train'], free_raw_data=False).construct()
+
+
+def load_xgb(split):
+    import xgboost as xgb
+    if 'xgb_train' in split:
+        return xgb.DMatrix(split['xgb_train'])
+    return xgb.DMatrix(split['X_train'], label=split['y_train'])
+
+
+def load_cat(split):
+    """CatBoost pool (None when catboost was unavailable at build time)"""
+    from catboost import Pool
+    if 'cat_train' in split:
+        return Pool('quantized://' + split['cat_train'])
+    if 'lgb_train' not in split:  # in-memory split
+        return Pool(split['X_train'], label=split['y_train'])
+    return None
+
+
+class DatasetCache:
+    """Content-addressed cache of binary booster datasets"""
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self.build_s = 0.0
+        self.saved_s = 0.0
+
+    def _paths(self, entry_dir):
+        return {
+            'X_train': entry_dir / 'X_train.npy',
+            'y_train': entry_dir / 'y_train.npy',
+            'X_test': entry_dir / 'X_test.npy',
+            'y_test': entry_dir / 'y_test.npy',
+            'lgb_train': entry_dir / 'train.lgb.bin',
+            'xgb_train': entry_dir / 'train.xgb.buffer',
+            'cat_train': entry_dir / 'train.cat.quantized',
+        }
+
+    def materialize(self, X, y, train_idx, test_idx):
+        """
+        Return file paths for a split, building any missing binary datasets.
+        Returns: dict with X_train/y_train/X_test/y_test (.npy) and
+        lgb_train/xgb_train/cat_train (binary datasets; cat_train only if catboost is installed)
+        """
+        key = data_hash(X, y, train_idx, test_idx)
+        entry_dir = self.cache_dir / key
+        paths = self._paths(entry_dir)
+        meta_path = entry_dir / 'meta.json'
+
+        if meta_path.exists():
+            with open(meta_path) as f:
+                meta = json.load(f)
+            built = {k: str(v) for k, v in paths.items() if k in meta['files'] and v.exists()}
+            if len(built) == len(meta['files']):
+                self.hits += 1
+                self.saved_s += meta['build_s']
+                os.utime(meta_path)  # recency for LRU eviction
+                return built
+
+        self.misses += 1
+        entry_dir.mkdir(parents=True, exist_ok=True)
+        X_train, y_train = X[train_idx], y[train_idx]
+        start = time.perf_counter()
+        np.save(paths['X_train'], X_train)
+        np.save(paths['y_train'], y_train)
+        np.save(paths['X_test'], X[test_idx])
+        np.save(paths['y_test'], y[test_idx])
+
+        import lightgbm as lgb
+        import xgboost as xgb
+        lgb.Dataset(X_train, label=y_train, free_raw_data=False).construct().save_binary(str(paths['lgb_train']))
+        xgb.DMatrix(X_train, label=y_train).save_binary(str(paths['xgb_train']))
+        try:
+            from catboost import Pool
+        except ImportError:  # catboost is optional (backend requirements only)
+            del paths['cat_train']
+        else:
+            pool = Pool(X_train, label=y_train)
+            pool.quantize()
+            pool.save(str(paths['cat_train']))
+        build_s = time.perf_counter() - start
+        self.build_s += build_s
+
+        with open(meta_path, 'w') as f:
+            json.dump({'files': list(paths), 'build_s': build_s, 'rows': int(len(X_train)),
+                       'features': int(X.shape[1])}, f, indent=2)
+        self.evict(keep=key)
+        return {k: str(v) for k, v in paths.items()}
+
+    def evict(self, keep=None):
+        """Remove least recently used entries (never `keep`) until the cache fits in max_bytes"""
+        entries = []
+        for entry_dir in self.cache_dir.iterdir():
+            if not entry_dir.is_dir():
+                continue
+            meta_path = entry_dir / 'meta.json'
+            used = (meta_path if meta_path.exists() else entry_dir).stat().st_mtime
+            size = sum(f.stat().st_size for f in entry_dir.iterdir() if f.is_file())
+            entries.append((used, size, entry_dir))
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry_dir in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if entry_dir.name == keep:
+                continue
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total -= size
+            self.evicted += 1
+
+    def report(self, label='datasets'):
+        """Log cache hits and the construction time they saved"""
+        logger.info(f"♻️  {label}: {self.hits} cached / {self.misses} built / {self.evicted} evicted "
+                    f"({self.build_s:.1f}s building, {self.saved_s:.1f}s saved)")
+        return {'hits': self.hits, 'misses': self.misses, 'evicted': self.evicted,
+                'build_s': round(self.build_s, 3), 'saved_s': round(self.saved_s, 3)}
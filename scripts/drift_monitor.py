@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Streaming Concept-Drift Monitor
+Updated from every inference (feature distributions) and every settled match
+(prediction outcomes), with constant work per update and bounded memory:
+  - PSI per feature: exponentially decayed live histograms vs reference bins
+  - rolling Brier score / log-loss over the last OUTCOME_WINDOW settled matches
+  - ADWIN change detector on per-match log-loss (bucket count capped); only a
+    rise in log-loss raises the alarm, an improving model just shrinks the window
+State is a small JSON file shared by the prediction and results cron jobs.
+
+Usage:
+    python scripts/drift_monitor.py           # print current drift status
+"""
+
+import json
+import logging
+import math
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+STATE_PATH = BASE_DIR / "models" / "drift_monitor_state.json"
+
+N_BINS = 10                 # quantile bins per feature
+DECAY = 0.995               # live histogram decay per match (~140-match half-life)
+REFERENCE_SIZE = 500        # live rows used as reference when none was set at training time
+PSI_THRESHOLD = 0.25        # PSI above this = significant shift
+MIN_LIVE_WEIGHT = 50        # decayed match count needed before PSI is trusted
+OUTCOME_WINDOW = 200        # settled matches in the rolling Brier/log-loss window
+BRIER_TOLERANCE = 0.10      # rolling Brier 10% worse than baseline = degraded
+ADWIN_DELTA = 0.002
+ADWIN_MAX_BUCKETS = 5       # buckets per level before merging
+ADWIN_MAX_TOTAL = 60        # hard cap on buckets (bounds memory and check cost)
+ADWIN_CHECK_EVERY = 8       # outcomes between cut checks
+EPS = 1e-4
+
+
+class Adwin:
+    """ADWIN2 adaptive window over a bounded exponential histogram"""
+
+    def __init__(self, delta=ADWIN_DELTA, buckets=None, updates=0):
+        self.delta = delta
+        # Oldest first: [sum, sum_sq, count, level]
+        self.buckets = [list(b) for b in (buckets or [])]
+        self.updates = updates
+
+    @property
+    def width(self):
+        return sum(b[2] for b in self.buckets)
+
+    @property
+    def mean(self):
+        width = self.width
+        return sum(b[0] for b in self.buckets) / width if width else 0.0
+
+    def _compress(self):
+        """Merge the two oldest buckets of any level holding more than ADWIN_MAX_BUCKETS"""
+        level = 0
+        while True:
+            same = [i for i, b in enumerate(self.buckets) if b[3] == level]
+            if not same:
+                break
+            if len(same) > ADWIN_MAX_BUCKETS:
+                i, j = same[0], same[1]  # adjacent: buckets are ordered oldest/highest level first
+                a, b = self.buckets[i], self.buckets[j]
+                self.buckets[i:j + 1] = [[a[0] + b[0], a[1] + b[1], a[2] + b[2], level + 1]]
+            level += 1
+        while len(self.buckets) > ADWIN_MAX_TOTAL:
+            self.buckets.pop(0)
+
+    def update(self, value):
+        """Add one observation; returns True when the mean is detected to have risen"""
+        self.buckets.append([value, value * value, 1, 0])
+        self._compress()
+        self.updates += 1
+        if self.updates % ADWIN_CHECK_EVERY:
+            return False
+        return self._detect()
+
+    def _detect(self):
+        # Any significant shift drops the stale prefix; only an increase counts as a change
+        detected = False
+        while len(self.buckets) > 1:
+            width = self.width
+            total = sum(b[0] for b in self.buckets)
+            total_sq = sum(b[1] for b in self.buckets)
+            variance = max(total_sq / width - (total / width) ** 2, 0.0)
+            dd = math.log(2 * math.log(max(width, 3)) / self.delta)
+
+            cut = False
+            n0 = s0 = 0.0
+            for bucket in self.buckets[:-1]:
+                n0 += bucket[2]
+                s0 += bucket[0]
+                n1, s1 = width - n0, total - s0
+                m_inv = 1 / n0 + 1 / n1
+                eps = math.sqrt(2 * m_inv * variance * dd) + (2 / 3) * dd * m_inv
+                if abs(s0 / n0 - s1 / n1) > eps:
+                    cut = True
+                    detected = detected or s1 / n1 > s0 / n0
+                    break
+            if not cut:
+                break
+            self.buckets.pop(0)  # drop the stale prefix one bucket at a time
+        return detected
+
+    def to_dict(self):
+        return {'delta': self.delta, 'buckets': self.buckets, 'updates': self.updates}
+
+
+class DriftMonitor:
+    """Incremental feature-drift and performance-drift tracking for the live model"""
+
+    def __init__(self, state=None, state_path=STATE_PATH):
+        self.state_path = Path(state_path)
+        state = state or {}
+        self.feature_names = state.get('feature_names', [])
+        self.edges = np.array(state['edges']) if state.get('edges') else None
+        self.reference = np.array(state['reference']) if state.get('reference') else None
+        self.live = np.array(state['live']) if state.get('live') else None
+        self.live_weight = state.get('live_weight', 0.0)
+        self.pending_reference = deque(state.get('pending_reference', []), maxlen=REFERENCE_SIZE)
+        self.outcomes = deque(state.get('outcomes', []), maxlen=OUTCOME_WINDOW)
+        self.baseline_brier = state.get('baseline_brier')
+        self.adwin = Adwin(**state.get('adwin', {}))
+        self.change_detected_at = state.get('change_detected_at')
+        self.updated_at = state.get('updated_at')
+
+    @classmethod
+    def load(cls, state_path=STATE_PATH):
+        path = Path(state_path)
+        if path.exists():
+            try:
+                with open(path) as f:
+                    return cls(json.load(f), path)
+            except (OSError, ValueError) as e:
+                logger.warning(f"⚠️ Resetting unreadable drift state {path}: {e}")
+        return cls(state_path=path)
+
+    def save(self):
+        state = {
+            'feature_names': self.feature_names,
+            'edges': self.edges.tolist() if self.edges is not None else None,
+            'reference': self.reference.tolist() if self.reference is not None else None,
+            'live': self.live.tolist() if self.live is not None else None,
+            'live_weight': self.live_weight,
+            'pending_reference': list(self.pending_reference),
+            'outcomes': list(self.outcomes),
+            'baseline_brier': self.baseline_brier,
+            'adwin': self.adwin.to_dict(),
+            'change_detected_at': self.change_detected_at,
+            'updated_at': datetime.now().isoformat(),
+        }
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_path.with_suffix('.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(state, f)
+        tmp.replace(self.state_path)
+
+    # ---- feature drift -------------------------------------------------
+
+    def set_reference(self, X, feature_names=None):
+        """Quantile bins + reference proportions from training data; clears live state"""
+        X = np.asarray(X, dtype=np.float64)
+        quantiles = np.linspace(0, 1, N_BINS + 1)[1:-1]
+        self.edges = np.quantile(X, quantiles, axis=0).T            # (n_features, N_BINS - 1)
+        self.reference = self._proportions(self._histogram(X))
+        self.live = np.zeros_like(self.reference)
+        self.live_weight = 0.0
+        self.pending_reference.clear()
+        if feature_names is not None:
+            self.feature_names = list(feature_names)
+
+    def _histogram(self, X):
+        counts = np.zeros((X.shape[1], N_BINS))
+        for j in range(X.shape[1]):
+            counts[j] = np.bincount(np.searchsorted(self.edges[j], X[:, j], side='right'), minlength=N_BINS)
+        return counts
+
+    @staticmethod
+    def _proportions(counts):
+        return (counts + EPS) / (counts.sum(axis=1, keepdims=True) + EPS * counts.shape[1])
+
+    def _matches_schema(self, X, feature_names):
+        if self.edges is not None and X.shape[1] != len(self.edges):
+            return False
+        if self.pending_reference and X.shape[1] != len(self.pending_reference[0]):
+            return False
+        if feature_names is not None and self.feature_names and list(feature_names) != self.feature_names:
+            return False
+        return True
+
+    def _rebootstrap(self, feature_names):
+        """Drop a reference built for another feature schema; the next live rows become the new one"""
+        self.edges = self.reference = self.live = None
+        self.live_weight = 0.0
+        self.pending_reference.clear()
+        self.feature_names = list(feature_names) if feature_names is not None else []
+
+    def observe_features(self, X, feature_names=None):
+        """
+        Fold a batch of live feature rows into the decayed histograms (O(features) per row).
+        Rows whose column count / names differ from the reference re-bootstrap it from live data.
+        """
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        if not self._matches_schema(X, feature_names):
+            logger.warning(f"⚠️ Drift reference has {len(self.edges) if self.edges is not None else 'no'} features, "
+                           f"live rows have {X.shape[1]} - rebuilding the reference from live data")
+            self._rebootstrap(feature_names)
+        elif feature_names is not None and not self.feature_names:
+            self.feature_names = list(feature_names)
+        if self.edges is None:
+            self.pending_reference.extend(X.tolist())
+            if len(self.pending_reference) == REFERENCE_SIZE:
+                self.set_reference(np.array(self.pending_reference))
+            return
+        columns = np.arange(X.shape[1])
+        for row in X:
+            bins = np.array([np.searchsorted(self.edges[j], row[j], side='right') for j in columns])
+            self.live *= DECAY
+            self.live[columns, bins] += 1
+            self.live_weight = self.live_weight * DECAY + 1
+
+    def psi(self):
+        """Population stability index per feature (None until enough live weight)"""
+        if self.reference is None or self.live_weight < MIN_LIVE_WEIGHT:
+            return None
+        live = self._proportions(self.live)
+        values = ((live - self.reference) * np.log(live / self.reference)).sum(axis=1)
+        names = self.feature_names or [f"f{j}" for j in range(len(values))]
+        return dict(zip(names, values.round(4).tolist()))
+
+    # ---- performance drift ---------------------------------------------
+
+    def observe_outcome(self, home_prob, home_win):
+        """Record one settled prediction (P(home win) vs actual)"""
+        p = min(max(float(home_prob), EPS), 1 - EPS)
+        y = 1.0 if home_win else 0.0
+        brier = (p - y) ** 2
+        loss = -(y * math.log(p) + (1 - y) * math.log(1 - p))
+        self.outcomes.append([brier, loss])
+        if self.baseline_brier is None and len(self.outcomes) == OUTCOME_WINDOW:
+            self.baseline_brier = self.rolling()['brier']
+        if self.adwin.update(loss):
+            self.change_detected_at = datetime.now().isoformat()
+            logger.warning(f"⚠️ ADWIN: log-loss regime change (window now {self.adwin.width})")
+
+    def rolling(self):
+        if not self.outcomes:
+            return None
+        values = np.array(self.outcomes)
+        return {'n': len(values), 'brier': float(values[:, 0].mean()), 'log_loss': float(values[:, 1].mean())}
+
+    # ---- decision ------------------------------------------------------
+
+    def status(self):
+        psi = self.psi() or {}
+        shifted = {name: value for name, value in psi.items() if value > PSI_THRESHOLD}
+        rolling = self.rolling()
+        degraded = bool(rolling and self.baseline_brier and rolling['n'] == OUTCOME_WINDOW
+                        and rolling['brier'] > self.baseline_brier * (1 + BRIER_TOLERANCE))
+        reasons = []
+        if shifted:
+            reasons.append(f"{len(shifted)} feature(s) with PSI > {PSI_THRESHOLD}")
+        if degraded:
+            reasons.append(f"rolling Brier {rolling['brier']:.4f} vs baseline {self.baseline_brier:.4f}")
+        if self.change_detected_at:
+            reasons.append(f"ADWIN change at {self.change_detected_at}")
+        return {
+            'retrain': bool(reasons),
+            'reasons': reasons,
+            'shifted_features': dict(sorted(shifted.items(), key=lambda kv: -kv[1])),
+            'max_psi': max(psi.values()) if psi else None,
+            'rolling': rolling,
+            'baseline_brier': self.baseline_brier,
+        }
+
+    def should_retrain(self):
+        return self.status()['retrain']
+
+    def reset_after_retrain(self, X_reference=None, feature_names=None):
+        """
+        New model: fresh performance baseline and a new reference distribution, from
+        the training rows when given, else from the next REFERENCE_SIZE live rows
+        """
+        if X_reference is not None:
+            self.set_reference(X_reference, feature_names)
+        else:
+            self._rebootstrap(self.feature_names or None)
+        self.outcomes.clear()
+        self.baseline_brier = None
+        self.adwin = Adwin()
+        self.change_detected_at = None
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    status = DriftMonitor.load().status()
+    print("\n📡 DRIFT MONITOR")
+    print("-" * 50)
+    print(f"  Retrain needed: {'YES' if status['retrain'] else 'no'}")
+    for reason in status['reasons']:
+        print(f"    - {reason}")
+    if status['max_psi'] is not None:
+        print(f"  Max PSI:        {status['max_psi']:.4f}")
+    if status['rolling']:
+        print(f"  Rolling Brier:  {status['rolling']['brier']:.4f} (n={status['rolling']['n']})")
+        print(f"  Rolling logloss:{status['rolling']['log_loss']:.4f}")
+    for name, value in list(status['shifted_features'].items())[:10]:
+        print(f"    {name:<35} PSI {value:.3f}")
+    print("-" * 50)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Event-Driven Odds Backtest
+Replays timestamped odds snapshots (line movement tracker format) and model
+prediction events in timestamp order and simulates betting at a fixed time
+before kickoff:
+  - snapshot streams are merged lazily with heapq.merge (one line in memory per stream)
+  - bet / close events are scheduled on a heap as predictions arrive
+  - at kickoff the latest price is the closing line: closing-line value (CLV) and P&L
+Only the latest price per open match is kept (snapshots arriving after a
+match closed are ignored), so memory does not grow with the number of snapshots.
+
+Snapshot streams: .jsonl files (one snapshot per line, time-ordered) or the
+tracker's per-match <match_id>_odds.json histories, each snapshot being
+{match_id, timestamp, books: {book: {home, draw?, away}}}. The constant-memory
+claim holds for .jsonl streams only: heapq.merge primes every stream at once,
+so every per-match _odds.json history is json.load'ed up front.
+
+Usage:
+    python scripts/event_backtest.py --snapshots line_movement --results data/match_results.jsonl
+    python scripts/event_backtest.py --snapshots odds/2025.jsonl --minutes-before 120 --min-edge 0.02
+"""
+
+import argparse
+import glob
+import heapq
+import itertools
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+PREDICTIONS_GLOB = str(BASE_DIR / "data" / "predictions" / "*_predictions.json")
+LINE_MOVEMENT_DIR = BASE_DIR / "line_movement"
+OUTPUT_PATH = BASE_DIR / "results" / "event_backtest.json"
+
+STAKE = 100
+BET_MINUTES_BEFORE = 60     # place bets this long before kickoff
+SIDES = ('home', 'draw', 'away')
+
+# Event priorities at equal timestamps: prices first, then predictions, bets, closes
+SNAPSHOT, PREDICTION, BET, CLOSE = range(4)
+
+_sequence = itertools.count()
+
+
+def _epoch(value):
+    """ISO timestamp -> POSIX seconds (naive timestamps are taken as UTC)"""
+    ts = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.timestamp()
+
+
+def _event(timestamp, priority, match_id, payload):
+    # The sequence number keeps heap ordering total without comparing payloads
+    return (timestamp, priority, next(_sequence), match_id, payload)
+
+
+def iter_snapshot_stream(path):
+    """Snapshot events from one time-ordered stream file"""
+    path = Path(path)
+    if path.suffix == '.jsonl':
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    snapshot = json.loads(line)
+                    yield _event(_epoch(snapshot['timestamp']), SNAPSHOT, snapshot['match_id'], snapshot['books'])
+    else:
+        # Tracker history: one small JSON list per match
+        with open(path) as f:
+            history = json.load(f)
+        for snapshot in history:
+            yield _event(_epoch(snapshot['timestamp']), SNAPSHOT, snapshot['match_id'], snapshot['books'])
+
+
+def snapshot_paths(sources):
+    """Expand files / directories into stream files"""
+    paths = []
+    for source in sources:
+        source = Path(source)
+        if source.is_dir():
+            paths.extend(sorted(source.glob('*.jsonl')) + sorted(source.glob('*_odds.json')))
+        else:
+            paths.append(source)
+    return paths
+
+
+def load_prediction_events(pattern=PREDICTIONS_GLOB):
+    """
+    Prediction events from prediction_pipeline output files
+    (match_id, date + kickoff, generated_at, probabilities); sorted by availability time
+    """
+    events = []
+    for path in sorted(glob.glob(pattern)):
+        with open(path) as f:
+            output = json.load(f)
+        for pred in output.get('predictions', []):
+            probabilities = pred.get('probabilities') or {}
+            kickoff = _epoch(f"{pred['date']}T{pred.get('kickoff') or '15:00'}")
+            available = _epoch(pred.get('generated_at') or output.get('generated_at') or pred['date'])
+            events.append(_event(available, PREDICTION, pred['match_id'], {
+                'kickoff': kickoff,
+                'probabilities': {side: float(probabilities.get(side, 0.0)) for side in SIDES},
+            }))
+    events.sort()
+    return events
+
+
+def load_results(path):
+    """
+    {match_id: 'home' | 'draw' | 'away'} from JSON list or JSONL records with
+    match_id and either 'outcome' or home_score / away_score
+    """
+    path = Path(path)
+    with open(path) as f:
+        records = [json.loads(line) for line in f if line.strip()] if path.suffix == '.jsonl' else json.load(f)
+    results = {}
+    for record in records:
+        outcome = record.get('outcome')
+        if outcome is None and record.get('home_score') is not None:
+            diff = int(record['home_score']) - int(record['away_score'])
+            outcome = 'home' if diff > 0 else ('draw' if diff == 0 else 'away')
+        if outcome in SIDES:
+            results[record['match_id']] = outcome
+    return results
+
+
+class EventBacktester:
+    """Heap-ordered replay of odds snapshots and predictions with time-to-kickoff bet placement"""
+
+    def __init__(self, minutes_before=BET_MINUTES_BEFORE, min_edge=0.0, stake=STAKE, book=None):
+        self.lead = timedelta(minutes=minutes_before).total_seconds()
+        self.min_edge = min_edge
+        self.stake = stake
+        self.book = book
+        self.latest = {}        # match_id -> latest books snapshot (open matches only)
+        self.predictions = {}   # match_id -> prediction payload
+        self.open_bets = {}     # match_id -> bet awaiting the closing line
+        self.closed = set()     # match ids past kickoff; their late snapshots are dropped
+        self.bets = []
+        self.snapshots = 0
+
+    def price(self, match_id, side):
+        """Price for a side from the chosen book, or the best price across books"""
+        books = self.latest.get(match_id)
+        if not books:
+            return None
+        if self.book:
+            return (books.get(self.book) or {}).get(side)
+        prices = [odds[side] for odds in books.values() if odds.get(side)]
+        return max(prices) if prices else None
+
+    def run(self, snapshot_streams, prediction_events, results):
+        """
+        Replay everything in timestamp order
+        snapshot_streams: iterables of snapshot events (see iter_snapshot_stream)
+        prediction_events: time-ordered prediction events
+        results: {match_id: outcome} used to settle at close
+        """
+        self.results = results
+        feed = heapq.merge(*snapshot_streams, prediction_events)
+        scheduled = []
+        for event in feed:
+            while scheduled and scheduled[0] <= event:
+                self._handle(heapq.heappop(scheduled), scheduled)
+            self._handle(event, scheduled)
+        while scheduled:
+            self._handle(heapq.heappop(scheduled), scheduled)
+        return self.summary()
+
+    def _handle(self, event, scheduled):
+        timestamp, kind, _, match_id, payload = event
+        if kind == SNAPSHOT:
+            self.snapshots += 1
+            if match_id not in self.closed:
+                self.latest[match_id] = payload
+        elif kind == PREDICTION:
+            kickoff = payload['kickoff']
+            if timestamp >= kickoff:
+                return  # prediction published after kickoff: nothing to bet on
+            self.predictions[match_id] = payload
+            heapq.heappush(scheduled, _event(max(kickoff - self.lead, timestamp), BET, match_id, None))
+            heapq.heappush(scheduled, _event(kickoff, CLOSE, match_id, None))
+        elif kind == BET:
+            self._place(timestamp, match_id)
+        elif kind == CLOSE:
+            self._close(match_id)
+
+    def _place(self, timestamp, match_id):
+        prediction = self.predictions.get(match_id)
+        if prediction is None:
+            return
+        probabilities = prediction['probabilities']
+        side = max(SIDES, key=lambda s: probabilities[s])
+        odds = self.price(match_id, side)
+        if not odds:
+            return
+        edge = probabilities[side] * odds - 1
+        if edge < self.min_edge:
+            return
+        self.open_bets[match_id] = {
+            'match_id': match_id,
+            'side': side,
+            'prob': probabilities[side],
+            'odds': odds,
+            'edge': round(edge, 4),
+            'minutes_before': round((prediction['kickoff'] - timestamp) / 60, 1),
+        }
+
+    def _close(self, match_id):
+        bet = self.open_bets.pop(match_id, None)
+        if bet is not None:
+            closing = self.price(match_id, bet['side'])
+            bet['closing_odds'] = closing
+            bet['clv'] = round(bet['odds'] / closing - 1, 4) if closing else None
+            outcome = self.results.get(match_id)
+            if outcome is None:
+                bet['result'], bet['profit'] = 'pending', 0.0
+            elif outcome == bet['side']:
+                bet['result'], bet['profit'] = 'win', round(self.stake * (bet['odds'] - 1), 2)
+            else:
+                bet['result'], bet['profit'] = 'loss', -float(self.stake)
+            self.bets.append(bet)
+        # Match is over: drop its state so memory tracks open matches only
+        self.closed.add(match_id)
+        self.latest.pop(match_id, None)
+        self.predictions.pop(match_id, None)
+
+    def summary(self):
+        settled = [b for b in self.bets if b['result'] != 'pending']
+        with_clv = [b['clv'] for b in self.bets if b['clv'] is not None]
+        total_pl = sum(b['profit'] for b in settled)
+        return {
+            'snapshots': self.snapshots,
+            'bets': len(self.bets),
+            'settled': len(settled),
+            'wins': sum(b['result'] == 'win' for b in settled),
+            'total_pl': round(total_pl, 2),
+            'roi': round(total_pl / (len(settled) * self.stake) * 100, 2) if settled else 0.0,
+            'avg_clv': round(sum(with_clv) / len(with_clv), 4) if with_clv else None,
+            'beat_close_rate': round(sum(c > 0 for c in with_clv) / len(with_clv), 4) if with_clv else None,
+        }
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description='Event-driven odds snapshot backtest')
+    parser.add_argument('--snapshots', nargs='+', default=[str(LINE_MOVEMENT_DIR)],
+                        help='snapshot .jsonl files, tracker *_odds.json files or directories')
+    parser.add_argument('--predictions', default=PREDICTIONS_GLOB, help='glob of prediction pipeline outputs')
+    parser.add_argument('--results', required=True, help='match results (.json list or .jsonl)')
+    parser.add_argument('--minutes-before', type=float, default=BET_MINUTES_BEFORE)
+    parser.add_argument('--min-edge', type=float, default=0.0)
+    parser.add_argument('--book', help='bet with one sportsbook (default: best price)')
+    args = parser.parse_args()
+
+    streams = [iter_snapshot_stream(p) for p in snapshot_paths(args.snapshots)]
+    backtester = EventBacktester(args.minutes_before, args.min_edge, book=args.book)
+    summary = backtester.run(streams, load_prediction_events(args.predictions), load_results(args.results))
+
+    print("\n⏱️  EVENT BACKTEST")
+    print("=" * 60)
+    print(f"  Snapshots replayed: {summary['snapshots']:,} from {len(streams)} streams")
+    print(f"  Bets: {summary['bets']} ({summary['settled']} settled, {summary['wins']} won) "
+          f"at {args.minutes_before:.0f} min before kickoff")
+    print(f"  P&L: ${summary['total_pl']:+,.2f}  ROI: {summary['roi']:+.1f}%")
+    if summary['avg_clv'] is not None:
+        print(f"  Avg CLV: {summary['avg_clv']:+.2%}  Beat closing line: {summary['beat_close_rate']:.1%}")
+    print("=" * 60)
+
+    OUTPUT_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with open(OUTPUT_PATH, 'w') as f:
+        json.dump({'generated_at': datetime.now().isoformat(), 'params': vars(args),
+                   'summary': summary, 'bets': backtester.bets}, f, indent=2)
+    logger.info(f"💾 Saved event backtest to {OUTPUT_PATH}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Pluggable Task Execution
+One small interface for running training / CV / search / backtest tasks:
+  - local:   in the calling process (debugging, tiny jobs)
+  - process: a ProcessPoolExecutor on this host (default)
+  - dask:    a dask.distributed cluster (LocalCluster when no address is given)
+  - ray:     a Ray cluster (local Ray instance when no address is given)
+Large inputs are `put()` once into the backend's object store and passed to
+tasks by reference instead of being pickled or re-read per task (the process
+pool spills them to a temp file that each worker loads once). Remote Dask /
+Ray workers get the scripts/ modules shipped to them, so tasks defined here
+import there.
+
+Select a backend with get_backend('dask', address='tcp://scheduler:8786') or
+the EXECUTION_BACKEND / EXECUTION_ADDRESS environment variables.
+"""
+
+import logging
+import os
+import pickle
+import shutil
+import tempfile
+from abc import ABC, abstractmethod
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor
+from concurrent.futures import as_completed as futures_as_completed
+from concurrent.futures import wait as futures_wait
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+BACKENDS = ('local', 'process', 'dask', 'ray')
+DEFAULT_BACKEND = os.getenv('EXECUTION_BACKEND', 'process')
+DEFAULT_ADDRESS = os.getenv('EXECUTION_ADDRESS') or None
+
+# Objects put() by the process backend, per worker process: path -> object
+_SHARED = {}
+
+
+def _load_shared(path):
+    if path not in _SHARED:
+        with open(path, 'rb') as f:
+            _SHARED[path] = pickle.load(f)
+    return _SHARED[path]
+
+
+class SharedRef:
+    """Process-backend put() handle: pickles as a file path, unpickles as the object (loaded once per worker)"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def __reduce__(self):
+        return _load_shared, (self.path,)
+
+
+class ExecutionBackend(ABC):
+    """Base interface: submit / put / as_completed / result / map"""
+
+    name = 'base'
+    # True when every worker sees this host's filesystem (cached dataset files can be passed as paths)
+    shared_filesystem = True
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+
+    @abstractmethod
+    def submit(self, fn, *args, **kwargs):
+        """Schedule fn(*args, **kwargs); returns a future for result() / wait() / cancel()"""
+
+    def put(self, obj):
+        """Store a large input once; the returned handle can be passed to submit()"""
+        return obj
+
+    def as_completed(self, futures):
+        return futures_as_completed(futures)
+
+    def result(self, future):
+        return future.result()
+
+    def wait(self, futures, timeout=None):
+        """Block until one of `futures` finishes or `timeout` seconds pass; returns (done, pending) sets"""
+        return futures_wait(list(futures), timeout=timeout, return_when=FIRST_COMPLETED)
+
+    def cancel(self, futures):
+        """Give up on tasks (queued ones never start; running ones may not be interruptible)"""
+        for future in futures:
+            future.cancel()
+
+    def map(self, fn, *iterables):
+        """Run fn over the argument lists; results in input order"""
+        futures = [self.submit(fn, *args) for args in zip(*iterables)]
+        return [self.result(f) for f in futures]
+
+    def shutdown(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        return False
+
+
+class LocalBackend(ExecutionBackend):
+    """Runs each task immediately in the calling process"""
+
+    name = 'local'
+
+    def __init__(self, max_workers=None):
+        super().__init__(1)
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+class ProcessBackend(ExecutionBackend):
+    """Process pool on this host"""
+
+    name = 'process'
+
+    def __init__(self, max_workers=None):
+        super().__init__(max_workers)
+        self._pool = None
+        self._abandoned = False
+        self._shared_dir = None
+
+    def submit(self, fn, *args, **kwargs):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._pool.submit(fn, *args, **kwargs)
+
+    def put(self, obj):
+        """Pickle once to a temp file; tasks receive a path-sized handle instead of the object"""
+        if self._shared_dir is None:
+            self._shared_dir = tempfile.mkdtemp(prefix='execution-')
+        path = os.path.join(self._shared_dir, f"{len(os.listdir(self._shared_dir))}.pkl")
+        with open(path, 'wb') as f:
+            pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+        return SharedRef(path)
+
+    def cancel(self, futures):
+        running = [future for future in futures if not future.cancel()]
+        if running:
+            self._abandoned = True  # a hung worker would block shutdown(wait=True) forever
+
+    def shutdown(self):
+        if self._pool is not None:
+            if self._abandoned:
+                for process in list((self._pool._processes or {}).values()):
+                    process.terminate()
+                self._pool.shutdown(wait=False, cancel_futures=True)
+            else:
+                self._pool.shutdown(wait=True)
+            self._pool = None
+            self._abandoned = False
+        # After the pool: queued tasks still load their put() objects on shutdown(wait=True)
+        if self._shared_dir is not None:
+            shutil.rmtree(self._shared_dir, ignore_errors=True)
+            self._shared_dir = None
+
+
+class DaskBackend(ExecutionBackend):
+    """dask.distributed client; starts a LocalCluster when no scheduler address is given"""
+
+    name = 'dask'
+
+    def __init__(self, max_workers=None, address=None):
+        super().__init__(max_workers)
+        from dask.distributed import Client, LocalCluster
+
+        self._cluster = None
+        if address:
+            self.client = Client(address)
+            self.shared_filesystem = False
+            # Remote workers cannot import scripts/ from this checkout: ship the modules
+            for path in sorted(SCRIPTS_DIR.glob('*.py')):
+                self.client.upload_file(str(path), load=False)
+        else:
+            self._cluster = LocalCluster(n_workers=self.max_workers, threads_per_worker=1, processes=True)
+            self.client = Client(self._cluster)
+        logger.info(f"🌐 Dask backend: {self.client.dashboard_link}")
+
+    def submit(self, fn, *args, **kwargs):
+        return self.client.submit(fn, *args, pure=False, **kwargs)
+
+    def put(self, obj):
+        return self.client.scatter(obj, broadcast=True)
+
+    def as_completed(self, futures):
+        from dask.distributed import as_completed
+        return as_completed(list(futures))
+
+    def wait(self, futures, timeout=None):
+        import asyncio
+        from dask.distributed import wait
+        futures = list(futures)
+        try:
+            done, pending = wait(futures, timeout=timeout, return_when='FIRST_COMPLETED')
+        except (TimeoutError, asyncio.TimeoutError):
+            return set(), set(futures)
+        return set(done), set(pending)
+
+    def cancel(self, futures):
+        self.client.cancel(list(futures), force=True)
+
+    def shutdown(self):
+        self.client.close()
+        if self._cluster is not None:
+            self._cluster.close()
+
+
+class RayBackend(ExecutionBackend):
+    """Ray client; starts a local Ray instance when no cluster address is given"""
+
+    name = 'ray'
+
+    def __init__(self, max_workers=None, address=None):
+        super().__init__(max_workers)
+        import ray
+
+        self._ray = ray
+        self._remote_fns = {}
+        self._owns_ray = not ray.is_initialized()
+        if self._owns_ray:
+            # working_dir is uploaded to every worker and put on its import path
+            runtime_env = {'working_dir': str(SCRIPTS_DIR), 'excludes': ['__pycache__']}
+            if address:
+                ray.init(address=address, runtime_env=runtime_env)
+            else:
+                ray.init(num_cpus=self.max_workers, runtime_env=runtime_env)
+        self.shared_filesystem = not address
+        logger.info(f"🌐 Ray backend: {ray.cluster_resources().get('CPU', 0):.0f} CPUs")
+
+    def submit(self, fn, *args, **kwargs):
+        remote_fn = self._remote_fns.get(fn)
+        if remote_fn is None:
+            remote_fn = self._remote_fns[fn] = self._ray.remote(fn)
+        return remote_fn.remote(*args, **kwargs)
+
+    def put(self, obj):
+        return self._ray.put(obj)
+
+    def as_completed(self, futures):
+        pending = list(futures)
+        while pending:
+            done, pending = self._ray.wait(pending, num_returns=1)
+            yield from done
+
+    def result(self, future):
+        return self._ray.get(future)
+
+    def wait(self, futures, timeout=None):
+        done, pending = self._ray.wait(list(futures), num_returns=1, timeout=timeout)
+        return set(done), set(pending)
+
+    def cancel(self, futures):
+        for future in futures:
+            self._ray.cancel(future, force=True)
+
+    def shutdown(self):
+        if self._owns_ray:
+            self._ray.shutdown()
+
+
+def get_backend(name=None, max_workers=None, address=None):
+    """Create an execution backend by name (defaults from EXECUTION_BACKEND / EXECUTION_ADDRESS)"""
+    name = name or DEFAULT_BACKEND
+    address = address or DEFAULT_ADDRESS
+    if name == 'local':
+        return LocalBackend()
+    if name == 'process':
+        return ProcessBackend(max_workers)
+    if name == 'dask':
+        return DaskBackend(max_workers, address)
+    if name == 'ray':
+        return RayBackend(max_workers, address)
+    raise ValueError(f"Unknown execution backend '{name}' (choose from {BACKENDS})")
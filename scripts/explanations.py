@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Batched Prediction Explanations
+Per-feature contributions to P(home win) for a whole fixture batch in one call
+per ensemble member:
+  - XGBoost:      booster pred_contribs (TreeSHAP)
+  - LightGBM:     booster pred_contrib (TreeSHAP)
+  - CatBoost:     ShapValues feature importance
+  - RandomForest: tree-path (Saabas) attribution over all trees
+Member contributions are converted to probability points, weight-averaged like
+the ensemble itself, and the top contributors are turned into reasons using
+the feature descriptions in models/v5_proper_metadata.json.
+"""
+
+import json
+import logging
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+METADATA_PATH = BASE_DIR / "models" / "v5_proper_metadata.json"
+
+TOP_K = 4                   # reasons per prediction
+MIN_CONTRIBUTION = 0.005    # ignore contributors under half a probability point
+
+# Readable labels for feature-name tokens (metadata key_features take precedence)
+TOKEN_LABELS = {
+    'sot': 'shots on target',
+    'l5': 'last 5',
+    'ht': 'half-time',
+    '2h': '2nd-half',
+    'diff': 'difference',
+    'pct': '%',
+}
+
+
+def _sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-z))
+
+
+def _tree_path_contributions(forest, X):
+    """
+    Saabas attribution for a RandomForest: each split credits its feature with the
+    change in P(class 1) from parent to child, summed along the decision path.
+    One sparse (rows x nodes) @ (nodes x features) product per tree.
+    Returns: (contributions (n, F), bias (n,)) in probability units
+    """
+    from scipy.sparse import csr_matrix
+
+    n, n_features = X.shape
+    class_col = list(forest.classes_).index(1)
+    contributions = np.zeros((n, n_features))
+    bias = 0.0
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        values = tree.value[:, 0, :]
+        node_p = values[:, class_col] / values.sum(axis=1)
+
+        parent = np.full(tree.node_count, -1)
+        for children in (tree.children_left, tree.children_right):
+            is_split = children >= 0
+            parent[children[is_split]] = np.nonzero(is_split)[0]
+        child_nodes = np.nonzero(parent >= 0)[0]
+        split_of = parent[child_nodes]
+        deltas = csr_matrix(
+            (node_p[child_nodes] - node_p[split_of], (child_nodes, tree.feature[split_of])),
+            shape=(tree.node_count, n_features),
+        )
+        contributions += (estimator.decision_path(X) @ deltas).toarray()
+        bias += node_p[0]
+
+    n_trees = len(forest.estimators_)
+    return contributions / n_trees, np.full(n, bias / n_trees)
+
+
+def member_contributions(model, X, best_iteration=None):
+    """
+    Per-feature contributions of one binary member for a batch.
+    Returns: (contributions (n, F), bias (n,), is_logit) or None for unsupported members
+    """
+    model_type = type(model).__name__
+    if model_type == 'XGBClassifier':
+        import xgboost as xgb
+        raw = model.get_booster().predict(
+            xgb.DMatrix(X), pred_contribs=True, iteration_range=(0, best_iteration or 0)
+        )
+        return raw[:, :-1], raw[:, -1], True
+    if model_type == 'LGBMClassifier':
+        raw = model.booster_.predict(X, pred_contrib=True, num_iteration=best_iteration)
+        return raw[:, :-1], raw[:, -1], True
+    if model_type == 'CatBoostClassifier':
+        from catboost import Pool
+        raw = model.get_feature_importance(Pool(X), type='ShapValues')
+        return raw[:, :-1], raw[:, -1], True
+    if model_type == 'RandomForestClassifier':
+        contributions, bias = _tree_path_contributions(model, X)
+        return contributions, bias, False
+    return None
+
+
+def to_probability(contributions, bias, is_logit):
+    """
+    Rescale log-odds contributions so each row sums to P(member) - P(bias);
+    probability-unit contributions are returned unchanged
+    """
+    if not is_logit:
+        return contributions
+    total = contributions.sum(axis=1)
+    p_bias = _sigmoid(bias)
+    delta = _sigmoid(bias + total) - p_bias
+    # Near-zero totals: fall back to the sigmoid slope at the bias
+    safe_total = np.where(np.abs(total) > 1e-9, total, 1.0)
+    scale = np.where(np.abs(total) > 1e-9, delta / safe_total, p_bias * (1 - p_bias))
+    return contributions * scale[:, None]
+
+
+class ExplanationEngine:
+    """Weighted ensemble feature contributions and readable reasons for a batch"""
+
+    def __init__(self, model_bundle, metadata_path=METADATA_PATH):
+        self.models = model_bundle.get('models', {})
+        self.weights = model_bundle.get('weights', {})
+        self.scaler = model_bundle.get('scaler')
+        self.best_iterations = model_bundle.get('best_iterations') or {}
+        self.descriptions = {}
+        feature_names = model_bundle.get('features') or model_bundle.get('feature_names')
+        try:
+            with open(metadata_path) as f:
+                metadata = json.load(f)
+            feature_names = feature_names or metadata.get('features')
+            self.descriptions = metadata.get('key_features', {})
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ No feature metadata for explanations ({e})")
+        self.feature_names = list(feature_names or [])
+
+    def contributions(self, X_raw):
+        """
+        Ensemble contributions to P(home win), in probability points.
+        Returns: (n, F) array; rows sum to the ensemble's deviation from its base rate
+        """
+        X = np.asarray(X_raw, dtype=np.float64)
+        if self.scaler is not None:
+            X = self.scaler.transform(X)
+
+        total = np.zeros(X.shape)
+        total_weight = 0.0
+        for name, model in self.models.items():
+            result = member_contributions(model, X, self.best_iterations.get(name))
+            if result is None:
+                logger.debug(f"No contribution method for {name} ({type(model).__name__})")
+                continue
+            weight = self.weights.get(name, 1.0 / len(self.models))
+            total += weight * to_probability(*result)
+            total_weight += weight
+        return total / total_weight if total_weight else total
+
+    def label(self, feature, home_team, away_team):
+        """Readable label: metadata description when available, else the expanded feature name"""
+        side, base = None, feature
+        for suffix, team in (('_home', home_team), ('_away', away_team)):
+            if feature.endswith(suffix):
+                side, base = team, feature[:-len(suffix)]
+        if feature in self.descriptions:
+            text = self.descriptions[feature]
+        elif base in self.descriptions:
+            text = self.descriptions[base]
+        else:
+            words = [TOKEN_LABELS.get(token, token) for token in base.split('_')]
+            if words[0] in ('home', 'away'):
+                side = home_team if words[0] == 'home' else away_team
+                words = words[1:]
+            text = ' '.join(words)
+            text = text[:1].upper() + text[1:]
+        return f"{side}: {text}" if side else text
+
+    def explain_batch(self, X_raw, matches, top_k=TOP_K):
+        """
+        Explanations for a batch of fixtures.
+        matches: [(home_team, away_team)] in the same row order as X_raw
+        Returns: one dict per row with 'factors' [{feature, value, contribution}] and 'reasons' [str]
+        """
+        X_raw = np.asarray(X_raw)
+        contributions = self.contributions(X_raw)
+        order = np.argsort(-np.abs(contributions), axis=1)[:, :top_k]
+
+        explanations = []
+        for i, (home_team, away_team) in enumerate(matches):
+            factors, reasons = [], []
+            for j in order[i]:
+                contribution = float(contributions[i, j])
+                if abs(contribution) < MIN_CONTRIBUTION:
+                    continue
+                feature = self.feature_names[j] if j < len(self.feature_names) else f"f{j}"
+                value = float(X_raw[i, j])
+                favours = home_team if contribution > 0 else away_team
+                factors.append({'feature': feature, 'value': round(value, 3),
+                                'contribution': round(contribution, 4)})
+                reasons.append(f"{self.label(feature, home_team, away_team)} ({value:.2f}) "
+                               f"favours {favours} ({contribution * 100:+.1f} pts home win)")
+            explanations.append({'factors': factors, 'reasons': reasons})
+        return explanations
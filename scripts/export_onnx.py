@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+ONNX Export for the V5 Proper Ensemble
+Converts the scaler and every ensemble member into ONE ONNX graph
+(weighted averaging + temperature calibration included) so inference can run
+on onnxruntime's CPU provider instead of four Python ML libraries.
+
+Usage:
+    python scripts/export_onnx.py                 # export + parity check
+    python scripts/export_onnx.py --benchmark     # also compare throughput
+"""
+
+import argparse
+import logging
+import pickle
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from model_store import load_bundle
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+MODEL_PATH = BASE_DIR / "models" / "ensemble_model_v5_proper.pkl"
+ONNX_PATH = BASE_DIR / "models" / "ensemble_model_v5_proper.onnx"
+
+# Graph interface (shared with the onnxruntime backend in prediction_pipeline)
+INPUT_NAME = 'features'
+PROBA_OUTPUT = 'probabilities'              # weighted ensemble class probabilities, shape (N, 2)
+CALIBRATED_OUTPUT = 'home_prob_calibrated'  # temperature-scaled P(home win), shape (N, 1)
+
+DEFAULT_TEMPERATURE = 2.5  # must match real_predictions.calibrate_probability
+TARGET_OPSET = 15
+ML_OPSET = 3
+
+
+def _convert_member(name, model, n_features, best_iteration=None):
+    """Convert a single ensemble member to an ONNX ModelProto"""
+    import onnx
+    from onnxmltools.convert.common.data_types import FloatTensorType
+
+    initial_types = [('input', FloatTensorType([None, n_features]))]
+    model_type = type(model).__name__
+
+    if model_type == 'XGBClassifier':
+        from onnxmltools import convert_xgboost
+        if best_iteration:
+            # Export only the trees kept by early stopping (LightGBM/CatBoost dumps already honour it)
+            import copy
+            model = copy.copy(model)
+            model._Booster = model.get_booster()[:best_iteration]
+        return convert_xgboost(model, initial_types=initial_types, target_opset=TARGET_OPSET)
+
+    if model_type == 'LGBMClassifier':
+        from onnxmltools import convert_lightgbm
+        return convert_lightgbm(model, initial_types=initial_types, target_opset=TARGET_OPSET, zipmap=False)
+
+    if model_type == 'CatBoostClassifier':
+        # CatBoost ships its own exporter; round-trip through a temp file
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / f"{name}.onnx"
+            model.save_model(str(path), format='onnx')
+            return onnx.load(str(path))
+
+    # Anything else is expected to be a scikit-learn estimator (RandomForest)
+    from skl2onnx import convert_sklearn
+    from skl2onnx.common.data_types import FloatTensorType as SklFloatTensorType
+    return convert_sklearn(
+        model,
+        initial_types=[('input', SklFloatTensorType([None, n_features]))],
+        options={id(model): {'zipmap': False}},
+        target_opset={'': TARGET_OPSET, 'ai.onnx.ml': ML_OPSET},
+    )
+
+
+def _strip_zipmap(proto):
+    """Replace ZipMap (sequence-of-maps) outputs with the raw probability tensor"""
+    from onnx import helper, TensorProto
+
+    graph = proto.graph
+    for node in list(graph.node):
+        if node.op_type != 'ZipMap':
+            continue
+        tensor_name, map_name = node.input[0], node.output[0]
+        graph.node.remove(node)
+        for output in graph.output:
+            if output.name == map_name:
+                output.CopyFrom(helper.make_tensor_value_info(tensor_name, TensorProto.FLOAT, [None, None]))
+    return proto
+
+
+def _probability_output(proto):
+    """Name of the member graph's class-probability output"""
+    for output in proto.graph.output:
+        if 'prob' in output.name.lower():
+            return output.name
+    raise ValueError(f"No probability output found in graph outputs: {[o.name for o in proto.graph.output]}")
+
+
+def build_ensemble_graph(model_data, temperature=DEFAULT_TEMPERATURE):
+    """
+    Build one ONNX graph: features -> scaler -> members -> weighted average -> calibration
+    Returns: onnx.ModelProto
+    """
+    import onnx
+    from onnx import helper, numpy_helper, TensorProto
+    from onnx.compose import add_prefix
+
+    models = model_data['models']
+    weights = model_data.get('weights', {})
+    scaler = model_data.get('scaler')
+    n_features = len(model_data.get('features') or model_data.get('feature_names') or []) or int(scaler.n_features_in_)
+
+    nodes, initializers = [], []
+    opsets = {'': TARGET_OPSET, 'ai.onnx.ml': ML_OPSET}
+    ir_version = 7
+
+    # 1. StandardScaler as (x - mean) / scale
+    current = INPUT_NAME
+    if scaler is not None:
+        if getattr(scaler, 'mean_', None) is not None and scaler.with_mean:
+            initializers.append(numpy_helper.from_array(scaler.mean_.astype(np.float32), 'scaler_mean'))
+            nodes.append(helper.make_node('Sub', [current, 'scaler_mean'], ['centered']))
+            current = 'centered'
+        if getattr(scaler, 'scale_', None) is not None and scaler.with_std:
+            initializers.append(numpy_helper.from_array(scaler.scale_.astype(np.float32), 'scaler_scale'))
+            nodes.append(helper.make_node('Div', [current, 'scaler_scale'], ['scaled']))
+            current = 'scaled'
+
+    # 2. Ensemble members, each wired to the scaled input
+    total_weight = sum(weights.get(name, 1.0 / len(models)) for name in models)
+    weighted_outputs = []
+    for name, model in models.items():
+        logger.info(f"  Converting {name} ({type(model).__name__})...")
+        best_iteration = (model_data.get('best_iterations') or {}).get(name)
+        member = _strip_zipmap(_convert_member(name, model, n_features, best_iteration))
+        member = add_prefix(member, prefix=f"{name}/")
+        member_input = member.graph.input[0].name
+
+        nodes.append(helper.make_node('Identity', [current], [member_input], name=f"{name}/feed"))
+        nodes.extend(member.graph.node)
+        initializers.extend(member.graph.initializer)
+        for opset in member.opset_import:
+            opsets[opset.domain] = max(opsets.get(opset.domain, 0), opset.version)
+        ir_version = max(ir_version, member.ir_version)
+
+        weight = weights.get(name, 1.0 / len(models)) / total_weight
+        initializers.append(numpy_helper.from_array(np.array(weight, dtype=np.float32), f"{name}/weight"))
+        nodes.append(helper.make_node('Mul', [_probability_output(member), f"{name}/weight"], [f"{name}/weighted"]))
+        weighted_outputs.append(f"{name}/weighted")
+
+    nodes.append(helper.make_node('Sum', weighted_outputs, [PROBA_OUTPUT]))
+
+    # 3. Temperature calibration on P(home win), mirroring calibrate_probability()
+    initializers.extend([
+        numpy_helper.from_array(np.array([1], dtype=np.int64), 'home_class'),
+        numpy_helper.from_array(np.array(0.001, dtype=np.float32), 'clip_min'),
+        numpy_helper.from_array(np.array(0.999, dtype=np.float32), 'clip_max'),
+        numpy_helper.from_array(np.array(1.0, dtype=np.float32), 'one'),
+        numpy_helper.from_array(np.array(temperature, dtype=np.float32), 'temperature'),
+    ])
+    nodes.extend([
+        helper.make_node('Gather', [PROBA_OUTPUT, 'home_class'], ['home_raw'], axis=1),
+        helper.make_node('Clip', ['home_raw', 'clip_min', 'clip_max'], ['home_clipped']),
+        helper.make_node('Sub', ['one', 'home_clipped'], ['not_home']),
+        helper.make_node('Div', ['home_clipped', 'not_home'], ['odds_ratio']),
+        helper.make_node('Log', ['odds_ratio'], ['logit']),
+        helper.make_node('Div', ['logit', 'temperature'], ['scaled_logit']),
+        helper.make_node('Sigmoid', ['scaled_logit'], [CALIBRATED_OUTPUT]),
+    ])
+
+    graph = helper.make_graph(
+        nodes,
+        'kicklab_v5_ensemble',
+        inputs=[helper.make_tensor_value_info(INPUT_NAME, TensorProto.FLOAT, [None, n_features])],
+        outputs=[
+            helper.make_tensor_value_info(PROBA_OUTPUT, TensorProto.FLOAT, [None, 2]),
+            helper.make_tensor_value_info(CALIBRATED_OUTPUT, TensorProto.FLOAT, [None, 1]),
+        ],
+        initializer=initializers,
+    )
+    proto = helper.make_model(
+        graph,
+        opset_imports=[helper.make_opsetid(domain, version) for domain, version in opsets.items()],
+        producer_name='kicklab-export-onnx',
+    )
+    proto.ir_version = ir_version
+    helper.set_model_props(proto, {
+        'version': str(model_data.get('version', 'v5_proper')),
+        'members': ','.join(models.keys()),
+        'temperature': str(temperature),
+    })
+    onnx.checker.check_model(proto)
+    return proto
+
+
+def load_onnx_session(onnx_path=ONNX_PATH, num_threads=0):
+    """Create an onnxruntime CPU session (num_threads=0 lets ORT use every core)"""
+    import onnxruntime as ort
+
+    if not Path(onnx_path).exists():
+        raise FileNotFoundError(f"ONNX model not found: {onnx_path} (run scripts/export_onnx.py)")
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.intra_op_num_threads = num_threads
+    session = ort.InferenceSession(str(onnx_path), sess_options=options, providers=['CPUExecutionProvider'])
+    logger.info(f"✅ Loaded ONNX model from {onnx_path}")
+    return session
+
+
+def reference_predict(model_data, X, temperature=DEFAULT_TEMPERATURE):
+    """Python-library reference path: scaler -> members -> np.average -> calibration"""
+    from real_predictions import calibrate_probability
+
+    models = model_data['models']
+    weights = model_data.get('weights', {})
+    scaler = model_data.get('scaler')
+    scaled = scaler.transform(X) if scaler is not None else X
+
+    probas = [m.predict_proba(scaled) for m in models.values()]
+    w_list = [weights.get(name, 1.0 / len(models)) for name in models]
+    avg = np.average(probas, axis=0, weights=w_list)
+    return avg, calibrate_probability(avg[:, 1], temperature=temperature)
+
+
+def _sample_features(model_data, n_samples, seed=42):
+    """Draw plausible feature vectors around the scaler's training distribution"""
+    rng = np.random.default_rng(seed)
+    scaler = model_data.get('scaler')
+    if scaler is not None and getattr(scaler, 'mean_', None) is not None:
+        return (scaler.mean_ + rng.standard_normal((n_samples, len(scaler.mean_))) * scaler.scale_).astype(np.float32)
+    n_features = len(model_data.get('features') or model_data.get('feature_names'))
+    return rng.standard_normal((n_samples, n_features)).astype(np.float32)
+
+
+def verify_parity(model_data, session, n_samples=1000, atol=1e-3):
+    """Compare ONNX outputs against the Python reference path"""
+    X = _sample_features(model_data, n_samples)
+    ref_proba, ref_cal = reference_predict(model_data, X.astype(np.float64))
+    onnx_proba, onnx_cal = session.run([PROBA_OUTPUT, CALIBRATED_OUTPUT], {INPUT_NAME: X})
+
+    proba_diff = np.abs(onnx_proba - ref_proba).max(axis=1)
+    cal_diff = np.abs(onnx_cal[:, 0] - ref_cal)
+    pick_agreement = float(np.mean(onnx_proba.argmax(axis=1) == ref_proba.argmax(axis=1)))
+
+    logger.info("=" * 60)
+    logger.info("PARITY CHECK (ONNX vs Python libraries)")
+    logger.info("=" * 60)
+    logger.info(f"  Samples:               {n_samples}")
+    logger.info(f"  Max |Δ| probabilities: {proba_diff.max():.2e} (p99 {np.percentile(proba_diff, 99):.2e})")
+    logger.info(f"  Max |Δ| calibrated:    {cal_diff.max():.2e} (p99 {np.percentile(cal_diff, 99):.2e})")
+    logger.info(f"  Pick agreement:        {pick_agreement*100:.2f}%")
+
+    # Float32 tree thresholds can flip a handful of borderline splits, so gate on p99
+    passed = bool(np.percentile(proba_diff, 99) <= atol and np.percentile(cal_diff, 99) <= atol)
+    logger.info(f"  Result: {'✅ PASS' if passed else '❌ FAIL'} (atol={atol})")
+    return {
+        'passed': passed,
+        'max_proba_diff': float(proba_diff.max()),
+        'max_calibrated_diff': float(cal_diff.max()),
+        'pick_agreement': pick_agreement,
+    }
+
+
+def benchmark_throughput(model_data, session, batch_sizes=(1, 10, 100, 1000), min_seconds=1.0):
+    """Rows/second for the Python-library path vs onnxruntime, per batch size"""
+    results = []
+    print("\nThroughput comparison (rows/sec):")
+    print("-" * 60)
+    print(f"{'Batch':<10} {'Python libs':>15} {'onnxruntime':>15} {'Speed-up':>12}")
+    print("-" * 60)
+
+    for batch_size in batch_sizes:
+        X = _sample_features(model_data, batch_size, seed=batch_size)
+        X64 = X.astype(np.float64)
+
+        def _rate(fn):
+            fn()  # warm-up
+            runs, start = 0, time.perf_counter()
+            while time.perf_counter() - start < min_seconds:
+                fn()
+                runs += 1
+            return runs * batch_size / (time.perf_counter() - start)
+
+        py_rate = _rate(lambda: reference_predict(model_data, X64))
+        ort_rate = _rate(lambda: session.run([PROBA_OUTPUT, CALIBRATED_OUTPUT], {INPUT_NAME: X}))
+        results.append({'batch_size': batch_size, 'python_rows_per_sec': py_rate, 'onnx_rows_per_sec': ort_rate})
+        print(f"{batch_size:<10} {py_rate:>15,.0f} {ort_rate:>15,.0f} {ort_rate / py_rate:>11.1f}x")
+
+    print("-" * 60)
+    return results
+
+
+def export(model_path=MODEL_PATH, onnx_path=ONNX_PATH, temperature=DEFAULT_TEMPERATURE, ref=None):
+    """Load the ensemble (model store reference or pickle), build the ONNX graph and save it"""
+    if ref:
+        model_data = load_bundle(ref)
+        model_path = f"model store '{ref}'"
+    else:
+        with open(model_path, 'rb') as f:
+            model_data = pickle.load(f)
+    logger.info(f"✅ Loaded ensemble from {model_path} ({', '.join(model_data['models'].keys())})")
+
+    proto = build_ensemble_graph(model_data, temperature=temperature)
+    onnx_path = Path(onnx_path)
+    onnx_path.parent.mkdir(parents=True, exist_ok=True)
+    onnx_path.write_bytes(proto.SerializeToString())
+    logger.info(f"💾 Saved ONNX graph to {onnx_path} ({onnx_path.stat().st_size / 1024:.0f} KB)")
+    return model_data, onnx_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export the V5 ensemble to a single ONNX graph')
+    parser.add_argument('--model', type=Path, default=MODEL_PATH)
+    parser.add_argument('--ref', help="model store alias or id (e.g. 'production'); overrides --model")
+    parser.add_argument('--output', type=Path, default=ONNX_PATH)
+    parser.add_argument('--temperature', type=float, default=DEFAULT_TEMPERATURE)
+    parser.add_argument('--threads', type=int, default=0, help='onnxruntime intra-op threads (0 = all cores)')
+    parser.add_argument('--benchmark', action='store_true', help='compare throughput against the Python libraries')
+    args = parser.parse_args()
+
+    model_data, onnx_path = export(args.model, args.output, args.temperature, args.ref)
+    session = load_onnx_session(onnx_path, num_threads=args.threads)
+
+    parity = verify_parity(model_data, session)
+    if args.benchmark:
+        benchmark_throughput(model_data, session)
+
+    return 0 if parity['passed'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -5,15 +5,30 @@ Converts real prediction JSON files into docs/data/results.json
 so results_verified.html can load live, real data.
 
 Run after each gameweek settles, or via cron.
+
+Incremental: a manifest records each picks file's mtime, size and content
+hash next to its cached converted results, so only new or changed files are
+re-parsed. The deduplicated result set is cached as well (merged.json, every
+candidate row per match + date key), so only the changed files' rows are merged
+into it, and results.json is rewritten only when its content changes.
+Pass --full to rebuild everything.
 """
 
 import json
 import os
 import glob
+import hashlib
+import sys
 from datetime import datetime
 
-PICKS_DIR   = os.path.join(os.path.dirname(__file__), '..', 'docs', 'data', 'predictions')
-OUTPUT_FILE = os.path.join(os.path.dirname(__file__), '..', 'docs', 'data', 'results.json')
+from publish import publish, write_atomic
+
+PICKS_DIR     = os.path.join(os.path.dirname(__file__), '..', 'docs', 'data', 'predictions')
+OUTPUT_FILE   = os.path.join(os.path.dirname(__file__), '..', 'docs', 'data', 'results.json')
+CACHE_DIR     = os.path.join(os.path.dirname(__file__), '..', 'data', 'cache', 'results_json')
+MANIFEST_FILE = os.path.join(CACHE_DIR, 'manifest.json')
+MERGED_FILE   = os.path.join(CACHE_DIR, 'merged.json')
+MANIFEST_VERSION = 1  # bump when pick_to_result changes so cached conversions are rebuilt
 
 def parse_date_str(date_str):
     """Convert 'Sat 21 Feb' or '2026-02-21' to ISO date string."""
@@ -69,46 +84,154 @@ def pick_to_result(pick, file_date):
     }
 
 
-def main():
-    results = []
-    seen    = set()  # dedup key: match + date
+def sha1_bytes(data):
+    return hashlib.sha1(data).hexdigest()
+
+
+def load_manifest():
+    try:
+        with open(MANIFEST_FILE, 'r') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {'version': MANIFEST_VERSION, 'files': {}, 'output_sha1': None}
+    if manifest.get('version') != MANIFEST_VERSION:
+        return {'version': MANIFEST_VERSION, 'files': {}, 'output_sha1': None}
+    return manifest
+
+
+def cache_path(filename):
+    return os.path.join(CACHE_DIR, filename)
+
+
+def convert_file(filepath, filename):
+    """Parse one picks file into its deduplication-ready result list (None on read error)"""
+    file_date = filename.replace('picks_', '').replace('.json', '')  # e.g. 2026-02-21
+    with open(filepath, 'rb') as f:
+        raw = f.read()
+    try:
+        data = json.loads(raw)
+    except Exception as e:
+        print(f"  ⚠️  Error reading {filename}: {e}")
+        return raw, None
+
+    picks   = data if isinstance(data, list) else data.get('picks', [])
+    results = [r for r in (pick_to_result(pick, file_date) for pick in picks) if r is not None]
+    print(f"  {filename}: {len(picks)} picks → {len(results)} settled results")
+    return raw, results
 
-    # Find all picks_YYYY-MM-DD.json files
-    pattern = os.path.join(PICKS_DIR, 'picks_*.json')
-    files   = sorted(glob.glob(pattern))
-    print(f"Found {len(files)} pick files")
 
-    for filepath in files:
-        filename  = os.path.basename(filepath)
-        file_date = filename.replace('picks_', '').replace('.json', '')  # e.g. 2026-02-21
+def refresh_files(manifest, files):
+    """
+    Bring the manifest and per-file caches up to date with the picks files on disk.
+    Only files whose mtime/size changed are read; only content changes are re-converted.
+    Returns: ({filename: new results, None when removed} for changed files, files only touched)
+    """
+    entries = manifest['files']
+    names   = {os.path.basename(path): path for path in files}
+    changed = {}
+    touched = 0
 
-        try:
-            with open(filepath, 'r') as f:
-                data = json.load(f)
-        except Exception as e:
-            print(f"  ⚠️  Error reading {filename}: {e}")
+    for filename in [name for name in entries if name not in names]:
+        del entries[filename]
+        if os.path.exists(cache_path(filename)):
+            os.remove(cache_path(filename))
+        changed[filename] = None
+
+    for filename, filepath in names.items():
+        stat  = os.stat(filepath)
+        entry = entries.get(filename)
+        if entry and entry['mtime_ns'] == stat.st_mtime_ns and entry['size'] == stat.st_size \
+                and os.path.exists(cache_path(filename)):
+            continue
+
+        raw, results = convert_file(filepath, filename)
+        digest = sha1_bytes(raw)
+        if entry and entry['sha1'] == digest and os.path.exists(cache_path(filename)):
+            entry.update({'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size})  # touched, same content
+            touched += 1
             continue
+        if results is None:
+            continue  # unreadable: keep the previous conversion, retry next run
+
+        write_atomic(cache_path(filename), json.dumps(results).encode(), fsync=False)
+        entries[filename] = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size,
+                             'sha1': digest, 'count': len(results)}
+        changed[filename] = results
+    return changed, touched
+
+
+def load_merged():
+    try:
+        with open(MERGED_FILE, 'r') as f:
+            merged = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return merged if merged.get('version') == MANIFEST_VERSION else None
 
-        picks = data if isinstance(data, list) else data.get('picks', [])
-        file_results = 0
 
-        for pick in picks:
-            r = pick_to_result(pick, file_date)
-            if r is None:
-                continue
+def apply_file(merged, filename, results):
+    """Replace one picks file's rows in the merged set (results None: the file was removed)"""
+    candidates = merged['candidates']  # dedup key (match + date) -> {filename: [position, result]}
+    for dedup_key in merged['keys'].pop(filename, []):
+        owners = candidates.get(dedup_key, {})
+        owners.pop(filename, None)
+        if not owners:
+            candidates.pop(dedup_key, None)
+    if results is None:
+        return
+    keys = []
+    for position, r in enumerate(results):
+        dedup_key = f"{r['match']}|{r['date']}"
+        owners = candidates.setdefault(dedup_key, {})
+        if filename in owners:
+            continue  # first occurrence within the file wins
+        owners[filename] = [position, r]
+        keys.append(dedup_key)
+    merged['keys'][filename] = keys
 
-            dedup_key = f"{r['match']}|{r['date']}"
-            if dedup_key in seen:
-                continue
-            seen.add(dedup_key)
 
-            results.append(r)
-            file_results += 1
+def merge_results(manifest, changed, full=False):
+    """
+    Deduplicated results, newest first; for each match + date the row of the earliest
+    file (then earliest position) wins. Only `changed` files are merged into the cached
+    set; it is rebuilt from every per-file cache when missing or out of step.
+    """
+    merged = None if full else load_merged()
+    if merged is not None:
+        for filename, results in changed.items():
+            apply_file(merged, filename, results)
+        if set(merged['keys']) != set(manifest['files']):
+            merged = None
+    if merged is None:
+        merged = {'version': MANIFEST_VERSION, 'keys': {}, 'candidates': {}}
+        for filename in manifest['files']:
+            with open(cache_path(filename), 'r') as f:
+                apply_file(merged, filename, json.load(f))
+    write_atomic(MERGED_FILE, json.dumps(merged).encode(), fsync=False)
+
+    winners = [(filename, *owners[filename]) for owners in merged['candidates'].values()
+               for filename in [min(owners)]]
+    winners.sort(key=lambda w: (w[0], w[1]))           # file order
+    results = [result for _, _, result in winners]
+    results.sort(key=lambda x: x['date'], reverse=True)  # newest first
+    return results
+
+
+def main(full=False):
+    # Find all picks_YYYY-MM-DD.json files
+    pattern = os.path.join(PICKS_DIR, 'picks_*.json')
+    files   = sorted(glob.glob(pattern))
+    print(f"Found {len(files)} pick files")
 
-        print(f"  {filename}: {len(picks)} picks → {file_results} settled results")
+    manifest = {'version': MANIFEST_VERSION, 'files': {}, 'output_sha1': None} if full else load_manifest()
+    changed, touched = refresh_files(manifest, files)
+    if not changed and manifest.get('output_sha1') and os.path.exists(OUTPUT_FILE):
+        if touched:
+            write_atomic(MANIFEST_FILE, json.dumps(manifest, indent=2).encode())
+        print("✓ No pick files changed, results.json is up to date")
+        return
 
-    # Sort newest first
-    results.sort(key=lambda x: x['date'], reverse=True)
+    results = merge_results(manifest, changed, full)
 
     # Summary stats
     wins   = sum(1 for r in results if r['result'] == 'win')
@@ -126,14 +249,20 @@ def main():
         'results':     results,
     }
 
-    os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
-    with open(OUTPUT_FILE, 'w') as f:
-        json.dump(output, f, indent=2)
+    # Content hash ignores the timestamp, so an unchanged page is not rewritten
+    content_sha1 = sha1_bytes(json.dumps({k: v for k, v in output.items() if k != 'generated'},
+                                         sort_keys=True).encode())
+    if content_sha1 == manifest.get('output_sha1') and os.path.exists(OUTPUT_FILE):
+        print(f"\n✓ {len(results)} real results unchanged, {OUTPUT_FILE} not rewritten")
+    else:
+        publish(OUTPUT_FILE, output)
+        manifest['output_sha1'] = content_sha1
+        print(f"\n✅ {len(results)} real results → {OUTPUT_FILE}")
+    write_atomic(MANIFEST_FILE, json.dumps(manifest, indent=2).encode())
 
-    print(f"\n✅ {len(results)} real results → {OUTPUT_FILE}")
     print(f"   {wins}W - {losses}L ({output['win_rate']}% win rate)")
     print(f"   Total profit: €{profit:+}")
 
 
 if __name__ == '__main__':
-    main()
+    main(full='--full' in sys.argv)
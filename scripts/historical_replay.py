@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Historical Replay
+Re-runs the current model over every past matchweek as if it were live, to
+validate the published track record:
+  - history is partitioned by (league, Monday-start matchweek)
+  - partitions fan out over an execution backend (process pool by default);
+    each worker loads the model once and scores its fixtures on point-in-time
+    features (standings, form and odds strictly before kickoff, see asof_features.py)
+  - every partition is written atomically as one parquet file of the predictions
+    archive, data/replay/<model>/league=<league>/week=<monday>.parquet
+Finished partitions are skipped on the next run, so an interrupted replay
+continues where it stopped; a different model gets its own archive. The
+archive's manifest.json records how many fixtures of each partition were
+settled when it was replayed, and partitions whose matches have been played
+since are replayed again to pick up their results.
+
+Usage:
+    python scripts/historical_replay.py                                  # data/raw/games_2024-25.csv
+    python scripts/historical_replay.py --games data/raw/games.csv --workers 8 --lead-minutes 120
+    python scripts/historical_replay.py --restart                        # replay every partition again
+"""
+
+import argparse
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from asof_features import GAMES_PATH, AsOfFeatureEngine, load_odds_snapshots
+from backtest_cache import file_hash, model_key
+from execution import BACKENDS, get_backend
+from model_store import load_bundle
+from prediction_pipeline import MODEL_ALIAS, MODEL_PATH, LiveFeatureEngineer, PredictionGenerator
+from walk_forward_cv import period_labels
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+ARCHIVE_DIR = BASE_DIR / "data" / "replay"
+SUMMARY_PATH = BASE_DIR / "results" / "historical_replay.json"
+
+WEEK_ORIGIN = pd.Timestamp('1970-01-05')   # period_labels matchweeks count Mondays from here
+OUTCOMES = {'home': 'Home Win', 'draw': 'Draw', 'away': 'Away Win'}
+
+# One generator per worker process: the model is loaded once, not once per partition
+_GENERATORS = {}
+
+
+def replay_model_key(model_path=MODEL_PATH):
+    """Model store id of the model PredictionGenerator would load, else the pickle's file hash"""
+    if Path(model_path) == MODEL_PATH:
+        try:
+            return model_key(load_bundle(MODEL_ALIAS))
+        except FileNotFoundError:
+            pass
+    return file_hash(model_path)
+
+
+def partition_path(archive_dir, league, week):
+    return Path(archive_dir) / f"league={league}" / f"week={week}.parquet"
+
+
+def _generator(model_path, explain):
+    key = (str(model_path), explain)
+    if key not in _GENERATORS:
+        # Features come from the as-of engine, so the live engineer never fetches anything
+        generator = PredictionGenerator(Path(model_path), feature_engineer=LiveFeatureEngineer.from_data({}, []))
+        if not explain:
+            generator.explainer = None
+        _GENERATORS[key] = generator
+    return _GENERATORS[key]
+
+
+def _actual_outcome(home_score, away_score):
+    played = ~(np.isnan(home_score) | np.isnan(away_score))
+    outcome = np.where(home_score > away_score, OUTCOMES['home'],
+                       np.where(home_score == away_score, OUTCOMES['draw'], OUTCOMES['away']))
+    return np.where(played, outcome, None)
+
+
+def replay_partition(engine, fixtures, model_path, path, lead_minutes=0, explain=False, model=None):
+    """
+    Worker task: point-in-time features -> predictions for one (league, matchweek),
+    written atomically to `path`
+    Returns: (rows, settled, seconds)
+    """
+    start = time.perf_counter()
+    X, frame = engine.build(fixtures, lead_minutes=lead_minutes)
+    matches = list(zip(frame['home_team'], frame['away_team']))
+    predictions = _generator(model_path, explain).predict_features(X, matches)
+
+    archive = frame.drop(columns=['season']).assign(
+        prediction=[p['prediction'] for p in predictions],
+        confidence=[p['confidence'] for p in predictions],
+        prob_home=[p['probabilities']['home'] for p in predictions],
+        prob_draw=[p['probabilities']['draw'] for p in predictions],
+        prob_away=[p['probabilities']['away'] for p in predictions],
+        edge_pct=[p['edge_pct'] for p in predictions],
+        value_bet=[p['value_bet'] for p in predictions],
+        actual=_actual_outcome(frame['home_score'].to_numpy(), frame['away_score'].to_numpy()),
+        model=model,
+        replayed_at=datetime.now().isoformat(),
+    )
+    if explain:
+        archive['reasons'] = [' | '.join(p['ai_reasoning']) for p in predictions]
+    archive['correct'] = np.where(archive['actual'].isna(), None, archive['actual'] == archive['prediction'])
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    archive.to_parquet(tmp, index=False)
+    tmp.replace(path)
+    return len(archive), int(archive['correct'].notna().sum()), time.perf_counter() - start
+
+
+class HistoricalReplay:
+    """Partitioned, resumable replay of past matchweeks into a parquet predictions archive"""
+
+    def __init__(self, matches, model_path=MODEL_PATH, archive_dir=ARCHIVE_DIR, odds=None,
+                 lead_minutes=0, explain=False):
+        self.model_path = Path(model_path)
+        self.model = replay_model_key(model_path) or 'unversioned'
+        self.archive_dir = Path(archive_dir) / self.model
+        self.manifest_path = self.archive_dir / 'manifest.json'
+        self.lead_minutes = lead_minutes
+        self.explain = explain
+        self.engine = AsOfFeatureEngine(matches, odds=odds)
+
+        fixtures = self.engine.matches
+        weeks = WEEK_ORIGIN + pd.to_timedelta(period_labels(fixtures['kickoff'], 'matchweek') * 7, unit='D')
+        self.fixtures = fixtures.assign(week=weeks.strftime('%Y-%m-%d').to_numpy())
+
+    def partitions(self):
+        """{(league, week): fixtures} in time order"""
+        groups = self.fixtures.groupby(['league', 'week'], sort=False)
+        return {key: frame.drop(columns=['week']) for key, frame in groups}
+
+    def load_manifest(self):
+        """{'<league>/<week>': settled fixtures when archived}"""
+        if not self.manifest_path.exists():
+            return {}
+        with open(self.manifest_path) as f:
+            return json.load(f)
+
+    def save_manifest(self, manifest):
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.manifest_path.with_name(f".{self.manifest_path.name}.{os.getpid()}.tmp")
+        with open(tmp, 'w') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        tmp.replace(self.manifest_path)
+
+    def pending(self, restart=False):
+        """Partitions not archived yet, or archived before some of their matches were played"""
+        partitions = self.partitions()
+        if restart:
+            return partitions
+        manifest = self.load_manifest()
+        backfilled = False
+        pending = {}
+        for (league, week), frame in partitions.items():
+            path = partition_path(self.archive_dir, league, week)
+            if not path.exists():
+                pending[(league, week)] = frame
+                continue
+            name = f"{league}/{week}"
+            if name not in manifest:   # archived before the manifest existed
+                manifest[name] = int(pd.read_parquet(path, columns=['correct'])['correct'].notna().sum())
+                backfilled = True
+            if frame[['home_score', 'away_score']].notna().all(axis=1).sum() > manifest[name]:
+                pending[(league, week)] = frame
+        if backfilled:
+            self.save_manifest(manifest)
+        return pending
+
+    def run(self, backend=None, workers=None, address=None, restart=False):
+        """Replay every unfinished partition; failed partitions stay pending for the next run"""
+        partitions = self.partitions()
+        pending = self.pending(restart)
+        logger.info(f"⏪ Replaying {len(pending)} of {len(partitions)} league-matchweeks with model {self.model} "
+                    f"({len(partitions) - len(pending)} already archived)")
+        if not pending:
+            return self.summary()
+
+        start = time.perf_counter()
+        done, rows = 0, 0
+        manifest = self.load_manifest()
+        with get_backend(backend, max_workers=workers, address=address) as executor:
+            shared = executor.put(self.engine)
+            futures = {
+                executor.submit(replay_partition, shared, fixtures, str(self.model_path),
+                                str(partition_path(self.archive_dir, *key)), self.lead_minutes,
+                                self.explain, self.model): key
+                for key, fixtures in pending.items()
+            }
+            for future in executor.as_completed(futures):
+                league, week = futures[future]
+                try:
+                    n, settled, elapsed = executor.result(future)
+                except Exception as e:
+                    logger.error(f"❌ {league} week {week} failed: {e}")
+                    continue
+                manifest[f"{league}/{week}"] = settled
+                self.save_manifest(manifest)
+                done, rows = done + 1, rows + n
+                logger.info(f"  ✅ {league} week {week}: {n} fixtures in {elapsed:.1f}s ({done}/{len(pending)})")
+
+        logger.info(f"⏱️  Replayed {rows:,} fixtures in {done} partitions in {time.perf_counter() - start:.1f}s")
+        return self.summary()
+
+    def archived_paths(self):
+        return sorted(self.archive_dir.glob('league=*/week=*.parquet'))
+
+    def load_archive(self):
+        paths = self.archived_paths()
+        return pd.concat([pd.read_parquet(p) for p in paths], ignore_index=True) if paths else None
+
+    def summary(self):
+        summary = {
+            'model': self.model,
+            'archive': str(self.archive_dir),
+            'partitions': len(self.archived_paths()),
+            'pending': len(self.pending()),
+            'fixtures': 0, 'settled': 0, 'value_bets': 0, 'accuracy': None, 'by_league': {},
+        }
+        archive = self.load_archive()
+        if archive is None:
+            return summary
+        settled = archive[archive['correct'].notna()]
+        correct = settled['correct'].astype(bool)
+        summary.update({
+            'fixtures': int(len(archive)),
+            'settled': int(len(settled)),
+            'value_bets': int(archive['value_bet'].sum()),
+            'accuracy': float(correct.mean()) if len(settled) else None,
+            'by_league': {league: {'settled': int(len(hits)), 'accuracy': float(hits.mean())}
+                          for league, hits in correct.groupby(settled['league'])},
+        })
+        return summary
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description='Replay the current model over past matchweeks')
+    parser.add_argument('--games', type=Path, default=GAMES_PATH, help='results CSV (date, home/away team and score)')
+    parser.add_argument('--model', type=Path, default=MODEL_PATH)
+    parser.add_argument('--odds', nargs='+', help='odds snapshot .jsonl / tracker files or directories')
+    parser.add_argument('--lead-minutes', type=float, default=0, help='predict this long before kickoff')
+    parser.add_argument('--explain', action='store_true', help='also archive the explanation reasons')
+    parser.add_argument('--restart', action='store_true', help='replay archived partitions again')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--backend', choices=BACKENDS, default=None, help='execution backend (default: process)')
+    parser.add_argument('--address', default=None, help='Dask scheduler / Ray cluster address')
+    args = parser.parse_args()
+
+    replay = HistoricalReplay(
+        pd.read_csv(args.games),
+        model_path=args.model,
+        odds=load_odds_snapshots(args.odds) if args.odds else None,
+        lead_minutes=args.lead_minutes,
+        explain=args.explain,
+    )
+    summary = replay.run(args.backend, args.workers, args.address, restart=args.restart)
+
+    print("\n⏪ HISTORICAL REPLAY")
+    print("=" * 60)
+    print(f"  Model: {summary['model']}  Archive: {summary['archive']}")
+    print(f"  Partitions: {summary['partitions']} archived, {summary['pending']} pending")
+    print(f"  Fixtures: {summary['fixtures']:,} ({summary['settled']:,} settled, {summary['value_bets']:,} value bets)")
+    if summary['accuracy'] is not None:
+        print(f"  Accuracy: {summary['accuracy']:.1%}")
+    for league, stats in summary['by_league'].items():
+        print(f"    {league:<8} {stats['accuracy']:.1%} over {stats['settled']:,}")
+    print("=" * 60)
+
+    SUMMARY_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with open(SUMMARY_PATH, 'w') as f:
+        json.dump({'generated_at': datetime.now().isoformat(), **summary}, f, indent=2)
+    logger.info(f"💾 Saved replay summary to {SUMMARY_PATH}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+Hyperparameter Search
+Hyperband / successive-halving search over the ensemble members' hyperparameters.
+Candidates start on a small budget (few boosting rounds / trees, most recent
+fraction of the training data) and only the best third is promoted to the next
+rung. The time-ordered validation slice is split in two: boosters early-stop
+on the earlier half and every candidate is scored on the later half, so the
+reported log-loss is not biased by early stopping. The booster
+datasets come from the shared DatasetCache and every candidate evaluation reuses them.
+
+Every evaluation is appended to a JSONL history. The next search seeds its
+first bracket with the best configs from that history, and the winners are
+written to models/best_hyperparams.json, which EnhancedModelTrainer.member_specs picks up.
+
+Usage:
+    python scripts/hyperparam_search.py --time-budget 600          # best configs within 10 minutes
+    python scripts/hyperparam_search.py --members xgboost lightgbm --eta 3
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from dataset_cache import DatasetCache, array, data_hash, load_lgb, load_split, load_xgb
+from execution import BACKENDS, get_backend
+from walk_forward_cv import _load_trainer_module, _native_params
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+HISTORY_PATH = BASE_DIR / "models" / "hyperparam_history.jsonl"
+BEST_PARAMS_PATH = BASE_DIR / "models" / "best_hyperparams.json"
+
+MAX_ROUNDS = 1000           # boosting-round budget at the top rung (early stopping trims it)
+EARLY_STOPPING_ROUNDS = 50
+MIN_DATA_FRACTION = 0.25    # smallest slice of (most recent) training rows a rung may use
+VALID_FRACTION = 0.2        # most recent matches held out for validation
+STOPPING_FRACTION = 0.5     # earlier share of the validation slice used for early stopping
+WARM_START_CONFIGS = 5      # best historical configs injected into the first bracket
+RUNG_GRACE_S = 60           # candidates still running this long past the deadline are abandoned
+
+# name -> (kind, low, high) or ('choice', options)
+SEARCH_SPACES = {
+    'xgboost': {
+        'max_depth': ('int', 3, 10),
+        'learning_rate': ('log', 0.01, 0.3),
+        'subsample': ('float', 0.5, 1.0),
+        'colsample_bytree': ('float', 0.5, 1.0),
+        'min_child_weight': ('log', 1, 20),
+        'gamma': ('float', 0.0, 5.0),
+        'reg_alpha': ('log', 1e-3, 10),
+        'reg_lambda': ('log', 1e-3, 10),
+    },
+    'lightgbm': {
+        'num_leaves': ('int', 8, 128),
+        'max_depth': ('int', 3, 12),
+        'learning_rate': ('log', 0.01, 0.3),
+        'subsample': ('float', 0.5, 1.0),
+        'colsample_bytree': ('float', 0.5, 1.0),
+        'min_child_samples': ('int', 5, 100),
+        'reg_alpha': ('log', 1e-3, 10),
+        'reg_lambda': ('log', 1e-3, 10),
+    },
+    'random_forest': {
+        'max_depth': ('int', 4, 30),
+        'min_samples_split': ('int', 2, 20),
+        'min_samples_leaf': ('int', 1, 10),
+        'max_features': ('choice', ['sqrt', 'log2', 0.5]),
+    },
+}
+
+
+def sample_config(space, rng):
+    """Draw one random configuration from a search space"""
+    config = {}
+    for name, (kind, *bounds) in space.items():
+        if kind == 'choice':
+            config[name] = bounds[0][rng.integers(len(bounds[0]))]
+        elif kind == 'int':
+            config[name] = int(rng.integers(bounds[0], bounds[1] + 1))
+        elif kind == 'log':
+            config[name] = float(math.exp(rng.uniform(math.log(bounds[0]), math.log(bounds[1]))))
+        else:
+            config[name] = float(rng.uniform(bounds[0], bounds[1]))
+    return config
+
+
+def _recent_rows(n_rows, fraction):
+    """Indices of the most recent fraction of (time-ordered) training rows"""
+    keep = max(1, int(round(n_rows * fraction)))
+    return np.arange(n_rows - keep, n_rows)
+
+
+def _evaluate_candidate(member, spec, budget, split, n_threads):
+    """
+    Worker: train one configuration on a budget, early-stop on the earlier part of the
+    validation slice and score it on the later part.
+    budget in (0, 1]: fraction of MAX_ROUNDS (boosters) or of the base tree count
+    (forests), and of the training rows, with at least MIN_DATA_FRACTION of the rows.
+    """
+    from sklearn.metrics import log_loss
+
+    X_holdout = np.asarray(array(split, 'X_test'))
+    y_holdout = np.asarray(array(split, 'y_test'))
+    cut = max(1, min(len(y_holdout) - 1, int(len(y_holdout) * STOPPING_FRACTION)))
+    X_stop, y_stop = X_holdout[:cut], y_holdout[:cut]
+    X_valid, y_valid = X_holdout[cut:], y_holdout[cut:]
+    y_train = array(split, 'y_train')
+    data_fraction = max(MIN_DATA_FRACTION, budget)
+    rows = _recent_rows(len(y_train), data_fraction)
+    booster_type, native, _ = _native_params(spec)
+    rounds = max(10, int(MAX_ROUNDS * budget))
+    start = time.perf_counter()
+
+    if booster_type == 'xgboost':
+        import xgboost as xgb
+        train = load_xgb(split)
+        if data_fraction < 1:
+            train = train.slice(rows)
+        stop = xgb.DMatrix(X_stop, label=y_stop)
+        booster = xgb.train({**native, 'nthread': n_threads, 'eval_metric': 'logloss'}, train,
+                            num_boost_round=rounds, evals=[(stop, 'stop')],
+                            early_stopping_rounds=EARLY_STOPPING_ROUNDS, verbose_eval=False)
+        best_iteration = booster.best_iteration + 1
+        proba = booster.predict(xgb.DMatrix(X_valid), iteration_range=(0, best_iteration))
+    elif booster_type == 'lightgbm':
+        import lightgbm as lgb
+        train = load_lgb(split)
+        if data_fraction < 1:
+            train = train.subset(rows)
+        stop = lgb.Dataset(X_stop, label=y_stop, reference=train)
+        booster = lgb.train({**native, 'num_threads': n_threads, 'metric': 'binary_logloss', 'subsample_freq': 1},
+                            train, num_boost_round=rounds, valid_sets=[stop],
+                            callbacks=[lgb.early_stopping(EARLY_STOPPING_ROUNDS, verbose=False)])
+        best_iteration = booster.best_iteration or rounds
+        proba = booster.predict(X_valid, num_iteration=best_iteration)
+    else:
+        from training_scheduler import _fit_member
+        X_train = array(split, 'X_train')
+        trees = max(10, int(spec['params'].get('n_estimators', 100) * budget))
+        spec = {**spec, 'params': {**spec['params'], 'n_estimators': trees}}
+        _, model, _ = _fit_member(member, spec, n_threads, np.asarray(X_train[rows]), np.asarray(y_train[rows]))
+        best_iteration = trees
+        proba = model.predict_proba(X_valid)[:, 1]
+
+    score = log_loss(y_valid, np.clip(proba, 1e-6, 1 - 1e-6), labels=[0, 1])
+    return {
+        'log_loss': float(score),
+        'best_iteration': int(best_iteration),
+        'data_fraction': data_fraction,
+        'elapsed_s': time.perf_counter() - start,
+    }
+
+
+class HyperbandSearch:
+    """Hyperband over one or more ensemble members, bounded by a wall-clock budget"""
+
+    def __init__(self, eta=3, min_budget=1 / 27, n_workers=None, seed=42,
+                 history_path=HISTORY_PATH, dataset_cache=None, backend=None):
+        self.eta = eta
+        self.min_budget = min_budget
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.rng = np.random.default_rng(seed)
+        self.history_path = Path(history_path)
+        self.dataset_cache = dataset_cache or DatasetCache()
+        self.backend = backend
+        self.s_max = int(math.floor(math.log(1 / min_budget, eta) + 1e-9))
+
+    def prepare(self, X, y):
+        """Time-ordered train/validation split, materialized once as booster datasets"""
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        y = np.asarray(y).astype(int)
+        split = int(len(X) * (1 - VALID_FRACTION))
+        train_idx, valid_idx = np.arange(split), np.arange(split, len(X))
+        self.data_key = data_hash(X, y, train_idx, valid_idx)
+        self.paths = self.dataset_cache.materialize(X, y, train_idx, valid_idx)
+        self.dataset_cache.report('search datasets')
+        return self.paths
+
+    def load_history(self, member):
+        """
+        Past evaluations of this member on any data: same-data records first,
+        then higher budgets, then lower loss (only used to seed warm starts)
+        """
+        if not self.history_path.exists():
+            return []
+        records = []
+        with open(self.history_path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get('member') == member:
+                    records.append(record)
+        # Prefer the same dataset, then full-budget results, then lower loss
+        records.sort(key=lambda r: (r.get('data_key') != self.data_key, -r['budget'], r['log_loss']))
+        return records
+
+    def _record(self, member, config, budget, result):
+        self.history_path.parent.mkdir(parents=True, exist_ok=True)
+        record = {'member': member, 'config': config, 'budget': budget, 'data_key': self.data_key,
+                  'timestamp': datetime.now().isoformat(), **result}
+        with open(self.history_path, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+        return record
+
+    def _warm_start_configs(self, member):
+        seen, configs = set(), []
+        for record in self.load_history(member):
+            key = json.dumps(record['config'], sort_keys=True)
+            if key not in seen:
+                seen.add(key)
+                configs.append(record['config'])
+            if len(configs) == WARM_START_CONFIGS:
+                break
+        return configs
+
+    def _run_rung(self, backend, split, member, base_spec, configs, budget, deadline, threads):
+        """
+        Evaluate configs at one budget with n_workers evaluations in flight, submitting
+        the next config as soon as a slot frees up. Nothing new starts after the deadline,
+        and candidates still running RUNG_GRACE_S past it are abandoned.
+        """
+        results = []
+        queue = list(configs)
+        running = {}
+        while queue or running:
+            while queue and len(running) < self.n_workers and time.time() < deadline:
+                config = queue.pop(0)
+                spec = {**base_spec, 'params': {**base_spec['params'], **config}}
+                running[backend.submit(_evaluate_candidate, member, spec, budget, split, threads)] = config
+            if not running:
+                break
+            done, _ = backend.wait(running, timeout=max(deadline - time.time(), 0) + RUNG_GRACE_S)
+            if not done:
+                logger.warning(f"⏱️ {member}: abandoning {len(running)} candidate(s) still running "
+                               f"{RUNG_GRACE_S}s past the time budget")
+                backend.cancel(running)
+                break
+            for future in done:
+                config = running.pop(future)
+                try:
+                    result = backend.result(future)
+                except Exception as e:
+                    logger.error(f"{member} candidate failed: {e}")
+                    continue
+                results.append((config, self._record(member, config, budget, result)))
+        return sorted(results, key=lambda item: item[1]['log_loss'])
+
+    def search(self, member, base_spec, time_budget):
+        """
+        Run Hyperband brackets for one member until time_budget seconds have passed.
+        Returns: best record at the highest budget reached (None if nothing finished)
+        """
+        deadline = time.time() + time_budget
+        space = SEARCH_SPACES[member]
+        threads = max(1, (os.cpu_count() or 1) // self.n_workers)
+        warm_start = self._warm_start_configs(member)
+        best = None
+
+        backend = self.backend or get_backend(max_workers=self.n_workers)
+        # Remote workers get the split once through the object store instead of re-reading files
+        split = self.paths if backend.shared_filesystem else backend.put(load_split(self.paths))
+        try:
+            for s in range(self.s_max, -1, -1):
+                if time.time() >= deadline:
+                    break
+                n = int(math.ceil((self.s_max + 1) / (s + 1) * self.eta ** s))
+                configs, warm_start = warm_start[:n], warm_start[n:]
+                configs += [sample_config(space, self.rng) for _ in range(n - len(configs))]
+                logger.info(f"🎯 {member} bracket s={s}: {n} configs")
+
+                for i in range(s + 1):
+                    budget = self.eta ** (i - s)
+                    results = self._run_rung(backend, split, member, base_spec, configs, budget, deadline, threads)
+                    if not results:
+                        break
+                    top = results[0][1]
+                    logger.info(f"  rung {i}: budget={budget:.3f} best log-loss {top['log_loss']:.4f} "
+                                f"({len(results)} configs)")
+                    if best is None or (budget, -top['log_loss']) > (best['budget'], -best['log_loss']):
+                        best = top
+                    configs = [config for config, _ in results[:max(1, len(results) // self.eta)]]
+                    if time.time() >= deadline:
+                        break
+        finally:
+            if self.backend is None:
+                backend.shutdown()
+
+        return best
+
+
+def best_params_from_record(member, record):
+    """Constructor params for the winning config; boosters get n_estimators from early stopping"""
+    params = dict(record['config'])
+    if member in ('xgboost', 'lightgbm'):
+        params['n_estimators'] = record['best_iteration']
+    if member == 'lightgbm':
+        params['subsample_freq'] = 1
+    return params
+
+
+def load_best_params(path=BEST_PARAMS_PATH):
+    """Searched hyperparameters per member ({} when no search has been run)"""
+    path = Path(path)
+    if not path.exists():
+        return {}
+    try:
+        with open(path) as f:
+            return {member: entry['params'] for member, entry in json.load(f).items()}
+    except (OSError, ValueError, KeyError):
+        logger.warning(f"⚠️ Ignoring unreadable {path}")
+        return {}
+
+
+def save_best_params(best, path=BEST_PARAMS_PATH):
+    existing = {}
+    if Path(path).exists():
+        with open(path) as f:
+            existing = json.load(f)
+    existing.update(best)
+    with open(path, 'w') as f:
+        json.dump(existing, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Hyperband search over ensemble member hyperparameters')
+    parser.add_argument('--time-budget', type=float, default=600, help='total wall-clock seconds for the search')
+    parser.add_argument('--members', nargs='+', default=list(SEARCH_SPACES), choices=list(SEARCH_SPACES))
+    parser.add_argument('--eta', type=int, default=3, help='halving rate')
+    parser.add_argument('--workers', type=int, default=None, help='parallel candidate evaluations')
+    parser.add_argument('--backend', choices=BACKENDS, default=None, help='execution backend (default: process)')
+    parser.add_argument('--address', default=None, help='Dask scheduler / Ray cluster address')
+    args = parser.parse_args()
+
+    trainer = _load_trainer_module().EnhancedModelTrainer()
+    X, y, _ = trainer.load_features()
+    if trainer.match_dates is not None:
+        order = np.argsort(trainer.match_dates.to_numpy(), kind='stable')
+        X, y = X.iloc[order], y.iloc[order]
+
+    best = {}
+    per_member = args.time_budget / len(args.members)
+    specs = trainer.member_specs()
+    with get_backend(args.backend, args.workers, args.address) as backend:
+        search = HyperbandSearch(eta=args.eta, n_workers=args.workers, backend=backend)
+        search.prepare(X.to_numpy(), y.to_numpy())
+        for member in args.members:
+            record = search.search(member, specs[member], per_member)
+            if record is None:
+                logger.warning(f"⚠️ {member}: no configuration finished within the budget")
+                continue
+            best[member] = {
+                'params': best_params_from_record(member, record),
+                'log_loss': record['log_loss'],
+                'budget': record['budget'],
+                'searched_at': record['timestamp'],
+            }
+            logger.info(f"✅ {member}: log-loss {record['log_loss']:.4f} at budget {record['budget']:.3f}")
+
+    if best:
+        save_best_params(best)
+        logger.info(f"✅ Best hyperparameters saved: {BEST_PARAMS_PATH}")
+
+
+if __name__ == '__main__':
+    main()
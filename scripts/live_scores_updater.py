@@ -3,10 +3,12 @@
 Fetches live PL scores every 2 minutes and writes to data/live_scores.json
 Dashboard reads this static file — no CORS issues.
 """
-import json, requests, os, subprocess
+import requests, os, subprocess
 from datetime import datetime, timezone, timedelta
 from pathlib import Path
 
+from publish import publish
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 OUTPUT = BASE_DIR / "docs" / "data" / "live_scores.json"
 OUTPUT.parent.mkdir(parents=True, exist_ok=True)
@@ -68,8 +70,7 @@ def main():
             'updatedAtAthens': datetime.now().strftime('%H:%M'),
             'matches': matches
         }
-        with open(OUTPUT, 'w') as f:
-            json.dump(out, f, indent=2)
+        publish(OUTPUT, out)
         
         # Push to GitHub
         subprocess.run(['git', 'add', str(OUTPUT)], cwd=BASE_DIR)
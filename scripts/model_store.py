@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+Model Artifact Store
+Content-addressed storage for ensemble members and scalers, with one SQLite
+index of every registered model (version, league, dataset hash, metrics,
+feature schema) and aliases such as 'production' / 'candidate'.
+  - each member / scaler is pickled once under objects/<hash>.pkl (identical
+    artifacts are shared between models)
+  - a model id is the hash of its manifest (member + scaler ids, weights, features)
+  - load() returns the usual bundle dict; members are unpickled on first access
+Switching the live model is an alias update in the index, not a file copy.
+The 'production' alias only accepts models whose feature list matches the live
+schema (models/v5_proper_metadata.json), so a model trained on other features
+can be registered and compared but never promoted to or loaded as production.
+
+Usage:
+    python scripts/model_store.py list
+    python scripts/model_store.py import models/ensemble_model_v5_proper.pkl --alias production
+    python scripts/model_store.py promote <model_id|alias> production
+    python scripts/model_store.py prune --keep 20
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import pickle
+import sqlite3
+from collections.abc import Mapping
+from datetime import datetime
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+STORE_DIR = BASE_DIR / "models" / "store"
+KEEP_UNALIASED = 20     # newest models without an alias that prune() keeps
+SCHEMA_METADATA_PATH = BASE_DIR / "models" / "v5_proper_metadata.json"   # features the live pipeline builds
+PRODUCTION = 'production'
+CANDIDATE = 'candidate'
+
+# Bundle keys kept in the manifest/index rather than as pickled objects
+_ARTIFACT_KEYS = ('models', 'scaler')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    object_id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS models (
+    model_id TEXT PRIMARY KEY,
+    version TEXT,
+    league TEXT,
+    dataset_hash TEXT,
+    feature_hash TEXT,
+    features TEXT NOT NULL,
+    members TEXT NOT NULL,
+    scaler_id TEXT,
+    weights TEXT NOT NULL,
+    metrics TEXT,
+    extra TEXT,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS models_lookup ON models (league, version, created_at);
+CREATE TABLE IF NOT EXISTS aliases (
+    alias TEXT PRIMARY KEY,
+    model_id TEXT NOT NULL REFERENCES models (model_id),
+    updated_at TEXT NOT NULL
+);
+"""
+
+
+def _hash_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _hash_json(value):
+    return _hash_bytes(json.dumps(value, sort_keys=True, default=str).encode())
+
+
+def production_features(metadata_path=SCHEMA_METADATA_PATH):
+    """Input feature names of the production model (empty when its metadata is unreadable)"""
+    try:
+        with open(metadata_path) as f:
+            return list(json.load(f).get('features') or [])
+    except (OSError, ValueError):
+        return []
+
+
+def check_production_schema(record, metadata_path=SCHEMA_METADATA_PATH):
+    """Raise ValueError when a model's features differ from the production schema"""
+    expected = production_features(metadata_path)
+    features = list(record.get('features') or [])
+    if not expected or not features:
+        logger.warning(f"⚠️  Cannot verify the feature schema of model {record.get('model_id')} "
+                       f"({len(features)} features, production schema {len(expected)})")
+        return
+    if features != expected:
+        raise ValueError(f"Model {record.get('model_id')} has {len(features)} features, production expects "
+                         f"{len(expected)} ({metadata_path.name}); it cannot serve as '{PRODUCTION}'")
+
+
+class LazyMembers(Mapping):
+    """Read-only {member name: estimator}; each member is unpickled on first access"""
+
+    def __init__(self, store, object_ids):
+        self._store = store
+        self._object_ids = dict(object_ids)
+        self._loaded = {}
+
+    def __getitem__(self, name):
+        if name not in self._loaded:
+            self._loaded[name] = self._store.get_object(self._object_ids[name])
+        return self._loaded[name]
+
+    def __iter__(self):
+        return iter(self._object_ids)
+
+    def __len__(self):
+        return len(self._object_ids)
+
+    def __reduce__(self):
+        # Pickling a loaded bundle (e.g. the retrained .pkl) materializes every member
+        return dict, (dict(self.items()),)
+
+
+class ModelStore:
+    """Content-addressed member objects + SQLite model index + aliases"""
+
+    def __init__(self, root=STORE_DIR):
+        self.root = Path(root)
+        self.objects_dir = self.root / 'objects'
+        self.index_path = self.root / 'index.db'
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.index_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    # ---- objects -------------------------------------------------------
+
+    def _object_path(self, object_id):
+        return self.objects_dir / object_id[:2] / f"{object_id}.pkl"
+
+    def put_object(self, obj, kind):
+        """Pickle once and store under its content hash (no-op when already stored)"""
+        data = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+        object_id = _hash_bytes(data)
+        path = self._object_path(object_id)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix('.tmp')
+            tmp.write_bytes(data)
+            tmp.replace(path)
+        with self._connect() as conn:
+            conn.execute('INSERT OR IGNORE INTO objects VALUES (?, ?, ?, ?)',
+                         (object_id, kind, len(data), datetime.now().isoformat()))
+        return object_id
+
+    def get_object(self, object_id):
+        with open(self._object_path(object_id), 'rb') as f:
+            return pickle.load(f)
+
+    # ---- models --------------------------------------------------------
+
+    def put_bundle(self, bundle, version=None, league='EPL', metrics=None, aliases=()):
+        """
+        Register an ensemble bundle (dict with models/weights/scaler/features).
+        Returns: model id (same bundle content -> same id)
+        """
+        members = {name: self.put_object(model, 'member') for name, model in bundle['models'].items()}
+        scaler = bundle.get('scaler')
+        scaler_id = self.put_object(scaler, 'scaler') if scaler is not None else None
+        features = list(bundle.get('features') or bundle.get('feature_names') or [])
+        if not features:
+            logger.warning(f"⚠️  Bundle {version or bundle.get('version')} has no feature names; "
+                           f"its schema cannot be checked on promotion")
+        weights = dict(bundle.get('weights') or {})
+        version = version or bundle.get('version')
+        dataset_hash = (bundle.get('dataset_version') or {}).get('dataset_hash')
+        extra = {k: v for k, v in bundle.items()
+                 if k not in _ARTIFACT_KEYS + ('features', 'feature_names', 'weights', 'version', 'model_id')}
+
+        model_id = _hash_json({'members': members, 'scaler': scaler_id, 'weights': weights,
+                               'features': features, 'version': version})[:16]
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR IGNORE INTO models VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (model_id, version, league, dataset_hash, _hash_json(features)[:16], json.dumps(features),
+                 json.dumps(members), scaler_id, json.dumps(weights),
+                 json.dumps(metrics, default=float) if metrics is not None else None,
+                 json.dumps(extra, default=str), datetime.now().isoformat()),
+            )
+        for alias in aliases:
+            self.set_alias(alias, model_id)
+        logger.info(f"📦 Stored model {model_id} ({version}, {len(members)} members)")
+        return model_id
+
+    def set_alias(self, alias, ref):
+        """Point an alias (e.g. 'production') at a model; this is how models are switched"""
+        model_id = self.resolve(ref)
+        if alias == PRODUCTION:
+            check_production_schema(self.get(model_id))
+        with self._connect() as conn:
+            conn.execute('INSERT OR REPLACE INTO aliases VALUES (?, ?, ?)',
+                         (alias, model_id, datetime.now().isoformat()))
+        logger.info(f"🏷️  {alias} -> {model_id}")
+        return model_id
+
+    def resolve(self, ref):
+        """Model id for an alias, full id or unique id prefix (KeyError if unknown)"""
+        with self._connect() as conn:
+            row = conn.execute('SELECT model_id FROM aliases WHERE alias = ?', (ref,)).fetchone()
+            if row:
+                return row['model_id']
+            rows = conn.execute('SELECT model_id FROM models WHERE model_id LIKE ?', (f"{ref}%",)).fetchall()
+        if len(rows) != 1:
+            raise KeyError(f"Unknown or ambiguous model reference '{ref}'")
+        return rows[0]['model_id']
+
+    def aliases(self):
+        with self._connect() as conn:
+            return {row['alias']: row['model_id'] for row in conn.execute('SELECT alias, model_id FROM aliases')}
+
+    @staticmethod
+    def _row_to_record(row):
+        record = dict(row)
+        for key in ('features', 'members', 'weights', 'metrics', 'extra'):
+            record[key] = json.loads(record[key]) if record[key] else None
+        return record
+
+    def get(self, ref):
+        """Index record for a model (no artifacts loaded)"""
+        model_id = self.resolve(ref)
+        with self._connect() as conn:
+            row = conn.execute('SELECT * FROM models WHERE model_id = ?', (model_id,)).fetchone()
+        return self._row_to_record(row)
+
+    def list_models(self, league=None, version=None, dataset_hash=None, feature_hash=None):
+        """Index records matching the given filters, newest first"""
+        clauses, params = [], []
+        for column, value in (('league', league), ('version', version),
+                              ('dataset_hash', dataset_hash), ('feature_hash', feature_hash)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        with self._connect() as conn:
+            rows = conn.execute(f"SELECT * FROM models {where} ORDER BY created_at DESC", params).fetchall()
+        return [self._row_to_record(row) for row in rows]
+
+    def prune(self, keep=KEEP_UNALIASED):
+        """
+        Delete all but the newest `keep` models without an alias, then every object
+        no remaining model references.
+        Returns: (models removed, objects removed)
+        """
+        with self._connect() as conn:
+            aliased = {row['model_id'] for row in conn.execute('SELECT model_id FROM aliases')}
+            rows = conn.execute('SELECT model_id, members, scaler_id FROM models ORDER BY created_at DESC').fetchall()
+            unaliased = [row['model_id'] for row in rows if row['model_id'] not in aliased]
+            stale = unaliased[keep:]
+            conn.executemany('DELETE FROM models WHERE model_id = ?', [(model_id,) for model_id in stale])
+            referenced = set()
+            for row in rows:
+                if row['model_id'] not in stale:
+                    referenced.update(json.loads(row['members']).values())
+                    referenced.add(row['scaler_id'])
+            orphans = [row['object_id'] for row in conn.execute('SELECT object_id FROM objects')
+                       if row['object_id'] not in referenced]
+            conn.executemany('DELETE FROM objects WHERE object_id = ?', [(object_id,) for object_id in orphans])
+        for object_id in orphans:
+            self._object_path(object_id).unlink(missing_ok=True)
+        if stale or orphans:
+            logger.info(f"🧹 Pruned {len(stale)} models and {len(orphans)} objects from the store")
+        return len(stale), len(orphans)
+
+    def load(self, ref=PRODUCTION, members=None):
+        """
+        Bundle dict for a model; 'models' loads each member lazily.
+        members: optional subset of member names to expose
+        """
+        record = self.get(ref)
+        if ref == PRODUCTION:
+            check_production_schema(record)
+        object_ids = {name: oid for name, oid in record['members'].items() if members is None or name in members}
+        bundle = dict(record['extra'] or {})
+        bundle.update({
+            'models': LazyMembers(self, object_ids),
+            'weights': {name: w for name, w in record['weights'].items() if name in object_ids},
+            'scaler': self.get_object(record['scaler_id']) if record['scaler_id'] else None,
+            'features': record['features'],
+            'version': record['version'],
+            'model_id': record['model_id'],
+        })
+        return bundle
+
+
+def load_bundle(ref=PRODUCTION, fallback_path=None, store_dir=STORE_DIR):
+    """Bundle from the store alias/id, or the legacy pickle when the store has no such model"""
+    index_path = Path(store_dir) / 'index.db'
+    if index_path.exists():
+        try:
+            bundle = ModelStore(store_dir).load(ref)
+            logger.info(f"✅ Loaded model {bundle['model_id']} ({ref}) from the model store")
+            return bundle
+        except KeyError:
+            pass
+    if fallback_path is None:
+        raise FileNotFoundError(f"No model '{ref}' in {store_dir}")
+    with open(fallback_path, 'rb') as f:
+        return pickle.load(f)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description='Content-addressed model store')
+    sub = parser.add_subparsers(dest='command', required=True)
+    list_cmd = sub.add_parser('list', help='show registered models and aliases')
+    list_cmd.add_argument('--league')
+    list_cmd.add_argument('--version')
+    import_cmd = sub.add_parser('import', help='register a legacy ensemble pickle')
+    import_cmd.add_argument('path', type=Path)
+    import_cmd.add_argument('--league', default='EPL')
+    import_cmd.add_argument('--alias', action='append', default=[])
+    promote_cmd = sub.add_parser('promote', help='point an alias at a model')
+    promote_cmd.add_argument('ref')
+    promote_cmd.add_argument('alias', nargs='?', default=PRODUCTION)
+    prune_cmd = sub.add_parser('prune', help='drop old un-aliased models and unreferenced objects')
+    prune_cmd.add_argument('--keep', type=int, default=KEEP_UNALIASED)
+    args = parser.parse_args()
+
+    store = ModelStore()
+    if args.command == 'import':
+        with open(args.path, 'rb') as f:
+            bundle = pickle.load(f)
+        store.put_bundle(bundle, version=bundle.get('version') or args.path.stem,
+                         league=args.league, aliases=args.alias)
+    elif args.command == 'promote':
+        store.set_alias(args.alias, args.ref)
+    elif args.command == 'prune':
+        store.prune(args.keep)
+    else:
+        aliases = {}
+        for alias, model_id in store.aliases().items():
+            aliases.setdefault(model_id, []).append(alias)
+        print(f"\n{'MODEL':<18} {'VERSION':<24} {'LEAGUE':<8} {'DATASET':<14} {'FEATURES':>8}  CREATED / ALIASES")
+        print("-" * 100)
+        for record in store.list_models(league=args.league, version=args.version):
+            print(f"{record['model_id']:<18} {str(record['version']):<24} {str(record['league']):<8} "
+                  f"{(record['dataset_hash'] or '-')[:12]:<14} {len(record['features']):>8}  "
+                  f"{record['created_at'][:16]} {', '.join(aliases.get(record['model_id'], []))}")
+
+
+if __name__ == '__main__':
+    main()
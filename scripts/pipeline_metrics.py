@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Per-stage run instrumentation for the prediction scripts
+Records wall time, CPU time, RSS delta and HTTP bytes per named span,
+appends one record per run to a rolling JSONL file and prints a summary
+that flags stages running well above their recent median.
+Without psutil the RSS columns are deltas of the *peak* RSS (getrusage), which
+only grow when a stage raises the high-water mark.
+"""
+
+import json
+import logging
+import statistics
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+METRICS_PATH = BASE_DIR / "logs" / "pipeline_metrics.jsonl"
+MAX_RECORDS = 1000          # rolling window kept in the JSONL file
+REGRESSION_FACTOR = 1.5     # flag a stage when wall time > 1.5x its recent median
+HISTORY_RUNS = 20           # runs used for the median baseline
+
+try:
+    import psutil
+    _PROCESS = psutil.Process()
+except ImportError:  # psutil is optional; fall back to peak RSS from getrusage
+    _PROCESS = None
+
+RSS_LABEL = 'ΔRSS MB' if _PROCESS is not None else 'Δpeak MB'
+
+# One requests.Session.send wrapper for the whole process, counting into every open run
+_HTTP_RUNS = []
+_ORIGINAL_SEND = None
+
+
+def current_rss_bytes():
+    """Resident set size of this process (peak RSS when psutil is unavailable)"""
+    if _PROCESS is not None:
+        return _PROCESS.memory_info().rss
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024  # macOS reports bytes, Linux KB
+
+
+def _response_bytes(response, streamed):
+    """Body size from Content-Length; a streamed body is never read here just to count it"""
+    length = response.headers.get('Content-Length', '')
+    if length.isdigit():
+        return int(length)
+    return 0 if streamed else len(response.content or b'')
+
+
+def _counting_send(session, request, **kwargs):
+    response = _ORIGINAL_SEND(session, request, **kwargs)
+    size = _response_bytes(response, kwargs.get('stream', False))
+    for metrics in _HTTP_RUNS:
+        stage = metrics._active[-1] if metrics._active else '(untracked)'
+        record = metrics._span_record(stage)
+        record['http_requests'] += 1
+        record['http_bytes'] += size
+    return response
+
+
+class RunMetrics:
+    """Collects named spans for one pipeline run"""
+
+    def __init__(self, run_name, metrics_path=METRICS_PATH, max_records=MAX_RECORDS, enabled=True):
+        self.run_name = run_name
+        self.metrics_path = Path(metrics_path)
+        self.max_records = max_records
+        self.enabled = enabled
+        self.spans = {}
+        self._active = []
+        self._reset_clock()
+        if enabled:
+            self._install_http_hook()
+
+    def _reset_clock(self):
+        self.started_at = datetime.now().isoformat()
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.process_time()
+        self._rss_start = current_rss_bytes()
+
+    def _span_record(self, name):
+        return self.spans.setdefault(name, {
+            'count': 0, 'wall_s': 0.0, 'cpu_s': 0.0, 'rss_delta_mb': 0.0,
+            'http_requests': 0, 'http_bytes': 0,
+        })
+
+    @contextmanager
+    def span(self, name):
+        """Time a named stage; repeated spans with the same name are aggregated"""
+        if not self.enabled:
+            yield
+            return
+
+        self._install_http_hook()  # no-op unless finish() closed it for a previous run
+        rss_before = current_rss_bytes()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        self._active.append(name)
+        try:
+            yield
+        finally:
+            self._active.pop()
+            record = self._span_record(name)
+            record['count'] += 1
+            record['wall_s'] += time.perf_counter() - wall_start
+            record['cpu_s'] += time.process_time() - cpu_start
+            record['rss_delta_mb'] += (current_rss_bytes() - rss_before) / 1024 ** 2
+
+    def _install_http_hook(self):
+        """Count response bytes for every requests call made while this run is open"""
+        global _ORIGINAL_SEND
+        if self in _HTTP_RUNS:
+            return
+        try:
+            import requests
+        except ImportError:
+            return
+        if not _HTTP_RUNS:
+            _ORIGINAL_SEND = requests.Session.send
+            requests.Session.send = _counting_send
+        _HTTP_RUNS.append(self)
+
+    def _remove_http_hook(self):
+        """Stop counting for this run; the last open run restores requests.Session.send"""
+        global _ORIGINAL_SEND
+        if self not in _HTTP_RUNS:
+            return
+        _HTTP_RUNS.remove(self)
+        if not _HTTP_RUNS:
+            import requests
+            requests.Session.send = _ORIGINAL_SEND
+            _ORIGINAL_SEND = None
+
+    def close(self):
+        self._remove_http_hook()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def _load_history(self):
+        """Previous records for this run name (most recent last)"""
+        if not self.metrics_path.exists():
+            return []
+        history = []
+        with open(self.metrics_path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                # Failed runs stop early: keep them out of the regression baseline
+                if record.get('run') == self.run_name and record.get('status', 'ok') == 'ok':
+                    history.append(record)
+        return history[-HISTORY_RUNS:]
+
+    def _append(self, record):
+        """Append a record, trimming the file to the last max_records lines"""
+        self.metrics_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.metrics_path, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+
+        with open(self.metrics_path) as f:
+            lines = f.readlines()
+        if len(lines) > self.max_records:
+            with open(self.metrics_path, 'w') as f:
+                f.writelines(lines[-self.max_records:])
+
+    def finish(self, **extra):
+        """Write this run's record, print the summary and reset for the next run"""
+        if not self.enabled:
+            return None
+
+        self._remove_http_hook()
+        for record in self.spans.values():
+            record['wall_s'] = round(record['wall_s'], 4)
+            record['cpu_s'] = round(record['cpu_s'], 4)
+            record['rss_delta_mb'] = round(record['rss_delta_mb'], 2)
+
+        run_record = {
+            'run': self.run_name,
+            'started_at': self.started_at,
+            'total_wall_s': round(time.perf_counter() - self._wall_start, 4),
+            'total_cpu_s': round(time.process_time() - self._cpu_start, 4),
+            'rss_delta_mb': round((current_rss_bytes() - self._rss_start) / 1024 ** 2, 2),
+            'http_bytes': sum(s['http_bytes'] for s in self.spans.values()),
+            'spans': self.spans,
+            **extra,
+        }
+
+        history = self._load_history()
+        try:
+            self._append(run_record)
+        except OSError as e:
+            logger.warning(f"⚠️ Could not write metrics to {self.metrics_path}: {e}")
+
+        self.print_summary(run_record, history)
+        self.spans = {}
+        self._reset_clock()
+        return run_record
+
+    def print_summary(self, run_record, history=()):
+        """Per-stage table with a regression flag against the recent median"""
+        print(f"\n⏱️  RUN METRICS — {self.run_name}")
+        print("-" * 86)
+        print(f"{'Stage':<22} {'Calls':>6} {'Wall s':>9} {'CPU s':>9} {RSS_LABEL:>9} {'HTTP KB':>10} {'vs median':>14}")
+        print("-" * 86)
+
+        for name, span in run_record['spans'].items():
+            baseline = [r['spans'][name]['wall_s'] for r in history if name in r.get('spans', {})]
+            trend = ''
+            if baseline:
+                median = statistics.median(baseline)
+                if median > 0:
+                    ratio = span['wall_s'] / median
+                    trend = f"{ratio:.2f}x" + (' ⚠️' if ratio > REGRESSION_FACTOR else '')
+            print(f"{name:<22} {span['count']:>6} {span['wall_s']:>9.3f} {span['cpu_s']:>9.3f} "
+                  f"{span['rss_delta_mb']:>9.1f} {span['http_bytes'] / 1024:>10.1f} {trend:>14}")
+
+        print("-" * 86)
+        print(f"{'TOTAL':<22} {'':>6} {run_record['total_wall_s']:>9.3f} {run_record['total_cpu_s']:>9.3f} "
+              f"{run_record['rss_delta_mb']:>9.1f} {run_record['http_bytes'] / 1024:>10.1f}")
+        print(f"📝 Metrics appended to {self.metrics_path}")
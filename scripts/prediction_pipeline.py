@@ -6,7 +6,6 @@ Fetches real fixtures, generates ML predictions, saves to JSON & database
 
 import sys
 import os
-import json
 import pickle
 import logging
 from datetime import datetime, timedelta
@@ -18,6 +17,12 @@ import pandas as pd
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from pipeline_metrics import RunMetrics
+from drift_monitor import DriftMonitor
+from explanations import ExplanationEngine
+from model_store import PRODUCTION, load_bundle
+from publish import publish
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
@@ -28,9 +33,13 @@ logger = logging.getLogger(__name__)
 # Paths
 BASE_DIR = Path(__file__).parent.parent
 MODEL_PATH = BASE_DIR / "models" / "ensemble_model_v5_proper.pkl"
+ONNX_PATH = BASE_DIR / "models" / "ensemble_model_v5_proper.onnx"
+MODEL_ALIAS = os.getenv('MODEL_ALIAS', PRODUCTION)  # model store alias; falls back to MODEL_PATH
 PREDICTIONS_DIR = BASE_DIR / "data" / "predictions"
 PREDICTIONS_DIR.mkdir(parents=True, exist_ok=True)
 
+MATCHDAY_BATCH = 10  # fixtures per Premier League matchday (initial buffer size)
+
 
 class FixtureFetcher:
     """Fetches upcoming Premier League fixtures from free APIs"""
@@ -198,13 +207,118 @@ class FixtureFetcher:
         return fixtures
 
 
+def _shot_accuracy(sot_pg, shots_pg):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(shots_pg > 0, np.minimum(0.5, sot_pg / shots_pg), 0.35)
+
+
+def live_feature_values(home, away):
+    """
+    The 48 v5_proper feature values from home / away team stats (the keys of
+    LiveFeatureEngineer.team_stats). Stats may be scalars (one match) or equal-length
+    arrays (many matches, see asof_features.py); returns a tuple of 48 values/arrays.
+    """
+    # Extract home team metrics
+    home_form_ppg = home['form_last_5_ppg']
+    home_goals_pg = home['home_goals_per_game']  # Use HOME-specific
+    home_conceded_pg = home['home_conceded_per_game']
+    home_win_rate = home['home_win_rate']
+    home_position = home['position']
+    
+    # Extract away team metrics
+    away_form_ppg = away['form_last_5_ppg']
+    away_goals_pg = away['away_goals_per_game']  # Use AWAY-specific
+    away_conceded_pg = away['away_conceded_per_game']
+    away_win_rate = away['away_win_rate']
+    away_position = away['position']
+    
+    # Calculate derived metrics (5 games projection)
+    home_goals_l5 = home_goals_pg * 5
+    away_goals_l5 = away_goals_pg * 5
+    home_conceded_l5 = home_conceded_pg * 5
+    away_conceded_l5 = away_conceded_pg * 5
+    home_wins_l5 = home_win_rate * 5
+    away_wins_l5 = away_win_rate * 5
+    
+    # Estimate shots from goals (typical conversion ~15%)
+    home_shots_pg = home_goals_pg / 0.15
+    away_shots_pg = away_goals_pg / 0.15
+    home_sot_pg = home_shots_pg * 0.4  # ~40% shots on target
+    away_sot_pg = away_shots_pg * 0.4
+    
+    # Consistency (based on goal difference stability)
+    home_consistency = np.minimum(0.9, 0.5 + np.abs(home['goal_difference']) * 0.02)
+    away_consistency = np.minimum(0.9, 0.5 + np.abs(away['goal_difference']) * 0.02)
+    
+    # Momentum (form relative to season average)
+    home_momentum = home_form_ppg / np.maximum(0.1, home['points_per_game'])
+    away_momentum = away_form_ppg / np.maximum(0.1, away['points_per_game'])
+    
+    # Position differential (quality gap)
+    position_diff = away_position - home_position  # Positive = home team better
+    
+    # Build 48-feature vector with REAL differentiated data per team
+    return (
+        home_consistency,                           # 0. consistency_home
+        away_sot_pg,                                # 1. sot_away
+        2.0 + (away_position / 10),                 # 2. cards_away (worse teams = more cards)
+        away_shots_pg,                              # 3. shots_away
+        2.0 + (home_position / 10),                 # 4. yellow_home
+        home_goals_l5 * 0.55,                       # 5. goals_2h_home (slightly more 2nd half)
+        0.1 + (home_position / 100),                # 6. injury_risk_home
+        away_momentum,                              # 7. momentum_away
+        away_goals_l5 * 0.55,                       # 8. goals_2h_away
+        4.0 + home_goals_pg,                        # 9. corners_home (correlates with attack)
+        home_goals_l5 + away_goals_l5,              # 10. total_goals
+        home_wins_l5,                               # 11. home_wins_l5
+        home_sot_pg,                                # 12. sot_home
+        2.0 + (home_position / 10),                 # 13. cards_home
+        np.where(home_goals_l5 + away_goals_l5 > 12.5, 1.0, 0.0),  # 14. over_2_5
+        0.0,                                        # 15. travel_burden
+        home_sot_pg - away_sot_pg,                  # 16. sot_diff
+        home_goals_l5,                              # 17. home_goals_l5
+        (home_goals_pg - away_goals_pg) * 0.8,      # 18. corners_diff (proxy)
+        0.05 + (away_position / 200),               # 19. red_away
+        np.minimum(0.8, home_goals_pg / 10),        # 20. corner_efficiency_home
+        home_momentum,                              # 21. momentum_home
+        np.where(home_form_ppg > away_form_ppg, 1.0, 0.0),  # 22. home_win
+        home_goals_l5 - away_goals_l5,              # 23. goal_diff
+        9.0 + (20 - home_position) * 0.2,           # 24. fouls_home (better teams foul less)
+        2.0 + (away_position / 10),                 # 25. yellow_away
+        150.0,                                      # 26. travel_distance (average)
+        50.0 + position_diff * 2,                   # 27. possession_proxy_home (better = more)
+        away_consistency,                           # 28. consistency_away
+        _shot_accuracy(home_sot_pg, home_shots_pg),  # 29. shot_accuracy_home
+        home_goals_l5 * 0.45,                       # 30. ht_advantage_home (first half)
+        (home_position - away_position) * 0.1,      # 31. cards_diff
+        np.minimum(0.8, away_goals_pg / 10),        # 32. corner_efficiency_away
+        away_goals_l5 * 0.45,                       # 33. goals_ht_away
+        0.1 + (away_position / 100),                # 34. injury_risk_away
+        _shot_accuracy(away_sot_pg, away_shots_pg),  # 35. shot_accuracy_away
+        home_shots_pg,                              # 36. shots_home
+        0.2,                                        # 37. travel_fatigue_score
+        home_goals_l5 * 0.45,                       # 38. goals_ht_home
+        50.0 - position_diff * 2,                   # 39. possession_proxy_away
+        away_wins_l5,                               # 40. away_wins_l5
+        4.0 + away_goals_pg,                        # 41. corners_away
+        away_goals_l5,                              # 42. away_goals_l5
+        9.0 + (20 - away_position) * 0.2,           # 43. fouls_away
+        home_shots_pg - away_shots_pg,              # 44. shots_diff
+        (away_position - home_position) * 0.2,      # 45. fouls_diff
+        0.05 + (home_position / 200),               # 46. red_home
+        np.where(home_goals_l5 > 7.5, 1.0, 0.0)     # 47. ht_lead_home (strong attack)
+    )
+
+
 class LiveFeatureEngineer:
     """
     Lightweight feature engineering for upcoming matches
     Fetches REAL data from football-data.org API instead of using dummy defaults
     """
     
-    def __init__(self):
+    def __init__(self, metrics=None, standings=None, recent_matches=None):
+        """standings / recent_matches: use these instead of fetching from the API"""
+        self.metrics = metrics or RunMetrics('live_features', enabled=False)
         self.api_key = os.getenv('FOOTBALL_DATA_API_KEY', '')
         self.base_url = 'https://api.football-data.org/v4'
         self.headers = {'X-Auth-Token': self.api_key}
@@ -213,13 +327,28 @@ class LiveFeatureEngineer:
         self.cache = {}
         self.cache_ttl = 3600  # 1 hour cache
         
-        # Fetch real data on init
-        self.standings = self._fetch_standings()
-        self.recent_matches = self._fetch_recent_matches()
-        self.team_stats = self._compute_team_stats()
+        # Fetch real data on init (unless given)
+        if standings is None:
+            with self.metrics.span('standings_fetch'):
+                standings = self._fetch_standings()
+        if recent_matches is None:
+            with self.metrics.span('recent_matches_fetch'):
+                recent_matches = self._fetch_recent_matches()
+        self.standings = standings
+        self.recent_matches = recent_matches
+        with self.metrics.span('team_stats'):
+            self.team_stats = self._compute_team_stats()
         
         logger.info(f"✅ LiveFeatureEngineer initialized with {len(self.team_stats)} teams")
     
+    @classmethod
+    def from_data(cls, standings, recent_matches, metrics=None):
+        """
+        Engineer over given standings / recent matches instead of the API
+        (same shapes as _fetch_standings / _fetch_recent_matches)
+        """
+        return cls(metrics=metrics, standings=standings, recent_matches=recent_matches)
+    
     def _fetch_standings(self):
         """Fetch current Premier League standings"""
         cache_key = 'standings'
@@ -416,10 +545,11 @@ class LiveFeatureEngineer:
             'shots_per_game': 12.0
         }
     
-    def engineer_features(self, home_team, away_team):
+    def engineer_features(self, home_team, away_team, out=None):
         """
         Generate feature vector for upcoming match using REAL team data
         Returns 48 features matching the v5_proper model
+        If `out` is given (a preallocated row), values are written into it in place
         """
         # Get REAL team stats from API
         home_data = self.team_stats.get(home_team, {})
@@ -446,111 +576,99 @@ class LiveFeatureEngineer:
                 'form_last_5_ppg': 1.5
             }
         
-        # Extract home team metrics
-        home_form_ppg = home_data['form_last_5_ppg']
-        home_goals_pg = home_data['home_goals_per_game']  # Use HOME-specific
-        home_conceded_pg = home_data['home_conceded_per_game']
-        home_win_rate = home_data['home_win_rate']
-        home_position = home_data['position']
-        
-        # Extract away team metrics
-        away_form_ppg = away_data['form_last_5_ppg']
-        away_goals_pg = away_data['away_goals_per_game']  # Use AWAY-specific
-        away_conceded_pg = away_data['away_conceded_per_game']
-        away_win_rate = away_data['away_win_rate']
-        away_position = away_data['position']
-        
-        # Calculate derived metrics (5 games projection)
-        home_goals_l5 = home_goals_pg * 5
-        away_goals_l5 = away_goals_pg * 5
-        home_conceded_l5 = home_conceded_pg * 5
-        away_conceded_l5 = away_conceded_pg * 5
-        home_wins_l5 = home_win_rate * 5
-        away_wins_l5 = away_win_rate * 5
-        
-        # Estimate shots from goals (typical conversion ~15%)
-        home_shots_pg = home_goals_pg / 0.15
-        away_shots_pg = away_goals_pg / 0.15
-        home_sot_pg = home_shots_pg * 0.4  # ~40% shots on target
-        away_sot_pg = away_shots_pg * 0.4
-        
-        # Consistency (based on goal difference stability)
-        home_consistency = min(0.9, 0.5 + abs(home_data['goal_difference']) * 0.02)
-        away_consistency = min(0.9, 0.5 + abs(away_data['goal_difference']) * 0.02)
-        
-        # Momentum (form relative to season average)
-        home_momentum = home_form_ppg / max(0.1, home_data['points_per_game'])
-        away_momentum = away_form_ppg / max(0.1, away_data['points_per_game'])
-        
-        # Position differential (quality gap)
-        position_diff = away_position - home_position  # Positive = home team better
-        
-        # Build 48-feature vector with REAL differentiated data per team
-        features = np.array([
-            home_consistency,                           # 0. consistency_home
-            away_sot_pg,                                # 1. sot_away
-            2.0 + (away_position / 10),                 # 2. cards_away (worse teams = more cards)
-            away_shots_pg,                              # 3. shots_away
-            2.0 + (home_position / 10),                 # 4. yellow_home
-            home_goals_l5 * 0.55,                       # 5. goals_2h_home (slightly more 2nd half)
-            0.1 + (home_position / 100),                # 6. injury_risk_home
-            away_momentum,                              # 7. momentum_away
-            away_goals_l5 * 0.55,                       # 8. goals_2h_away
-            4.0 + home_goals_pg,                        # 9. corners_home (correlates with attack)
-            home_goals_l5 + away_goals_l5,              # 10. total_goals
-            home_wins_l5,                               # 11. home_wins_l5
-            home_sot_pg,                                # 12. sot_home
-            2.0 + (home_position / 10),                 # 13. cards_home
-            1.0 if (home_goals_l5 + away_goals_l5) > 12.5 else 0.0,  # 14. over_2_5
-            0.0,                                        # 15. travel_burden
-            home_sot_pg - away_sot_pg,                  # 16. sot_diff
-            home_goals_l5,                              # 17. home_goals_l5
-            (home_goals_pg - away_goals_pg) * 0.8,      # 18. corners_diff (proxy)
-            0.05 + (away_position / 200),               # 19. red_away
-            min(0.8, home_goals_pg / 10),               # 20. corner_efficiency_home
-            home_momentum,                              # 21. momentum_home
-            1.0 if home_form_ppg > away_form_ppg else 0.0,  # 22. home_win
-            home_goals_l5 - away_goals_l5,              # 23. goal_diff
-            9.0 + (20 - home_position) * 0.2,           # 24. fouls_home (better teams foul less)
-            2.0 + (away_position / 10),                 # 25. yellow_away
-            150.0,                                      # 26. travel_distance (average)
-            50.0 + position_diff * 2,                   # 27. possession_proxy_home (better = more)
-            away_consistency,                           # 28. consistency_away
-            min(0.5, home_sot_pg / home_shots_pg) if home_shots_pg > 0 else 0.35,  # 29. shot_accuracy_home
-            home_goals_l5 * 0.45,                       # 30. ht_advantage_home (first half)
-            (home_position - away_position) * 0.1,      # 31. cards_diff
-            min(0.8, away_goals_pg / 10),               # 32. corner_efficiency_away
-            away_goals_l5 * 0.45,                       # 33. goals_ht_away
-            0.1 + (away_position / 100),                # 34. injury_risk_away
-            min(0.5, away_sot_pg / away_shots_pg) if away_shots_pg > 0 else 0.35,  # 35. shot_accuracy_away
-            home_shots_pg,                              # 36. shots_home
-            0.2,                                        # 37. travel_fatigue_score
-            home_goals_l5 * 0.45,                       # 38. goals_ht_home
-            50.0 - position_diff * 2,                   # 39. possession_proxy_away
-            away_wins_l5,                               # 40. away_wins_l5
-            4.0 + away_goals_pg,                        # 41. corners_away
-            away_goals_l5,                              # 42. away_goals_l5
-            9.0 + (20 - away_position) * 0.2,           # 43. fouls_away
-            home_shots_pg - away_shots_pg,              # 44. shots_diff
-            (away_position - home_position) * 0.2,      # 45. fouls_diff
-            0.05 + (home_position / 200),               # 46. red_home
-            1.0 if home_goals_l5 > 7.5 else 0.0         # 47. ht_lead_home (strong attack)
-        ])
+        values = live_feature_values(home_data, away_data)
+        home_position, home_goals_pg = home_data['position'], home_data['home_goals_per_game']
+        away_position, away_goals_pg = away_data['position'], away_data['away_goals_per_game']
         
         logger.info(f"🎯 Features for {home_team} (pos {home_position}, {home_goals_pg:.1f}gpg) vs {away_team} (pos {away_position}, {away_goals_pg:.1f}gpg)")
         
-        return features
+        if out is None:
+            return np.array(values)
+        out[:] = values
+        return out
 
 
 class PredictionGenerator:
     """Generates predictions using the trained ML model"""
     
-    def __init__(self, model_path=MODEL_PATH):
-        self.model = self._load_model(model_path)
-        self.feature_engineer = LiveFeatureEngineer()
+    BACKENDS = ('sklearn', 'onnx')
+    
+    def __init__(self, model_path=MODEL_PATH, backend='sklearn', onnx_path=ONNX_PATH, metrics=None,
+                 dtype=np.float32, batch_size=MATCHDAY_BATCH, drift_monitor=None, feature_engineer=None):
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown inference backend '{backend}' (choose from {self.BACKENDS})")
+        
+        self.backend = backend
+        self.dtype = np.dtype(dtype)
+        self.metrics = metrics or RunMetrics('prediction_generator', enabled=False)
+        self.drift_monitor = drift_monitor
+        with self.metrics.span('model_load'):
+            self.model = self._load_model(model_path)
+            self.session = None
+            if backend == 'onnx':
+                # Imported here: export_onnx pulls in the exporters and configures logging
+                from export_onnx import INPUT_NAME, PROBA_OUTPUT, load_onnx_session
+                self.session = load_onnx_session(onnx_path)
+                self._onnx_io = (INPUT_NAME, PROBA_OUTPUT)
+        self.feature_engineer = feature_engineer or LiveFeatureEngineer(metrics=self.metrics)
+        # Explanations always come from the bundle members (also under the ONNX backend)
+        self.explainer = ExplanationEngine(self.model) if isinstance(self.model, dict) else None
+        
+        # Reusable buffers for the float32 path, sized for a matchday and grown on demand
+        self._n_features = self._feature_count()
+        self._n_classes = self._class_count()
+        self._feature_buffer = np.empty((0, self._n_features), dtype=self.dtype)
+        self._scaled_buffer = np.empty((0, self._n_features), dtype=self.dtype)
+        self._proba_buffer = np.empty((0, 2), dtype=np.float64)
+        self._ensure_capacity(batch_size)
+        self._prepare_scaler()
+    
+    def _feature_count(self):
+        """Number of model input features (48 for v5_proper)"""
+        if isinstance(self.model, dict):
+            names = self.model.get('features') or self.model.get('feature_names')
+            if names:
+                return len(names)
+            scaler = self.model.get('scaler')
+            if scaler is not None and hasattr(scaler, 'n_features_in_'):
+                return int(scaler.n_features_in_)
+        return getattr(self.model, 'n_features_in_', 48)
+    
+    def _class_count(self):
+        """Classes the ensemble predicts (the float32 path only handles binary members)"""
+        models = self.model.get('models', {}) if isinstance(self.model, dict) else {'model': self.model}
+        counts = {len(getattr(model, 'classes_', ())) for model in models.values()}
+        return counts.pop() if len(counts) == 1 else 0
+    
+    def _ensure_capacity(self, n_rows):
+        """Grow the preallocated buffers (never shrinks, so steady state allocates nothing)"""
+        if n_rows <= len(self._feature_buffer):
+            return
+        self._feature_buffer = np.empty((n_rows, self._n_features), dtype=self.dtype)
+        self._scaled_buffer = np.empty((n_rows, self._n_features), dtype=self.dtype)
+        self._proba_buffer = np.empty((n_rows, 2), dtype=np.float64)
+    
+    def _prepare_scaler(self):
+        """Cache StandardScaler parameters in the buffer dtype for in-place scaling"""
+        self._scaler_mean = None
+        self._scaler_inv_scale = None
+        scaler = self.model.get('scaler') if isinstance(self.model, dict) else None
+        if scaler is None:
+            return
+        n = self._n_features
+        mean = scaler.mean_ if getattr(scaler, 'with_mean', True) and scaler.mean_ is not None else np.zeros(n)
+        scale = scaler.scale_ if getattr(scaler, 'with_std', True) and scaler.scale_ is not None else np.ones(n)
+        self._scaler_mean = np.ascontiguousarray(mean, dtype=self.dtype)
+        self._scaler_inv_scale = np.ascontiguousarray(1.0 / scale, dtype=self.dtype)
     
     def _load_model(self, model_path):
-        """Load the trained ensemble model"""
+        """Load the trained ensemble model (model store alias first, then the pickle)"""
+        if model_path == MODEL_PATH:
+            try:
+                return load_bundle(MODEL_ALIAS)
+            except FileNotFoundError:
+                pass
+        
         if not model_path.exists():
             raise FileNotFoundError(f"Model not found: {model_path}")
         
@@ -565,31 +683,63 @@ class PredictionGenerator:
         Generate prediction for a single match
         Returns: dict with prediction details
         """
+        return self.predict_batch([(home_team, away_team)])[0]
+    
+    def predict_batch(self, matches):
+        """
+        Generate predictions for a batch of (home_team, away_team) pairs
+        Features are written straight into the preallocated buffer and scored in one call
+        Returns: list of prediction dicts (same order as `matches`)
+        """
+        n = len(matches)
+        if n == 0:
+            return []
+        self._ensure_capacity(n)
+        features_2d = self._feature_buffer[:n]
+        
         # Engineer features
-        features = self.feature_engineer.engineer_features(home_team, away_team)
-        features_2d = features.reshape(1, -1)
+        with self.metrics.span('feature_build'):
+            for i, (home_team, away_team) in enumerate(matches):
+                self.feature_engineer.engineer_features(home_team, away_team, out=features_2d[i])
         
-        # Handle ensemble model structure
-        if isinstance(self.model, dict):
-            # Custom ensemble with multiple models
-            models = self.model.get('models', {})
-            weights = self.model.get('weights', {})
-            
-            proba_list = []
-            weight_list = []
-            
-            for model_name, model in models.items():
-                proba = model.predict_proba(features_2d)[0]
-                proba_list.append(proba)
-                weight = weights.get(model_name, 1.0 / len(models))
-                weight_list.append(weight)
-            
-            # Weighted average
-            avg_proba = np.average(proba_list, axis=0, weights=weight_list)
-        else:
-            # Standard sklearn model
-            avg_proba = self.model.predict_proba(features_2d)[0]
+        return self.predict_features(features_2d, matches)
+    
+    def predict_features(self, features_2d, matches):
+        """
+        Predictions from an already-built (n_matches, n_features) matrix, e.g. the
+        point-in-time features of a historical replay (see asof_features.py)
+        Returns: list of prediction dicts (same order as `matches`)
+        """
+        n = len(matches)
+        self._ensure_capacity(n)
+        features_2d = np.asarray(features_2d, dtype=self.dtype)
+        
+        if self.drift_monitor is not None:
+            # Monitoring must never take down inference
+            try:
+                names = self.model.get('features') if isinstance(self.model, dict) else None
+                self.drift_monitor.observe_features(features_2d, names)
+            except Exception as e:
+                logger.warning(f"⚠️ Drift monitor could not observe features: {e}")
+        
+        with self.metrics.span('model_inference'):
+            avg_probas = self._ensemble_proba(features_2d)
         
+        explanations = [None] * n
+        if self.explainer is not None:
+            with self.metrics.span('explanations'):
+                try:
+                    explanations = self.explainer.explain_batch(features_2d, matches)
+                except Exception as e:
+                    logger.warning(f"⚠️ Could not compute explanations: {e}")
+        
+        return [
+            self._build_prediction(home_team, away_team, avg_probas[i], explanations[i])
+            for i, (home_team, away_team) in enumerate(matches)
+        ]
+    
+    def _build_prediction(self, home_team, away_team, avg_proba, explanation=None):
+        """Turn ensemble class probabilities into the published prediction dict"""
         # Interpret probabilities
         if len(avg_proba) == 3:
             # 3-class: Home, Draw, Away
@@ -628,8 +778,9 @@ class PredictionGenerator:
         # Value bet if edge > 5%
         value_bet = bool(edge_pct > 5)
         
-        # Generate AI reasoning
-        reasoning = self._generate_reasoning(home_team, away_team, features, home_prob, away_prob)
+        # AI reasoning from the batch feature contributions
+        explanation = explanation or {'factors': [], 'reasons': []}
+        reasoning = explanation['reasons']
         
         return {
             'prediction': str(prediction),
@@ -647,6 +798,7 @@ class PredictionGenerator:
             'value_bet': bool(value_bet),
             'edge_pct': float(round(edge_pct, 2)),
             'ai_reasoning': [str(r) for r in reasoning],
+            'key_factors': explanation['factors'],
             # Additional predictions (simplified)
             'over_25': {
                 'prediction': bool(home_prob + away_prob > 0.6),
@@ -658,48 +810,115 @@ class PredictionGenerator:
             }
         }
     
-    def _generate_reasoning(self, home_team, away_team, features, home_prob, away_prob):
-        """Generate human-readable reasoning"""
-        reasoning = []
+    def _ensemble_proba(self, features_2d):
+        """Weighted ensemble class probabilities for a (n_matches, n_features) matrix"""
+        if self.backend == 'onnx':
+            # Scaler, members and weighting all live inside the ONNX graph
+            input_name, proba_output = self._onnx_io
+            return self.session.run(
+                [proba_output], {input_name: features_2d.astype(np.float32, copy=False)}
+            )[0]
         
-        # Form analysis
-        home_form = features[0]  # Last 5 PPG
-        away_form = features[2]
+        if self.dtype == np.float32 and isinstance(self.model, dict) and self._n_classes == 2:
+            return self._ensemble_proba_float32(features_2d)
         
-        if home_form > 2.0:
-            reasoning.append(f"{home_team} excellent home form: {home_form:.1f} PPG")
-        elif home_form < 1.0:
-            reasoning.append(f"{home_team} struggling at home: {home_form:.1f} PPG")
-        
-        if away_form > 2.0:
-            reasoning.append(f"{away_team} strong away form: {away_form:.1f} PPG")
-        elif away_form < 1.0:
-            reasoning.append(f"{away_team} poor away record: {away_form:.1f} PPG")
-        
-        # Head-to-head context
-        if home_prob > 0.6:
-            reasoning.append(f"Strong home advantage: {home_prob*100:.0f}% win probability")
-        elif away_prob > 0.6:
-            reasoning.append(f"Away team favored: {away_prob*100:.0f}% win probability")
+        return self._ensemble_proba_float64(features_2d)
+    
+    def _ensemble_proba_float64(self, features_2d):
+        """Reference path through each library's predict_proba (allocates per call)"""
+        # Handle ensemble model structure
+        if isinstance(self.model, dict):
+            # Custom ensemble with multiple models (trained on scaled features)
+            models = self.model.get('models', {})
+            weights = self.model.get('weights', {})
+            best_iterations = self.model.get('best_iterations') or {}
+            scaler = self.model.get('scaler')
+            if scaler is not None:
+                features_2d = scaler.transform(features_2d)
+            
+            proba_list = []
+            weight_list = []
+            
+            for model_name, model in models.items():
+                proba_list.append(self._member_proba(model, features_2d, best_iterations.get(model_name)))
+                weight_list.append(weights.get(model_name, 1.0 / len(models)))
+            
+            # Weighted average
+            return np.average(proba_list, axis=0, weights=weight_list)
         
-        # Defensive analysis
-        home_def = features[4]
-        away_def = features[5]
+        # Standard sklearn model
+        return self.model.predict_proba(features_2d)
+    
+    def _ensemble_proba_float32(self, features_2d):
+        """
+        Float32 path: scale into a preallocated buffer, then feed each member the
+        input type it consumes natively so no library re-converts the matrix
+        """
+        n = len(features_2d)
+        scaled = self._scaled_buffer[:n]
+        if self._scaler_mean is not None:
+            np.subtract(features_2d, self._scaler_mean, out=scaled)
+            np.multiply(scaled, self._scaler_inv_scale, out=scaled)
+        else:
+            np.copyto(scaled, features_2d)
         
-        if home_def < 1.0:
-            reasoning.append(f"{home_team} solid defense: {home_def:.2f} GA/game")
-        if away_def > 1.5:
-            reasoning.append(f"{away_team} leaky defense: {away_def:.2f} GA/game")
+        models = self.model.get('models', {})
+        weights = self.model.get('weights', {})
+        best_iterations = self.model.get('best_iterations') or {}
+        total_weight = sum(weights.get(name, 1.0 / len(models)) for name in models)
         
-        return reasoning[:4]  # Limit to top 4 insights
+        proba = self._proba_buffer[:n]
+        proba.fill(0.0)
+        home_col = proba[:, 1]
+        for model_name, model in models.items():
+            weight = weights.get(model_name, 1.0 / len(models)) / total_weight
+            home_col += weight * self._member_home_proba(model, scaled, best_iterations.get(model_name))
+        np.subtract(1.0, home_col, out=proba[:, 0])
+        return proba
+    
+    @staticmethod
+    def _member_proba(model, X, best_iteration=None):
+        """All class probabilities from one member, cut at its early-stopping best_iteration"""
+        if best_iteration:
+            model_type = type(model).__name__
+            if model_type == 'XGBClassifier':
+                return model.predict_proba(X, iteration_range=(0, best_iteration))
+            if model_type == 'LGBMClassifier':
+                return model.predict_proba(X, num_iteration=best_iteration)
+            if model_type == 'CatBoostClassifier':
+                return model.predict_proba(X, ntree_end=best_iteration)
+        return model.predict_proba(X)
+    
+    @staticmethod
+    def _member_home_proba(model, X, best_iteration=None):
+        """
+        P(class 1) from one binary member, bypassing sklearn-wrapper conversions
+        best_iteration (from early stopping) limits boosters to the trees that helped
+        """
+        model_type = type(model).__name__
+        if model_type == 'XGBClassifier':
+            # inplace_predict reads the float32 array directly (no DMatrix build)
+            if best_iteration:
+                return model.get_booster().inplace_predict(X, iteration_range=(0, best_iteration))
+            return model.get_booster().inplace_predict(X)
+        if model_type == 'LGBMClassifier':
+            # The raw booster accepts float32 without casting to float64
+            return model.booster_.predict(X, num_iteration=best_iteration)
+        if model_type == 'CatBoostClassifier' and best_iteration:
+            return model.predict_proba(X, ntree_end=best_iteration)[:, 1]
+        # RandomForest (float32 trees) and CatBoost consume float32 as-is
+        return model.predict_proba(X)[:, 1]
 
 
 class PredictionPipeline:
     """Main pipeline orchestrator"""
     
-    def __init__(self):
+    def __init__(self, backend='sklearn', metrics=None):
+        # Metrics start here so model loading and standings fetches are captured too
+        self.metrics = metrics or RunMetrics('prediction_pipeline')
         self.fixture_fetcher = FixtureFetcher()
-        self.predictor = PredictionGenerator()
+        self.drift_monitor = DriftMonitor.load()
+        self.predictor = PredictionGenerator(backend=backend, metrics=self.metrics, drift_monitor=self.drift_monitor)
     
     def run(self, days_ahead=7):
         """
@@ -708,25 +927,35 @@ class PredictionPipeline:
         2. Generate predictions
         3. Save to JSON
         4. Save to database (optional)
+        The metrics record is written for failed runs too (status 'error')
         """
+        counts = {'fixtures': 0, 'predictions': 0}
+        status = 'error'
+        try:
+            predictions = self._run(days_ahead, counts)
+            status = 'ok'
+            return predictions
+        finally:
+            self.metrics.finish(status=status, backend=self.predictor.backend, **counts)
+    
+    def _run(self, days_ahead, counts):
         logger.info("=" * 60)
         logger.info("🚀 LIVE PREDICTION PIPELINE")
         logger.info("=" * 60)
         
         # Step 1: Fetch fixtures
-        fixtures = self.fixture_fetcher.fetch_fixtures(days_ahead)
+        with self.metrics.span('fixture_fetch'):
+            fixtures = self.fixture_fetcher.fetch_fixtures(days_ahead)
         logger.info(f"📅 Found {len(fixtures)} upcoming fixtures")
+        counts['fixtures'] = len(fixtures)
+        
+        # Step 2: Generate predictions (one batched inference call for the matchday)
+        batch = self.predictor.predict_batch([(f['home_team'], f['away_team']) for f in fixtures])
         
-        # Step 2: Generate predictions
         predictions = []
-        for fixture in fixtures:
+        for fixture, prediction in zip(fixtures, batch):
             logger.info(f"🔮 Predicting: {fixture['home_team']} vs {fixture['away_team']}")
             
-            prediction = self.predictor.predict_match(
-                fixture['home_team'],
-                fixture['away_team']
-            )
-            
             # Combine fixture + prediction
             full_prediction = {
                 'match_id': fixture['match_id'],
@@ -741,6 +970,7 @@ class PredictionPipeline:
             predictions.append(full_prediction)
             
             logger.info(f"  ✅ {prediction['prediction']} ({prediction['confidence']*100:.1f}% confidence)")
+        counts['predictions'] = len(predictions)
         
         # Step 3: Save to JSON
         output = {
@@ -750,16 +980,26 @@ class PredictionPipeline:
         }
         
         output_file = PREDICTIONS_DIR / f"{datetime.now().strftime('%Y-%m-%d')}_predictions.json"
-        with open(output_file, 'w') as f:
-            json.dump(output, f, indent=2)
+        with self.metrics.span('json_write'):
+            publish(output_file, output)
         
         logger.info(f"💾 Saved predictions to {output_file}")
         
         # Step 4: Save to database (if available)
+        with self.metrics.span('database_save'):
+            try:
+                self._save_to_database(predictions)
+            except Exception as e:
+                logger.warning(f"⚠️ Could not save to database: {e}")
+        
+        # Step 5: Persist drift state (live feature histograms)
         try:
-            self._save_to_database(predictions)
-        except Exception as e:
-            logger.warning(f"⚠️ Could not save to database: {e}")
+            self.drift_monitor.save()
+            drift = self.drift_monitor.status()
+            if drift['retrain']:
+                logger.warning(f"⚠️ Drift detected: {'; '.join(drift['reasons'])}")
+        except OSError as e:
+            logger.warning(f"⚠️ Could not save drift state: {e}")
         
         logger.info("=" * 60)
         logger.info(f"✅ PIPELINE COMPLETE: {len(predictions)} predictions generated")
@@ -810,8 +1050,72 @@ class PredictionPipeline:
             logger.error(f"❌ Database error: {e}")
 
 
+def profile_allocations(generator, matches, repeats=20):
+    """
+    Measure traced allocations per prediction with tracemalloc:
+    float64 per-match path (before) vs float32 preallocated batch path (after).
+    Native allocations inside XGBoost/LightGBM/CatBoost are not visible to tracemalloc.
+    """
+    import tracemalloc
+    
+    if not matches:
+        logger.warning("⚠️  No fixtures to profile")
+        return {}
+    
+    def float64_path():
+        for home_team, away_team in matches:
+            features = generator.feature_engineer.engineer_features(home_team, away_team)
+            generator._ensemble_proba_float64(features.reshape(1, -1))
+    
+    def float32_path():
+        features_2d = generator._feature_buffer[:len(matches)]
+        for i, (home_team, away_team) in enumerate(matches):
+            generator.feature_engineer.engineer_features(home_team, away_team, out=features_2d[i])
+        generator._ensemble_proba_float32(features_2d)
+    
+    generator._ensure_capacity(len(matches))
+    previous_level = logger.level
+    logger.setLevel(logging.WARNING)  # keep per-match log lines out of the measurement
+    
+    results = {}
+    try:
+        for label, fn in (('float64 per-match', float64_path), ('float32 batch', float32_path)):
+            fn()  # warm-up: lazy imports, first-call caches, buffer growth
+            tracemalloc.start()
+            peaks, nets = [], []
+            for _ in range(repeats):
+                before, _peak = tracemalloc.get_traced_memory()
+                tracemalloc.reset_peak()
+                fn()
+                after, peak = tracemalloc.get_traced_memory()
+                peaks.append(peak - before)
+                nets.append(after - before)
+            tracemalloc.stop()
+            results[label] = {
+                'peak_bytes_per_prediction': float(np.median(peaks)) / len(matches),
+                'net_bytes_per_prediction': float(np.median(nets)) / len(matches),
+            }
+    finally:
+        logger.setLevel(previous_level)
+    
+    print(f"\n🧠 ALLOCATIONS PER PREDICTION ({len(matches)} matches x {repeats} runs, tracemalloc)")
+    print("-" * 60)
+    print(f"{'Path':<22} {'Peak bytes':>16} {'Net bytes':>16}")
+    print("-" * 60)
+    for label, r in results.items():
+        print(f"{label:<22} {r['peak_bytes_per_prediction']:>16,.0f} {r['net_bytes_per_prediction']:>16,.0f}")
+    print("-" * 60)
+    return results
+
+
 def main():
-    pipeline = PredictionPipeline()
+    if '--profile-alloc' in sys.argv:
+        generator = PredictionGenerator()
+        fixtures = FixtureFetcher().fetch_fixtures(days_ahead=7)
+        return profile_allocations(generator, [(f['home_team'], f['away_team']) for f in fixtures])
+    
+    # INFERENCE_BACKEND=onnx runs the exported graph on onnxruntime (see export_onnx.py)
+    pipeline = PredictionPipeline(backend=os.getenv('INFERENCE_BACKEND', 'sklearn'))
     predictions = pipeline.run(days_ahead=7)
     
     # Print summary
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Atomic JSON Publishing
+One write path for the JSON files the site, bot and dashboard read
+(data/predictions/*, docs/data/*):
+  - the payload is serialized once (orjson when installed, else json)
+  - bytes go to a temp file in the target directory, are fsynced and renamed
+    over the target, so readers see the old file or the new one, never half of it
+  - mirrors are hard links to the primary (atomically swapped in), or byte
+    copies when linking is not possible (other filesystem, no permission);
+    `copies` are always written as independent files
+  - a hard-linked mirror shares its bytes with the primary: a writer that
+    rewrites either path in place (open(..., 'w'), cp) changes both. Every
+    writer must go through publish(), and aliases other tools may overwrite
+    (latest.json) belong in `copies`, not `mirrors`
+  - every target is flock'ed for the duration, so concurrent cron jobs
+    publishing the same files serialize instead of interleaving
+
+Usage:
+    from publish import publish
+    publish(BASE_DIR / 'data' / 'predictions' / 'latest.json', picks,
+            mirrors=[BASE_DIR / 'docs' / 'data' / 'predictions' / 'picks_2025-01-01.json'],
+            copies=[BASE_DIR / 'data' / 'predictions' / 'latest.json'])
+"""
+
+import hashlib
+import json
+import logging
+import os
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib encoder
+    orjson = None
+
+try:
+    import fcntl
+except ImportError:  # no advisory locks (Windows); writes stay atomic, just not serialized
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+LOCK_DIR = BASE_DIR / 'data' / 'locks'
+
+
+def dumps(data, indent=2):
+    """Serialize to UTF-8 JSON bytes (2-space indent or compact, as orjson supports)"""
+    if isinstance(data, bytes):
+        return data
+    if isinstance(data, str):
+        return data.encode()
+    if orjson is not None:
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, option=option)
+    return json.dumps(data, indent=2 if indent else None, ensure_ascii=False).encode()
+
+
+def _fsync_dir(directory):
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:  # directories cannot be opened on every platform
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def write_atomic(path, data, fsync=True):
+    """Write bytes to a temp file next to `path`, fsync and rename it over `path`"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp, 'wb') as f:
+            f.write(data)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    if fsync:
+        _fsync_dir(path.parent)
+
+
+def link_or_copy(source, target, data):
+    """Atomically point `target` at `source`'s bytes: hard link when possible, else a copy"""
+    target = Path(target)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+    try:
+        tmp.unlink(missing_ok=True)
+        os.link(source, tmp)
+        os.replace(tmp, target)
+    except OSError:
+        tmp.unlink(missing_ok=True)
+        write_atomic(target, data)
+        return 'copied'
+    _fsync_dir(target.parent)
+    return 'linked'
+
+
+def _lock_path(path):
+    resolved = Path(path).resolve()
+    try:
+        name = str(resolved.relative_to(BASE_DIR)).replace(os.sep, '__')
+    except ValueError:  # outside the repo: name the lock by the path hash
+        name = hashlib.sha1(str(resolved).encode()).hexdigest()[:16]
+    return LOCK_DIR / f"{name}.lock"
+
+
+@contextmanager
+def file_lock(path):
+    """Exclusive cross-process lock on `path` (held in LOCK_DIR, not next to published files)"""
+    if fcntl is None:
+        yield
+        return
+    lock_path = _lock_path(path)
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, 'a') as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def publish(path, data, mirrors=(), copies=(), indent=2):
+    """
+    Serialize `data` once (bytes / str are written as-is) and publish it atomically
+    to `path`, every mirror (hard links) and every copy (own files), holding a lock
+    on all of them.
+    Returns: the bytes written
+    """
+    payload = dumps(data, indent)
+    path = Path(path)
+    mirrors = [Path(m) for m in mirrors if Path(m).resolve() != path.resolve()]
+    copies = [Path(c) for c in copies if Path(c).resolve() != path.resolve()]
+    with ExitStack() as stack:
+        # Sorted lock order, so two jobs publishing overlapping targets cannot deadlock
+        for target in sorted({str(p.resolve()) for p in [path, *mirrors, *copies]}):
+            stack.enter_context(file_lock(target))
+        write_atomic(path, payload)
+        for mirror in mirrors:
+            if link_or_copy(path, mirror, payload) == 'copied':
+                logger.debug(f"📄 Copied {path.name} to {mirror} (hard link not possible)")
+        for copy in copies:
+            write_atomic(copy, payload)
+    return payload
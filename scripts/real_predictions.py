@@ -4,8 +4,6 @@ Real Predictions — uses actual model + live API data + real odds
 Outputs picks with genuine confidence levels
 """
 
-import pickle
-import json
 import os
 import sys
 import requests
@@ -15,6 +13,11 @@ from pathlib import Path
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 
+from drift_monitor import DriftMonitor
+from pipeline_metrics import RunMetrics
+from model_store import load_bundle
+from publish import publish
+
 load_dotenv(Path(__file__).resolve().parent.parent / '.env')
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -79,8 +82,8 @@ def calc_market_odds(home, away, standings):
 
 
 def load_model():
-    with open(MODEL_PATH, 'rb') as f:
-        return pickle.load(f)
+    """Production model from the model store, else the legacy pickle"""
+    return load_bundle(fallback_path=MODEL_PATH)
 
 
 def fetch_standings():
@@ -296,7 +299,7 @@ def calibrate_probability(raw_prob, temperature=2.5):
 def predict_match(model_data, features, market_odds=None):
     """
     Run ensemble prediction with calibration.
-    Returns home_win probability (calibrated).
+    Returns (home_win probability (calibrated), not-home probability, raw model home_win probability).
     If market_odds provided, blends model + market for realistic output.
     """
     scaler = model_data['scaler']
@@ -331,7 +334,7 @@ def predict_match(model_data, features, market_odds=None):
         cal_home = cal_home * MODEL_WEIGHT + market_home_fair * MARKET_WEIGHT
 
     not_home = 1.0 - cal_home
-    return cal_home, not_home
+    return cal_home, not_home, raw_home
 
 
 def implied_prob(decimal_odds):
@@ -353,55 +356,71 @@ def find_odds_key(home, away):
 
 
 def main():
+    metrics = RunMetrics('real_predictions')
+    status = 'error'
+    try:
+        result = _run(metrics)
+        status = 'ok'
+        return result
+    finally:
+        metrics.finish(status=status)
+
+
+def _run(metrics):
     print("=" * 60)
     print("⚡ KICK LAB AI — REAL PREDICTIONS (MATCHWEEK 26)")
     print("=" * 60)
     print()
 
     # Load model
-    model_data = load_model()
+    with metrics.span('model_load'):
+        model_data = load_model()
     print(f"✅ Model loaded: {model_data['version']}")
 
     # Fetch live data
-    standings = fetch_standings()
-    matches = fetch_recent_matches(days=60)
+    with metrics.span('standings_fetch'):
+        standings = fetch_standings()
+    with metrics.span('recent_matches_fetch'):
+        matches = fetch_recent_matches(days=60)
     if not standings:
         print("❌ Cannot proceed without standings data")
         return
 
-    stats = compute_team_stats(standings, matches)
+    with metrics.span('team_stats'):
+        stats = compute_team_stats(standings, matches)
     print(f"✅ Stats computed for {len(stats)} teams")
     print()
 
     # Fetch upcoming fixtures from API
-    try:
-        date_from = datetime.now().strftime('%Y-%m-%d')
-        date_to = (datetime.now() + timedelta(days=7)).strftime('%Y-%m-%d')
-        r = requests.get(f"{BASE_URL}/competitions/PL/matches",
-                         headers=HEADERS,
-                         params={'dateFrom': date_from, 'dateTo': date_to, 'status': 'SCHEDULED,TIMED'},
-                         timeout=10)
-        fixtures = []
-        if r.status_code == 200:
-            for m in r.json().get('matches', []):
-                # Convert UTC kickoff to Athens time (GMT+2)
-                from datetime import timezone
-                utc_str = m['utcDate']  # e.g. "2026-02-27T15:00:00Z"
-                utc_dt = datetime.strptime(utc_str, '%Y-%m-%dT%H:%M:%SZ').replace(tzinfo=timezone.utc)
-                athens_dt = utc_dt + timedelta(hours=2)
-                fixtures.append({
-                    'home': m['homeTeam']['name'],
-                    'away': m['awayTeam']['name'],
-                    'date': athens_dt.strftime('%Y-%m-%d'),
-                    'time': athens_dt.strftime('%H:%M'),
-                    'utc_date': utc_str,
-                })
-            print(f"✅ Fixtures: {len(fixtures)} upcoming matches")
-        else:
-            print(f"⚠️ Fixtures API: {r.status_code}")
-    except Exception as e:
-        print(f"❌ Fixture fetch error: {e}")
-        fixtures = []
+    with metrics.span('fixture_fetch'):
+        try:
+            date_from = datetime.now().strftime('%Y-%m-%d')
+            date_to = (datetime.now() + timedelta(days=7)).strftime('%Y-%m-%d')
+            r = requests.get(f"{BASE_URL}/competitions/PL/matches",
+                             headers=HEADERS,
+                             params={'dateFrom': date_from, 'dateTo': date_to, 'status': 'SCHEDULED,TIMED'},
+                             timeout=10)
+            fixtures = []
+            if r.status_code == 200:
+                for m in r.json().get('matches', []):
+                    # Convert UTC kickoff to Athens time (GMT+2)
+                    from datetime import timezone
+                    utc_str = m['utcDate']  # e.g. "2026-02-27T15:00:00Z"
+                    utc_dt = datetime.strptime(utc_str, '%Y-%m-%dT%H:%M:%SZ').replace(tzinfo=timezone.utc)
+                    athens_dt = utc_dt + timedelta(hours=2)
+                    fixtures.append({
+                        'home': m['homeTeam']['name'],
+                        'away': m['awayTeam']['name'],
+                        'date': athens_dt.strftime('%Y-%m-%d'),
+                        'time': athens_dt.strftime('%H:%M'),
+                        'utc_date': utc_str,
+                    })
+                print(f"✅ Fixtures: {len(fixtures)} upcoming matches")
+            else:
+                print(f"⚠️ Fixtures API: {r.status_code}")
+        except Exception as e:
+            print(f"❌ Fixture fetch error: {e}")
+            fixtures = []
 
     # If no fixtures from API, use odds keys
     if not fixtures:
@@ -419,6 +438,7 @@ def main():
 
     # Run predictions
     results = []
+    feature_rows = []   # live inputs for the drift monitor
     print()
     print("━" * 60)
 
@@ -427,10 +447,12 @@ def main():
         away = fix['away']
 
         # Build features
-        feats = build_features(home, away, stats)
+        with metrics.span('feature_build'):
+            feats = build_features(home, away, stats)
         if feats is None:
             print(f"⚠️ Skipping {home} vs {away} — no stats")
             continue
+        feature_rows.append(feats)
 
         # Find real odds — fall back to standings-based estimate if unavailable
         odds_key = find_odds_key(home, away)
@@ -443,7 +465,9 @@ def main():
             odds['time'] = fix.get('time', '15:00')
             odds['date'] = fix.get('date', '')
 
-        home_prob, not_home_prob = predict_match(model_data, feats, market_odds=odds if odds else None)
+        with metrics.span('model_inference'):
+            home_prob, not_home_prob, model_home_prob = predict_match(model_data, feats,
+                                                                      market_odds=odds if odds else None)
 
         # Determine prediction using market context
         # Model gives us P(home win). For draw/away, use market odds as guide.
@@ -508,6 +532,7 @@ def main():
             'prediction': prediction,
             'confidence': round(confidence * 100, 1),
             'home_prob': round(home_prob * 100, 1),
+            'model_home_prob': round(model_home_prob * 100, 1),   # ensemble output, before calibration / market blend
             'draw_prob': round(draw_prob * 100, 1),
             'away_prob': round(away_prob * 100, 1),
             'odds': pick_odds,
@@ -525,15 +550,27 @@ def main():
             print(f"   💰 Odds: {pick_odds:.2f} | Edge: {edge:+.1f}%")
         print()
 
-    # Save results
+    # Feed the live inputs to the drift monitor; monitoring must never take down the picks
+    if feature_rows:
+        try:
+            monitor = DriftMonitor.load()
+            monitor.observe_features(np.array(feature_rows), model_data.get('features'))
+            monitor.save()
+        except Exception as e:
+            print(f"⚠️ Drift monitor could not observe features: {e}")
+
+    # Save results, with latest.json and the docs/ copies GitHub Pages serves
     output_path = BASE_DIR / 'data' / 'predictions' / f"picks_{datetime.now().strftime('%Y-%m-%d')}.json"
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    with open(output_path, 'w') as f:
-        json.dump(results, f, indent=2)
-    print(f"\n✅ Saved {len(results)} predictions to {output_path}")
+    mirrors = [BASE_DIR / 'docs' / 'data' / 'predictions' / output_path.name]
+    latest = [BASE_DIR / 'data' / 'predictions' / 'latest.json',
+              BASE_DIR / 'docs' / 'data' / 'predictions' / 'latest.json']
+    with metrics.span('json_write'):
+        publish(output_path, results, mirrors=mirrors, copies=latest)
+    print(f"\n✅ Saved {len(results)} predictions to {output_path} (+ latest.json and docs/ copies)")
 
     # Build Telegram message
-    msg = build_telegram_message(results)
+    with metrics.span('telegram_message'):
+        msg = build_telegram_message(results)
     print("\n" + "=" * 60)
     print("TELEGRAM MESSAGE:")
     print("=" * 60)
@@ -541,8 +578,7 @@ def main():
 
     # Save message for sending
     msg_path = BASE_DIR / 'data' / 'predictions' / 'latest_telegram_msg.txt'
-    with open(msg_path, 'w') as f:
-        f.write(msg)
+    publish(msg_path, msg)
     print(f"\n✅ Message saved to {msg_path}")
 
     return results, msg
@@ -16,6 +16,8 @@ load_dotenv(Path(__file__).resolve().parent.parent / '.env')
 
 from telegram import Bot
 
+from publish import publish
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 PREDICTIONS_DIR = BASE_DIR / 'data' / 'predictions'
 RESULTS_DIR = BASE_DIR / 'data' / 'results'
@@ -223,9 +225,10 @@ def main():
     # Update with results
     updated = update_results(predictions, finished)
 
-    # Save updated predictions
-    with open(pred_file, 'w') as f:
-        json.dump(updated, f, indent=2)
+    # Save updated predictions atomically, with the docs/ copy (hard link) and latest.json aliases
+    publish(pred_file, updated,
+            mirrors=[BASE_DIR / 'docs' / 'data' / 'predictions' / pred_file.name],
+            copies=[PREDICTIONS_DIR / 'latest.json', BASE_DIR / 'docs' / 'data' / 'predictions' / 'latest.json'])
     print(f"✅ Updated predictions saved")
 
     # Show summary
@@ -2,7 +2,9 @@
 """
 Real-Time Results Tracker — runs every 5 minutes during match windows.
 Checks for newly finished PL matches, posts results immediately to Telegram,
-and only posts each result once (state tracked in data/results/posted_state.json).
+and only posts each result once. Picks, results and posted state live in the
+settlement ledger (data/results/ledger.db); the picks JSON copies are rewritten
+only when a pick was settled.
 """
 
 import asyncio
@@ -18,13 +20,15 @@ load_dotenv(Path(__file__).resolve().parent.parent / '.env')
 from urllib.parse import urlencode
 from telegram import Bot
 
+from drift_monitor import DriftMonitor
+from publish import publish
+from settlement_ledger import SettlementLedger
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 PREDICTIONS_DIR = BASE_DIR / 'data' / 'predictions'
 RESULTS_DIR = BASE_DIR / 'data' / 'results'
 RESULTS_DIR.mkdir(parents=True, exist_ok=True)
 
-STATE_FILE = RESULTS_DIR / 'posted_state.json'
-
 API_KEY = os.getenv('FOOTBALL_DATA_API_KEY', '')
 HEADERS = {'X-Auth-Token': API_KEY}
 BASE_URL = 'https://api.football-data.org/v4'
@@ -62,19 +66,9 @@ def normalize(name):
     return TEAM_NORMALIZE.get(name, name.replace(' FC', '').replace(' AFC', '').strip())
 
 
-def load_state():
-    """Load set of already-posted match keys"""
-    if STATE_FILE.exists():
-        with open(STATE_FILE) as f:
-            data = json.load(f)
-        return set(data.get('posted', []))
-    return set()
-
-
-def save_state(posted_keys: set):
-    """Persist posted match keys"""
-    with open(STATE_FILE, 'w') as f:
-        json.dump({'posted': list(posted_keys), 'updated': datetime.utcnow().isoformat()}, f, indent=2)
+def match_key(pick):
+    """Canonical ledger key for a pick or result"""
+    return f"{normalize(pick['home'])}-{normalize(pick['away'])}"
 
 
 def fetch_finished_matches(days_back=3):
@@ -105,6 +99,7 @@ def fetch_finished_matches(days_back=3):
                     'score': f"{hg}-{ag}",
                     'home': home,
                     'away': away,
+                    'match_date': m['utcDate'][:10],
                 }
             print(f"✅ Fetched {len(results)} finished matches")
             return results
@@ -256,51 +251,47 @@ async def post_free_win(text):
         print(f"⚠️ Failed to post to free channel: {e}")
 
 
-def update_predictions_file(predictions, finished, pred_file):
-    """Update predictions JSON with settled results and save"""
-    updated = []
-    for pick in predictions:
-        home = normalize(pick['home'])
-        away = normalize(pick['away'])
-        key = f"{home}-{away}"
-        result = finished.get(key)
-        if result and not pick.get('settled'):
-            pick['result'] = result['result']
-            pick['score'] = result['score']
-            pick['correct'] = result['result'] == pick['prediction']
-            pick['settled'] = True
-        updated.append(pick)
-
-    with open(pred_file, 'w') as f:
-        json.dump(updated, f, indent=2)
-
-    # Also copy to docs/data for GitHub Pages
-    docs_pred = BASE_DIR / 'docs' / 'data' / 'predictions' / pred_file.name
-    docs_pred.parent.mkdir(parents=True, exist_ok=True)
-    with open(docs_pred, 'w') as f:
-        json.dump(updated, f, indent=2)
-
-    # Update latest.json
-    latest_src = BASE_DIR / 'data' / 'predictions' / 'latest.json'
-    latest_dst = BASE_DIR / 'docs' / 'data' / 'predictions' / 'latest.json'
-    with open(latest_src, 'w') as f:
-        json.dump(updated, f, indent=2)
-    with open(latest_dst, 'w') as f:
-        json.dump(updated, f, indent=2)
+def export_picks(ledger, pred_file, latest=True):
+    """Write the ledger view of a picks file to its JSON copies (only called when rows changed)"""
+    updated = ledger.picks_view(pred_file.name)
+    mirrors = [BASE_DIR / 'docs' / 'data' / 'predictions' / pred_file.name]
+    copies = []
+    if latest:
+        copies = [BASE_DIR / 'data' / 'predictions' / 'latest.json',
+                  BASE_DIR / 'docs' / 'data' / 'predictions' / 'latest.json']
+
+    publish(pred_file, updated, mirrors=mirrors, copies=copies)
+    ledger.mark_exported(pred_file)
 
     print(f"✅ Updated {pred_file.name} and docs/data copies")
     return updated
 
 
+def record_outcomes(new_results):
+    """Update the persisted drift monitor with newly settled picks (scored on the model's own probability)"""
+    try:
+        monitor = DriftMonitor.load()
+        for pick, result_data, _, _ in new_results:
+            # home_prob is blended with the market; older picks without the raw output are skipped
+            if pick.get('model_home_prob') is None:
+                continue
+            monitor.observe_outcome(pick['model_home_prob'] / 100, result_data['result'] == 'Home Win')
+        monitor.save()
+        status = monitor.status()
+        if status['retrain']:
+            print(f"⚠️ Drift monitor: {'; '.join(status['reasons'])}")
+    except Exception as e:
+        print(f"⚠️ Could not update drift monitor: {e}")
+
+
 def main():
     print("=" * 55)
     print(f"⏱️  KICK LAB AI — REAL-TIME RESULTS TRACKER")
     print(f"   {datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')}")
     print("=" * 55)
 
-    # Load already-posted state
-    posted_keys = load_state()
-    print(f"📋 Already posted: {len(posted_keys)} results")
+    ledger = SettlementLedger()
+    print(f"📋 Already posted: {ledger.posted_count()} results")
 
     # Fetch finished matches from API
     finished = fetch_finished_matches(days_back=3)
@@ -313,18 +304,22 @@ def main():
     if not predictions:
         return
 
-    # Find newly settled matches (finished AND in our predictions AND not yet posted)
-    new_results = []
-    for pick in predictions:
-        if pick.get('settled'):
-            continue  # already processed in file
-        home = normalize(pick['home'])
-        away = normalize(pick['away'])
-        key = f"{home}-{away}"
-
-        if key in finished and key not in posted_keys:
-            result_data = finished[key]
-            correct = result_data['result'] == pick['prediction']
+    # Only picks / results that are new since the last run get settled
+    changed_picks = ledger.sync_picks(pred_file, predictions, match_key)
+    new_result_keys = ledger.upsert_results(finished)
+    settled = ledger.settle(changed_picks | new_result_keys)
+
+    # Rewrite the JSON views of every picks file that had a pick settled
+    for source in sorted({source for source, *_ in settled}):
+        source_file = PREDICTIONS_DIR / source
+        if source_file.exists():
+            export_picks(ledger, source_file, latest=source == pred_file.name)
+
+    # Newly settled picks of the current file that were not posted yet
+    new_results, seen = [], set()
+    for source, pick, result_data, correct, key in settled:
+        if source == pred_file.name and key not in seen and not ledger.is_posted(key, result_data['match_date']):
+            seen.add(key)
             new_results.append((pick, result_data, correct, key))
 
     if not new_results:
@@ -333,13 +328,12 @@ def main():
 
     print(f"\n🆕 {len(new_results)} new result(s) found!")
 
-    # Update predictions file with all finished matches (not just new ones)
-    updated = update_predictions_file(predictions, finished, pred_file)
+    # Feed settled outcomes to the drift monitor (rolling Brier / log-loss / ADWIN)
+    record_outcomes(new_results)
 
     # Count season totals for record display
-    settled_all = [p for p in updated if p.get('settled')]
-    wins_all   = sum(1 for p in settled_all if p.get('correct'))
-    losses_all = len(settled_all) - wins_all
+    wins_all, settled_all = ledger.record(pred_file.name)
+    losses_all = settled_all - wins_all
 
     # Post each new result to Telegram
     for pick, result_data, correct, key in new_results:
@@ -352,7 +346,7 @@ def main():
         msg = build_result_message(pick, result_data, correct, wins=wins_all, losses=losses_all)
         try:
             asyncio.run(post_message(msg))
-            posted_keys.add(key)
+            ledger.mark_posted(key, result_data['match_date'])
         except Exception as e:
             print(f"  ⚠️ Failed to post to main channel: {e}")
 
@@ -364,10 +358,7 @@ def main():
             except Exception as e:
                 print(f"  ⚠️ Failed to post to free channel: {e}")
 
-    # Save updated state
-    save_state(posted_keys)
-
-    print(f"\n📊 Season total: {wins_all}/{len(settled_all)} correct")
+    print(f"\n📊 Season total: {wins_all}/{settled_all} correct")
 
 
 if __name__ == '__main__':
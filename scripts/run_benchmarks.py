@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+"""
+Performance Benchmarks
+Times the hot paths on seeded synthetic data and keeps a JSON history so every
+run is compared against the recent median of the same benchmark:
+  - feature engineering (team stats + feature rows) on 10k / 100k / 1M matches
+  - predict_batch latency at batch 1 / 10 / 100 / 1000 (needs a trained model)
+  - batch backtest throughput and confidence x edge threshold sweeps
+  - Telegram daily-picks formatting
+  - Flask /api/stats against a seeded SQLite database
+Benchmarks whose dependencies or models are missing are skipped, not failed.
+
+Usage:
+    python scripts/run_benchmarks.py                       # everything
+    python scripts/run_benchmarks.py --only features sweep --sizes 10000 100000
+    python scripts/run_benchmarks.py --no-save             # compare without recording the run
+"""
+
+import argparse
+import importlib.util
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+HISTORY_PATH = BASE_DIR / "results" / "benchmarks" / "history.json"
+MODEL_PATH = BASE_DIR / "models" / "ensemble_model_v5_proper.pkl"
+
+MATCH_SIZES = (10000, 100000, 1000000)
+BATCH_SIZES = (1, 10, 100, 1000)
+BACKTEST_GAMES = 100000
+SWEEP_GRID = (40, 25)               # confidence x edge thresholds
+SEEDED_PREDICTIONS = 5000           # rows in the /api/stats database
+SEED = 42
+
+TARGET_SECONDS = 1.0        # keep repeating a case until about this much time is spent
+MAX_REPEATS = 50
+MAX_HISTORY = 200           # runs kept in the history file
+HISTORY_RUNS = 10           # runs used for the median baseline
+REGRESSION_FACTOR = 1.25    # flag a case when its median is > 1.25x the baseline
+IMPROVEMENT_FACTOR = 0.8
+
+TEAMS = [
+    'Arsenal', 'Aston Villa', 'Bournemouth', 'Brentford', 'Brighton', 'Chelsea', 'Crystal Palace',
+    'Everton', 'Fulham', 'Ipswich', 'Leicester', 'Liverpool', 'Man City', 'Man United', 'Newcastle',
+    "Nott'm Forest", 'Southampton', 'Tottenham', 'West Ham', 'Wolves',
+]
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """Register a benchmark: a function(args) yielding (case, fn, items) tuples"""
+    def register(fn):
+        BENCHMARKS[name] = fn
+        return fn
+    return register
+
+
+def _load_script(module_name, filename):
+    """Import a numbered script (e.g. 05_backtest_v2.py) as a module"""
+    spec = importlib.util.spec_from_file_location(module_name, Path(__file__).parent / filename)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def time_case(fn, target_seconds=TARGET_SECONDS, max_repeats=MAX_REPEATS):
+    """
+    Wall-clock samples of fn(): one warm-up call, then repeats until target_seconds
+    (a warm-up slower than the target is used as the only sample)
+    """
+    start = time.perf_counter()
+    fn()
+    first = time.perf_counter() - start
+    if first >= target_seconds:
+        return [first]
+    samples = []
+    for _ in range(max(1, min(max_repeats, int(target_seconds / max(first, 1e-9))))):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+# ---- synthetic data -----------------------------------------------------
+
+def synthetic_league(n_matches, seed=SEED):
+    """
+    Standings and recent matches in the LiveFeatureEngineer API shapes
+    Returns: (standings {team: {...}}, recent_matches [{date, home_team, away_team, home_score, away_score}])
+    """
+    rng = np.random.default_rng(seed)
+    teams = np.array(TEAMS)
+    home_idx = rng.integers(0, len(teams), n_matches)
+    away_idx = (home_idx + rng.integers(1, len(teams), n_matches)) % len(teams)
+    home_score = rng.poisson(1.5, n_matches)
+    away_score = rng.poisson(1.2, n_matches)
+    start = datetime(2024, 8, 1)
+    days = np.sort(rng.integers(0, 365, n_matches))
+
+    recent_matches = [
+        {'date': (start + timedelta(days=int(d))).strftime('%Y-%m-%d'), 'home_team': teams[h],
+         'away_team': teams[a], 'home_score': int(hs), 'away_score': int(as_)}
+        for d, h, a, hs, as_ in zip(days, home_idx, away_idx, home_score, away_score)
+    ]
+
+    standings = {}
+    for position, team in enumerate(TEAMS, start=1):
+        won, draw, lost = (int(x) for x in rng.multinomial(38, [0.4, 0.25, 0.35]))
+        goals_for, goals_against = int(rng.integers(30, 90)), int(rng.integers(25, 80))
+        standings[team] = {
+            'position': position, 'played': 38, 'won': won, 'draw': draw, 'lost': lost,
+            'points': won * 3 + draw, 'goals_for': goals_for, 'goals_against': goals_against,
+            'goal_difference': goals_for - goals_against,
+        }
+    return standings, recent_matches
+
+
+def synthetic_fixtures(n, seed=SEED):
+    rng = np.random.default_rng(seed)
+    home_idx = rng.integers(0, len(TEAMS), n)
+    away_idx = (home_idx + rng.integers(1, len(TEAMS), n)) % len(TEAMS)
+    return [(TEAMS[h], TEAMS[a]) for h, a in zip(home_idx, away_idx)]
+
+
+def synthetic_predictions(n, seed=SEED):
+    """Prediction dicts in the published prediction_pipeline format"""
+    rng = np.random.default_rng(seed)
+    predictions = []
+    for i, (home, away) in enumerate(synthetic_fixtures(n, seed)):
+        home_p = float(rng.uniform(0.2, 0.8))
+        predictions.append({
+            'match_id': f"bench_{i}",
+            'home_team': home,
+            'away_team': away,
+            'kickoff': '15:00',
+            'league': 'Premier League',
+            'prediction': 'Home Win' if home_p >= 0.5 else 'Away Win',
+            'confidence': round(max(home_p, 1 - home_p), 3),
+            'suggested_odds': {'home': round(1 / home_p, 2), 'draw': 3.4, 'away': round(1 / (1 - home_p), 2)},
+            'edge': round(float(rng.normal(4, 6)), 1),
+            'ai_reasoning': [f"{home} home form", f"{away} away goals conceded", 'League position gap'],
+        })
+    return predictions
+
+
+# ---- benchmarks ---------------------------------------------------------
+
+@benchmark('features')
+def bench_features(args):
+    from prediction_pipeline import LiveFeatureEngineer
+
+    for n in args.sizes:
+        standings, recent_matches = synthetic_league(n)
+        engineer = LiveFeatureEngineer.from_data(standings, recent_matches)
+        yield f"compute_team_stats/{n}", engineer._compute_team_stats, n
+
+        fixtures = synthetic_fixtures(n)
+        rows = np.empty((n, len(engineer.engineer_features(*fixtures[0]))), dtype=np.float32)
+
+        def build_rows(engineer=engineer, fixtures=fixtures, rows=rows):
+            for i, (home_team, away_team) in enumerate(fixtures):
+                engineer.engineer_features(home_team, away_team, out=rows[i])
+
+        yield f"engineer_features/{n}", build_rows, n
+
+
+@benchmark('predict')
+def bench_predict(args):
+    from prediction_pipeline import LiveFeatureEngineer, PredictionGenerator
+
+    if not args.model.exists():
+        logger.warning(f"⚠️ No model at {args.model}, skipping predict_batch")
+        return
+    standings, recent_matches = synthetic_league(min(args.sizes))
+    generator = PredictionGenerator(args.model, batch_size=max(BATCH_SIZES),
+                                    feature_engineer=LiveFeatureEngineer.from_data(standings, recent_matches))
+    for batch in BATCH_SIZES:
+        matches = synthetic_fixtures(batch)
+        yield f"predict_batch/{batch}", lambda matches=matches: generator.predict_batch(matches), batch
+
+
+@benchmark('backtest')
+def bench_backtest(args):
+    import pandas as pd
+    backtest_v2 = _load_script('backtest_v2', '05_backtest_v2.py')
+
+    engine = backtest_v2.BatchBacktestEngine.__new__(backtest_v2.BatchBacktestEngine)
+    games = engine.generate_backtest_arrays(args.games, SEED)
+    yield f"generate_backtest_arrays/{args.games}", lambda: engine.generate_backtest_arrays(args.games, SEED), args.games
+
+    rng = np.random.default_rng(SEED)
+    scores = pd.DataFrame({'confidence': rng.uniform(0.3, 0.9, args.games),
+                           'pick_home': rng.random(args.games) < 0.5})
+    yield (f"confidence_filter/{args.games}",
+           lambda: backtest_v2.BatchBacktestEngine.confidence_filter(games, scores, 0.65), args.games)
+
+    model_v2 = BASE_DIR / 'models' / 'ensemble_model_v2.pkl'
+    if model_v2.exists():
+        full = backtest_v2.BatchBacktestEngine(str(model_v2), str(BASE_DIR / 'models' / 'ensemble_model.pkl'))
+
+        def run_backtest():
+            full.v2_results, full.baseline_results = [], []
+            full.backtest(num_games=args.games, seed=SEED)
+
+        yield f"batch_backtest/{args.games}", run_backtest, args.games
+    else:
+        logger.warning(f"⚠️ No model at {model_v2}, skipping the full batch backtest")
+
+
+@benchmark('sweep')
+def bench_sweep(args):
+    threshold_test = _load_script('threshold_test', '05b_threshold_test.py')
+
+    n_conf, n_edge = SWEEP_GRID
+    conf_t, edge_t = np.linspace(0.50, 0.89, n_conf), np.linspace(-10, 14, n_edge)
+    for n in args.sizes:
+        rng = np.random.default_rng(SEED)
+        confidence = rng.uniform(0.45, 0.95, n)
+        sweep = threshold_test.ThresholdSweep(confidence, (confidence - rng.uniform(0.4, 0.7, n)) * 100,
+                                              rng.random(n) < confidence)
+        yield f"threshold_sweep_{n_conf}x{n_edge}/{n}", lambda sweep=sweep: sweep.sweep(conf_t, edge_t), n
+
+
+@benchmark('telegram')
+def bench_telegram(args):
+    sys.path.insert(0, str(BASE_DIR / 'backend'))
+    from services.telegram_bot import KickLabTelegramBot
+
+    # Formatting needs no bot connection: skip __init__ (which requires a token)
+    bot = KickLabTelegramBot.__new__(KickLabTelegramBot)
+    date = datetime(2025, 1, 1)
+    for n in (10, 100):
+        predictions = synthetic_predictions(n)
+        yield f"format_daily_picks/{n}", lambda p=predictions: bot._format_daily_picks(p, date), n
+
+
+@contextmanager
+def temp_database(prefix='kicklab_bench_'):
+    """Point DATABASE_URL at a throwaway SQLite file; restore it and remove the file afterwards"""
+    db_dir = tempfile.mkdtemp(prefix=prefix)
+    previous = os.environ.get('DATABASE_URL')
+    os.environ['DATABASE_URL'] = f"sqlite:///{Path(db_dir) / 'bench.db'}"
+    try:
+        yield db_dir
+    finally:
+        if previous is None:
+            os.environ.pop('DATABASE_URL', None)
+        else:
+            os.environ['DATABASE_URL'] = previous
+        shutil.rmtree(db_dir, ignore_errors=True)
+
+
+@benchmark('api')
+def bench_api(args):
+    with temp_database():
+        sys.path.insert(0, str(BASE_DIR / 'backend'))
+        from app import Prediction, app, db
+
+        rng = np.random.default_rng(SEED)
+        outcomes = np.array(['Home', 'Draw', 'Away'])
+        leagues = np.array(['EPL', 'LaLiga', 'SerieA'])
+        with app.app_context():
+            db.create_all()
+            if Prediction.query.count() == 0:
+                start = datetime(2024, 8, 1)
+                for i, (home, away) in enumerate(synthetic_fixtures(SEEDED_PREDICTIONS)):
+                    db.session.add(Prediction(
+                        match_id=f"bench_{i}", date=start + timedelta(hours=i), home_team=home, away_team=away,
+                        league=str(rng.choice(leagues)), predicted_winner=str(rng.choice(outcomes)),
+                        confidence=float(rng.uniform(50, 90)), expected_value=float(rng.normal(2, 3)),
+                        home_win_prob=0.45, draw_prob=0.27, away_win_prob=0.28,
+                        home_odds=2.1, draw_odds=3.4, away_odds=3.6,
+                        actual_result=str(rng.choice(np.append(outcomes, 'Pending'))),
+                    ))
+                db.session.commit()
+
+        client = app.test_client()
+
+        def get_stats():
+            response = client.get('/api/stats')
+            assert response.status_code == 200, response.status_code
+
+        yield f"api_stats/{SEEDED_PREDICTIONS}", get_stats, 1
+
+
+# ---- history / comparison -----------------------------------------------
+
+def load_history(path=HISTORY_PATH):
+    if not Path(path).exists():
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_history(history, path=HISTORY_PATH, max_runs=MAX_HISTORY):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix('.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(history[-max_runs:], f, indent=2)
+    tmp.replace(path)
+
+
+def compare(run, history, history_runs=HISTORY_RUNS):
+    """
+    Each case's median vs the median of its last `history_runs` recorded medians
+    Returns: {case: {'baseline_s', 'ratio', 'status'}}
+    """
+    comparison = {}
+    for case, result in run['results'].items():
+        previous = [r['results'][case]['median_s'] for r in history if case in r.get('results', {})]
+        if not previous:
+            comparison[case] = {'baseline_s': None, 'ratio': None, 'status': 'new'}
+            continue
+        baseline = statistics.median(previous[-history_runs:])
+        ratio = result['median_s'] / baseline if baseline else None
+        if ratio is None:
+            status = 'new'
+        elif ratio > REGRESSION_FACTOR:
+            status = 'regression'
+        elif ratio < IMPROVEMENT_FACTOR:
+            status = 'faster'
+        else:
+            status = 'ok'
+        comparison[case] = {'baseline_s': baseline, 'ratio': ratio, 'status': status}
+    return comparison
+
+
+def print_report(run, comparison):
+    print(f"\n⏱️  BENCHMARKS ({run['started_at'][:19]}, Python {run['python']})")
+    print("-" * 96)
+    print(f"{'Case':<42} {'Median':>11} {'Min':>11} {'Items/s':>13} {'Baseline':>11} {'Ratio':>6}")
+    print("-" * 96)
+    for case, r in run['results'].items():
+        c = comparison[case]
+        baseline = f"{c['baseline_s'] * 1000:>9.2f}ms" if c['baseline_s'] else f"{'-':>11}"
+        ratio = f"{c['ratio']:>5.2f}x" if c['ratio'] else f"{'-':>6}"
+        flag = {'regression': '  🔴 REGRESSION', 'faster': '  🟢 faster'}.get(c['status'], '')
+        print(f"{case:<42} {r['median_s'] * 1000:>9.2f}ms {r['min_s'] * 1000:>9.2f}ms "
+              f"{r['items_per_s']:>13,.0f} {baseline} {ratio}{flag}")
+    for name, reason in run['skipped'].items():
+        print(f"{name:<42} skipped: {reason}")
+    print("-" * 96)
+    regressions = [case for case, c in comparison.items() if c['status'] == 'regression']
+    if regressions:
+        print(f"🔴 {len(regressions)} case(s) slower than {REGRESSION_FACTOR}x their recent median")
+    return regressions
+
+
+def run_benchmarks(args):
+    run = {
+        'started_at': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'results': {},
+        'skipped': {},
+    }
+    previous_level = logging.getLogger().level
+    for name in args.only or BENCHMARKS:
+        logger.info(f"🏁 {name}")
+        try:
+            cases = BENCHMARKS[name](args)
+            # Per-item log lines (team lookups, loaded models) would dominate the timings
+            logging.getLogger().setLevel(logging.WARNING)
+            for case, fn, items in cases:
+                samples = time_case(fn)
+                median = statistics.median(samples)
+                run['results'][case] = {
+                    'median_s': median,
+                    'min_s': min(samples),
+                    'repeats': len(samples),
+                    'items': items,
+                    'items_per_s': items / median if median else 0.0,
+                }
+        except ImportError as e:
+            run['skipped'][name] = f"missing dependency ({e.name})"
+            logger.warning(f"⚠️ Skipping {name}: {e}")
+        finally:
+            logging.getLogger().setLevel(previous_level)
+    return run
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description='Kick Lab performance benchmarks')
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), help='benchmarks to run (default: all)')
+    parser.add_argument('--sizes', nargs='+', type=int, default=list(MATCH_SIZES),
+                        help='synthetic match counts for feature engineering and sweeps')
+    parser.add_argument('--games', type=int, default=BACKTEST_GAMES, help='simulated games for backtest throughput')
+    parser.add_argument('--model', type=Path, default=MODEL_PATH, help='model used for predict_batch')
+    parser.add_argument('--history', type=Path, default=HISTORY_PATH)
+    parser.add_argument('--no-save', action='store_true', help='compare without appending to the history')
+    args = parser.parse_args()
+
+    history = load_history(args.history)
+    run = run_benchmarks(args)
+    regressions = print_report(run, compare(run, history))
+    if not args.no_save:
+        save_history(history + [run], args.history)
+        logger.info(f"💾 Saved benchmark run to {args.history}")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
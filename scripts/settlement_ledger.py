@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Settlement Ledger
+SQLite (WAL) ledger behind the real-time results tracker, keyed by the
+canonical match key ('<Home>-<Away>' with normalized team names):
+  - picks:   one row per (picks file, match), imported when the file changes
+  - results: finished scores with their match date, upserted incrementally
+             (only new/changed scores or a later meeting of the same teams count)
+  - posted:  results already posted to Telegram, per match key and date
+             (replaces posted_state.json)
+Settling touches only the picks of new results (indexed by match key), and only
+against results played on or after the day of the picks file, so a stored score
+from an earlier meeting of the same teams never settles a rematch. The JSON views
+of a picks file are exported only when one of its rows changed.
+
+Usage:
+    python scripts/settlement_ledger.py         # ledger summary
+"""
+
+import json
+import logging
+import re
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = BASE_DIR / 'data' / 'results'
+LEDGER_PATH = RESULTS_DIR / 'ledger.db'
+LEGACY_STATE_FILE = RESULTS_DIR / 'posted_state.json'
+
+# Fields written into the exported picks; stripped before storing the pick itself
+SETTLEMENT_FIELDS = ('result', 'score', 'correct', 'settled')
+RESULT_FIELDS = ('home_goals', 'away_goals', 'result', 'score', 'home', 'away', 'match_date')
+SOURCE_DATE = re.compile(r'(\d{4}-\d{2}-\d{2})')   # picks_2026-02-21.json -> 2026-02-21
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS picks (
+    source TEXT NOT NULL,
+    match_key TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    prediction TEXT,
+    pick TEXT NOT NULL,
+    settled INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    score TEXT,
+    correct INTEGER,
+    settled_at TEXT,
+    PRIMARY KEY (source, match_key)
+);
+CREATE INDEX IF NOT EXISTS picks_by_match ON picks (match_key, settled);
+CREATE TABLE IF NOT EXISTS results (
+    match_key TEXT PRIMARY KEY,
+    home_goals INTEGER NOT NULL,
+    away_goals INTEGER NOT NULL,
+    result TEXT NOT NULL,
+    score TEXT NOT NULL,
+    home TEXT,
+    away TEXT,
+    updated_at TEXT NOT NULL,
+    match_date TEXT
+);
+CREATE TABLE IF NOT EXISTS posted (
+    match_key TEXT PRIMARY KEY,
+    posted_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sources (
+    source TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+"""
+
+
+def source_date(source):
+    """ISO day a picks file was generated, from its name (None when the name has no date)"""
+    found = SOURCE_DATE.search(source)
+    return found.group(1) if found else None
+
+
+def posted_key(match_key, match_date=None):
+    return f"{match_key}@{match_date}" if match_date else match_key
+
+
+def _file_signature(path):
+    stat = Path(path).stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+class SettlementLedger:
+    """Indexed picks / results / posted state with change-driven JSON exports"""
+
+    def __init__(self, path=LEDGER_PATH, legacy_state=LEGACY_STATE_FILE):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+            columns = {row['name'] for row in conn.execute('PRAGMA table_info(results)')}
+            if 'match_date' not in columns:
+                # Ledgers created before results were dated: undated rows settle nothing
+                conn.execute('ALTER TABLE results ADD COLUMN match_date TEXT')
+        self._import_legacy_state(legacy_state)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def _import_legacy_state(self, legacy_state):
+        """One-off migration of posted_state.json into the posted table"""
+        if legacy_state is None or not Path(legacy_state).exists():
+            return
+        with self._connect() as conn:
+            if conn.execute('SELECT 1 FROM posted LIMIT 1').fetchone():
+                return
+            with open(legacy_state) as f:
+                keys = json.load(f).get('posted', [])
+            now = datetime.utcnow().isoformat()
+            conn.executemany('INSERT OR IGNORE INTO posted VALUES (?, ?)', [(key, now) for key in keys])
+        logger.info(f"📥 Imported {len(keys)} posted results from {legacy_state}")
+
+    # ---- picks ---------------------------------------------------------
+
+    def sync_picks(self, source_path, predictions, match_key):
+        """
+        Import a picks file when it changed since the last import/export.
+        match_key: pick -> canonical match key
+        Returns: set of match keys whose pick row was added or changed
+        """
+        source_path = Path(source_path)
+        source = source_path.name
+        signature = _file_signature(source_path)
+        with self._connect() as conn:
+            row = conn.execute('SELECT mtime_ns, size FROM sources WHERE source = ?', (source,)).fetchone()
+            if row and (row['mtime_ns'], row['size']) == signature:
+                return set()
+
+            changed = set()
+            for position, pick in enumerate(predictions):
+                key = match_key(pick)
+                stored = {k: v for k, v in pick.items() if k not in SETTLEMENT_FIELDS}
+                before = conn.total_changes
+                conn.execute(
+                    'INSERT INTO picks (source, match_key, position, prediction, pick) VALUES (?, ?, ?, ?, ?) '
+                    'ON CONFLICT (source, match_key) DO UPDATE SET position = excluded.position, '
+                    'prediction = excluded.prediction, pick = excluded.pick '
+                    'WHERE picks.pick != excluded.pick OR picks.position != excluded.position',
+                    (source, key, position, pick.get('prediction'), json.dumps(stored)),
+                )
+                if pick.get('settled') and pick.get('result'):
+                    # Settled by an earlier tracker version: keep that settlement
+                    conn.execute(
+                        'UPDATE picks SET settled = 1, result = ?, score = ?, correct = ?, settled_at = ? '
+                        'WHERE source = ? AND match_key = ? AND settled = 0',
+                        (pick['result'], pick.get('score'), int(bool(pick.get('correct'))),
+                         datetime.utcnow().isoformat(), source, key),
+                    )
+                if conn.total_changes != before:
+                    changed.add(key)
+            conn.execute('INSERT OR REPLACE INTO sources VALUES (?, ?, ?)', (source, *signature))
+        if changed:
+            logger.info(f"📥 {len(changed)} new/changed picks from {source}")
+        return changed
+
+    # ---- results / settlement ------------------------------------------
+
+    def upsert_results(self, finished):
+        """
+        Store finished matches ({match_key: result dict with 'match_date'}); the row of a
+        match key always holds its latest meeting, and unchanged scores are no-ops.
+        Returns: set of match keys that are new, whose score changed or that were played again
+        """
+        changed = set()
+        now = datetime.utcnow().isoformat()
+        with self._connect() as conn:
+            for key, r in finished.items():
+                before = conn.total_changes
+                conn.execute(
+                    'INSERT INTO results (match_key, home_goals, away_goals, result, score, home, away, '
+                    'updated_at, match_date) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) '
+                    'ON CONFLICT (match_key) DO UPDATE SET home_goals = excluded.home_goals, '
+                    'away_goals = excluded.away_goals, result = excluded.result, score = excluded.score, '
+                    'updated_at = excluded.updated_at, match_date = excluded.match_date '
+                    'WHERE results.score != excluded.score OR results.match_date IS NOT excluded.match_date',
+                    (key, r['home_goals'], r['away_goals'], r['result'], r['score'],
+                     r.get('home'), r.get('away'), now, r.get('match_date')),
+                )
+                if conn.total_changes != before:
+                    changed.add(key)
+        return changed
+
+    def settle(self, match_keys):
+        """
+        Settle the unsettled picks of the given matches against stored results played
+        on or after the picks file's day (an older score is a previous meeting)
+        Returns: list of (source, pick, result_data, correct, match_key) for newly settled picks
+        """
+        if not match_keys:
+            return []
+        keys = sorted(match_keys)
+        placeholders = ','.join('?' * len(keys))
+        now = datetime.utcnow().isoformat()
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT p.source, p.match_key, p.prediction, p.pick, r.* FROM picks p "
+                f"JOIN results r ON r.match_key = p.match_key "
+                f"WHERE p.match_key IN ({placeholders}) AND p.settled = 0 ORDER BY p.source, p.position",
+                keys,
+            ).fetchall()
+            settled = []
+            for row in rows:
+                picked_on = source_date(row['source'])
+                if row['match_date'] is None or (picked_on and row['match_date'] < picked_on):
+                    continue
+                correct = row['result'] == row['prediction']
+                conn.execute(
+                    'UPDATE picks SET settled = 1, result = ?, score = ?, correct = ?, settled_at = ? '
+                    'WHERE source = ? AND match_key = ?',
+                    (row['result'], row['score'], int(correct), now, row['source'], row['match_key']),
+                )
+                result_data = {field: row[field] for field in RESULT_FIELDS}
+                settled.append((row['source'], json.loads(row['pick']), result_data, correct, row['match_key']))
+        return settled
+
+    # ---- posted state --------------------------------------------------
+
+    def is_posted(self, match_key, match_date=None):
+        with self._connect() as conn:
+            return conn.execute('SELECT 1 FROM posted WHERE match_key = ?',
+                                (posted_key(match_key, match_date),)).fetchone() is not None
+
+    def mark_posted(self, match_key, match_date=None):
+        with self._connect() as conn:
+            conn.execute('INSERT OR IGNORE INTO posted VALUES (?, ?)',
+                         (posted_key(match_key, match_date), datetime.utcnow().isoformat()))
+
+    def posted_count(self):
+        with self._connect() as conn:
+            return conn.execute('SELECT COUNT(*) FROM posted').fetchone()[0]
+
+    # ---- views ---------------------------------------------------------
+
+    def picks_view(self, source):
+        """Picks of one file in file order, with settlement fields as the tracker has always written them"""
+        with self._connect() as conn:
+            rows = conn.execute('SELECT * FROM picks WHERE source = ? ORDER BY position', (source,)).fetchall()
+        view = []
+        for row in rows:
+            pick = json.loads(row['pick'])
+            if row['settled']:
+                pick.update({'result': row['result'], 'score': row['score'],
+                             'correct': bool(row['correct']), 'settled': True})
+            view.append(pick)
+        return view
+
+    def record(self, source):
+        """(wins, settled) for one picks file"""
+        with self._connect() as conn:
+            row = conn.execute('SELECT COALESCE(SUM(correct), 0), COUNT(*) FROM picks '
+                               'WHERE source = ? AND settled = 1', (source,)).fetchone()
+        return int(row[0]), int(row[1])
+
+    def mark_exported(self, source_path):
+        """Remember the exported file's signature so the next sync does not re-import it"""
+        source_path = Path(source_path)
+        with self._connect() as conn:
+            conn.execute('INSERT OR REPLACE INTO sources VALUES (?, ?, ?)',
+                         (source_path.name, *_file_signature(source_path)))
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    ledger = SettlementLedger()
+    with ledger._connect() as conn:
+        sources = conn.execute('SELECT source, COUNT(*) AS picks, SUM(settled) AS settled, SUM(correct) AS wins '
+                               'FROM picks GROUP BY source ORDER BY source').fetchall()
+        results = conn.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+    print(f"\n📒 SETTLEMENT LEDGER ({ledger.path})")
+    print("-" * 60)
+    for row in sources:
+        print(f"  {row['source']:<28} {row['picks']:>4} picks  {row['settled'] or 0:>4} settled  {row['wins'] or 0:>4} won")
+    print(f"  {results} results stored, {ledger.posted_count()} posted")
+    print("-" * 60)
+
+
+if __name__ == '__main__':
+    main()
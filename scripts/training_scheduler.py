@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+"""
+Parallel Ensemble Training Scheduler
+Trains ensemble members concurrently (see execution.py for backends) and splits the
+core budget between them according to measured thread scaling, instead of
+fitting each member one after another with n_jobs=-1.
+With a DatasetCache, XGBoost and CatBoost members train natively on the cached
+binary datasets of the fit/validation split (DMatrix / quantized Pool) and are
+handed back as the usual sklearn estimators; the construction time saved is logged.
+
+Usage:
+    python scripts/training_scheduler.py --benchmark   # sequential vs scheduled wall clock
+"""
+
+import argparse
+import hashlib
+import importlib.util
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from dataset_cache import load_cat, load_xgb
+from execution import BACKENDS, get_backend
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+PROFILE_PATH = BASE_DIR / "models" / "training_scaling_profile.json"
+BENCHMARK_PATH = BASE_DIR / "logs" / "training_scheduler_benchmark.json"
+
+# Constructor argument that controls threading, per estimator class
+THREAD_PARAMS = {
+    'XGBClassifier': 'n_jobs',
+    'LGBMClassifier': 'n_jobs',
+    'RandomForestClassifier': 'n_jobs',
+    'CatBoostClassifier': 'thread_count',
+}
+
+PROBE_ROWS = 2000   # rows used to measure per-member thread scaling
+
+# Members that can train from cached binary datasets (others build from the arrays)
+CACHED_FIT_ESTIMATORS = ('XGBClassifier', 'CatBoostClassifier')
+
+EARLY_STOPPING_ROUNDS = 30      # rounds without validation improvement before stopping
+VALIDATION_FRACTION = 0.15      # most recent training rows used to monitor boosters
+
+
+def member_spec(estimator_cls, **params):
+    """Describe one ensemble member: estimator class + constructor params (thread param is set by the scheduler)"""
+    return {'estimator': estimator_cls, 'params': params}
+
+
+def profile_key(name, spec):
+    """Scaling-profile key: member name, estimator class and a hash of its params"""
+    params = json.dumps(spec['params'], sort_keys=True, default=str)
+    return f"{name}:{spec['estimator'].__name__}:{hashlib.sha1(params.encode()).hexdigest()[:8]}"
+
+
+def time_ordered_validation(n_rows, dates=None, fraction=VALIDATION_FRACTION):
+    """
+    Positions of the fitting rows and of the most recent `fraction` of rows
+    (by date when given, else by row order) used as the early-stopping slice.
+    Undated rows (NaT) always stay with the fitting rows.
+    """
+    undated = np.arange(0)
+    if dates is None:
+        order = np.arange(n_rows)
+    else:
+        dates = np.asarray(dates, dtype='datetime64[ns]')
+        dated = ~np.isnat(dates)
+        undated = np.flatnonzero(~dated)
+        order = np.flatnonzero(dated)[np.argsort(dates[dated], kind='stable')]
+    n_valid = int(len(order) * fraction)
+    if n_valid < 1 or n_rows - n_valid < 1:
+        return np.arange(n_rows), order[:0]
+    return np.sort(np.concatenate([order[:-n_valid], undated])), np.sort(order[-n_valid:])
+
+
+def _early_stopping(estimator_name, X_valid, y_valid):
+    """Constructor overrides and fit kwargs that enable early stopping for a booster"""
+    if estimator_name == 'XGBClassifier':
+        return {'early_stopping_rounds': EARLY_STOPPING_ROUNDS}, {'eval_set': [(X_valid, y_valid)], 'verbose': False}
+    if estimator_name == 'LGBMClassifier':
+        import lightgbm as lgb
+        return {}, {'eval_set': [(X_valid, y_valid)],
+                    'callbacks': [lgb.early_stopping(EARLY_STOPPING_ROUNDS, verbose=False)]}
+    if estimator_name == 'CatBoostClassifier':
+        return {}, {'eval_set': (X_valid, y_valid), 'early_stopping_rounds': EARLY_STOPPING_ROUNDS,
+                    'use_best_model': True}
+    return None
+
+
+def best_iteration(model):
+    """Number of trees to use at inference after early stopping (None = all)"""
+    model_type = type(model).__name__
+    if model_type == 'XGBClassifier':
+        best = getattr(model, 'best_iteration', None)
+        return int(best) + 1 if best is not None else None
+    if model_type == 'LGBMClassifier':
+        return int(model.best_iteration_) or None
+    if model_type == 'CatBoostClassifier':
+        best = model.get_best_iteration()
+        return int(best) + 1 if best is not None else None
+    return None
+
+
+def cached_split(dataset_cache, X, y, X_valid=None, y_valid=None):
+    """Materialize fitting rows (+ validation rows) as cached booster datasets; returns the paths"""
+    if X_valid is None:
+        X_valid, y_valid = X[:0], y[:0]
+    X_all = np.ascontiguousarray(np.concatenate([X, X_valid]), dtype=np.float64)
+    y_all = np.concatenate([np.asarray(y), np.asarray(y_valid)]).astype(int)
+    return dataset_cache.materialize(X_all, y_all, np.arange(len(X)), np.arange(len(X), len(X_all)))
+
+
+def _fit_from_cache(estimator_cls, params, split, X_valid=None, y_valid=None):
+    """
+    Fit from the cached binary dataset instead of re-binning the arrays.
+    Returns: fitted sklearn estimator, or None when the split has no usable dataset
+    """
+    has_valid = X_valid is not None and len(X_valid)
+    if estimator_cls.__name__ == 'XGBClassifier':
+        import xgboost as xgb
+        model = estimator_cls(**params)
+        native = {k: v for k, v in model.get_xgb_params().items() if v is not None}
+        native.setdefault('objective', 'binary:logistic')
+        evals = [(xgb.DMatrix(X_valid, label=y_valid), 'valid')] if has_valid else []
+        booster = xgb.train(native, load_xgb(split), num_boost_round=model.n_estimators, evals=evals,
+                            early_stopping_rounds=EARLY_STOPPING_ROUNDS if has_valid else None,
+                            verbose_eval=False)
+        model.load_model(bytearray(booster.save_raw()))
+        return model
+    if estimator_cls.__name__ == 'CatBoostClassifier':
+        pool = load_cat(split)
+        if pool is None:
+            return None
+        model = estimator_cls(**params)
+        fit_params = {}
+        if has_valid:
+            fit_params = {'eval_set': (X_valid, y_valid), 'early_stopping_rounds': EARLY_STOPPING_ROUNDS,
+                          'use_best_model': True}
+        model.fit(pool, **fit_params)
+        return model
+    return None
+
+
+def _fit_member(name, spec, n_threads, X, y, X_valid=None, y_valid=None, split=None):
+    """
+    Worker: fit one member with an explicit thread budget.
+    With a validation slice, boosters early-stop on it; other members
+    (RandomForest) train on fitting + validation rows together.
+    `split` (cached_split() paths) lets XGBoost / CatBoost train from the cached datasets.
+    """
+    estimator_cls = spec['estimator']
+    params = dict(spec['params'])
+    thread_param = THREAD_PARAMS.get(estimator_cls.__name__)
+    if thread_param:
+        params[thread_param] = n_threads
+
+    if split is not None and estimator_cls.__name__ in CACHED_FIT_ESTIMATORS and not spec.get('fit_params'):
+        start = time.perf_counter()
+        model = _fit_from_cache(estimator_cls, params, split, X_valid, y_valid)
+        if model is not None:
+            return name, model, time.perf_counter() - start
+
+    fit_params = dict(spec.get('fit_params', {}))
+    if X_valid is not None and len(X_valid):
+        stopping = _early_stopping(estimator_cls.__name__, X_valid, y_valid)
+        if stopping is None:
+            X, y = np.concatenate([X, X_valid]), np.concatenate([y, y_valid])
+        else:
+            params.update(stopping[0])
+            fit_params.update(stopping[1])
+
+    start = time.perf_counter()
+    model = estimator_cls(**params)
+    model.fit(X, y, **fit_params)
+    return name, model, time.perf_counter() - start
+
+
+class TrainingScheduler:
+    """Schedules ensemble member training across a process pool with controlled thread budgets"""
+
+    def __init__(self, n_cores=None, profile_path=PROFILE_PATH, backend=None, dataset_cache=None):
+        self.n_cores = n_cores or os.cpu_count() or 1
+        self.backend = backend
+        self.dataset_cache = dataset_cache
+        self.profile_path = Path(profile_path)
+        self.profile = self._load_profile()
+        self.last_timings = {}
+        self.best_iterations = {}
+        self.dataset_stats = None
+
+    def _load_profile(self):
+        if self.profile_path.exists():
+            try:
+                with open(self.profile_path) as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                logger.warning(f"⚠️ Ignoring unreadable scaling profile {self.profile_path}")
+        return {}
+
+    def _save_profile(self):
+        self.profile_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.profile_path, 'w') as f:
+            json.dump(self.profile, f, indent=2)
+
+    def measure_scaling(self, specs, X, y, remeasure=False):
+        """
+        Fit each member on a probe subset at 1 thread and at k threads.
+        Stores serial time per row and the Amdahl parallel fraction p, where
+        speedup(k) = 1 / ((1 - p) + p / k).
+        Returns: the specs whose probe fit succeeded (a failing member is logged and dropped)
+        """
+        k = min(4, self.n_cores)
+        n_probe = min(PROBE_ROWS, len(X))
+        X_probe, y_probe = X[:n_probe], y[:n_probe]
+
+        usable = {}
+        for name, spec in specs.items():
+            key = profile_key(name, spec)
+            entry = self.profile.get(key)
+            if entry and entry['probe_rows'] == n_probe and not remeasure:
+                usable[name] = spec
+                continue
+
+            try:
+                _, _, t1 = _fit_member(name, spec, 1, X_probe, y_probe)
+                tk = _fit_member(name, spec, k, X_probe, y_probe)[2] if k > 1 else None
+            except Exception as e:
+                logger.error(f"{name} failed on the scaling probe, skipping it: {e}")
+                continue
+            usable[name] = spec
+            if tk is not None:
+                speedup = max(t1 / max(tk, 1e-9), 1.0)
+                parallel_fraction = min(max((1 - 1 / speedup) / (1 - 1 / k), 0.0), 1.0)
+            else:
+                speedup, parallel_fraction = 1.0, 0.0
+
+            self.profile[key] = {
+                'serial_s_per_row': t1 / n_probe,
+                'parallel_fraction': parallel_fraction,
+                'measured_speedup': speedup,
+                'measured_threads': k,
+                'probe_rows': n_probe,
+            }
+            logger.info(f"  📏 {name}: {t1:.2f}s serial on {n_probe} rows, "
+                        f"{speedup:.2f}x at {k} threads (p={parallel_fraction:.2f})")
+
+        self._save_profile()
+        return usable
+
+    def _predicted_time(self, key, n_rows, threads):
+        entry = self.profile[key]
+        serial = entry['serial_s_per_row'] * n_rows
+        p = entry['parallel_fraction']
+        return serial * ((1 - p) + p / threads)
+
+    def allocate_threads(self, specs, n_rows):
+        """
+        Split the core budget to minimise the slowest member's predicted time:
+        every member starts with one core, then each spare core goes to the
+        current bottleneck as long as it actually shortens it.
+        """
+        keys = {name: profile_key(name, spec) for name, spec in specs.items()}
+        threads = {name: 1 for name in specs}
+        spare = max(self.n_cores - len(specs), 0)
+
+        while spare > 0:
+            bottleneck = max(threads, key=lambda n: self._predicted_time(keys[n], n_rows, threads[n]))
+            current = self._predicted_time(keys[bottleneck], n_rows, threads[bottleneck])
+            improved = self._predicted_time(keys[bottleneck], n_rows, threads[bottleneck] + 1)
+            if improved >= current * 0.99:
+                break  # bottleneck no longer scales; extra cores would only oversubscribe
+            threads[bottleneck] += 1
+            spare -= 1
+
+        return threads
+
+    def train(self, specs, X, y, X_valid=None, y_valid=None):
+        """
+        Train all members concurrently.
+        With X_valid/y_valid, boosters early-stop on that (time-ordered) slice and
+        their best iteration counts are kept in self.best_iterations.
+        Returns: dict name -> fitted model (same keys/order as specs; failed members omitted)
+        """
+        X = np.ascontiguousarray(X)
+        y = np.asarray(y)
+        if X_valid is not None:
+            X_valid = np.ascontiguousarray(X_valid)
+            y_valid = np.asarray(y_valid)
+        specs = self.measure_scaling(specs, X, y)
+        if not specs:
+            return {}
+        threads = self.allocate_threads(specs, len(X))
+        logger.info(f"🧵 Core budget {self.n_cores}: " + ', '.join(f"{n}={t}" for n, t in threads.items()))
+
+        fitted = {}
+        self.last_timings = {}
+        self.best_iterations = {}
+        backend = self.backend or get_backend(max_workers=len(specs))
+        try:
+            # Cached dataset files only help workers that can read this host's disk
+            split = None
+            if self.dataset_cache is not None and backend.shared_filesystem:
+                split = cached_split(self.dataset_cache, X, y, X_valid, y_valid)
+                self.dataset_stats = self.dataset_cache.report('training datasets')
+            # Training data goes into the object store once, not once per member
+            data = [backend.put(a) if a is not None else None for a in (X, y, X_valid, y_valid)]
+            futures = {backend.submit(_fit_member, name, spec, threads[name], *data, split): name
+                       for name, spec in specs.items()}
+            for future in backend.as_completed(futures):
+                name = futures[future]
+                try:
+                    _, model, elapsed = backend.result(future)
+                except Exception as e:
+                    logger.error(f"{name} failed: {e}")
+                    continue
+                fitted[name] = model
+                self.last_timings[name] = elapsed
+                best = best_iteration(model) if X_valid is not None else None
+                if best:
+                    self.best_iterations[name] = best
+                logger.info(f"  ✅ {name} trained in {elapsed:.1f}s ({threads[name]} threads)"
+                            + (f", best iteration {best}" if best else ''))
+        finally:
+            if self.backend is None:
+                backend.shutdown()
+
+        return {name: fitted[name] for name in specs if name in fitted}
+
+    def train_sequential(self, specs, X, y):
+        """Legacy behaviour: one member at a time, each using every core"""
+        fitted = {}
+        for name, spec in specs.items():
+            _, fitted[name], _ = _fit_member(name, spec, self.n_cores, X, y)
+        return fitted
+
+    def benchmark(self, specs, X, y, path=BENCHMARK_PATH):
+        """Wall-clock comparison of sequential vs scheduled training (saved to path)"""
+        X = np.ascontiguousarray(X)
+        y = np.asarray(y)
+        specs = self.measure_scaling(specs, X, y)
+
+        start = time.perf_counter()
+        self.train_sequential(specs, X, y)
+        sequential_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        self.train(specs, X, y)
+        scheduled_s = time.perf_counter() - start
+
+        print("\nTraining wall clock:")
+        print("-" * 50)
+        print(f"  Cores:       {self.n_cores}")
+        print(f"  Rows:        {len(X)}")
+        print(f"  Sequential:  {sequential_s:.1f}s")
+        print(f"  Scheduled:   {scheduled_s:.1f}s")
+        print(f"  Speed-up:    {sequential_s / scheduled_s:.2f}x")
+        print("-" * 50)
+        result = {'timestamp': datetime.now().isoformat(), 'cores': self.n_cores, 'rows': len(X),
+                  'sequential_s': sequential_s, 'scheduled_s': scheduled_s, 'speedup': sequential_s / scheduled_s}
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(result, f, indent=2)
+        logger.info(f"💾 Saved benchmark to {path}")
+        return result
+
+
+def _load_trainer_module():
+    """Import 04_train_models_v2.py (numeric module names need importlib)"""
+    path = Path(__file__).resolve().parent / "04_train_models_v2.py"
+    spec = importlib.util.spec_from_file_location("train_models_v2", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Parallel ensemble training scheduler')
+    parser.add_argument('--benchmark', action='store_true', help='compare sequential vs scheduled training')
+    parser.add_argument('--cores', type=int, default=None, help='core budget (default: all)')
+    parser.add_argument('--remeasure', action='store_true', help='re-probe member thread scaling')
+    parser.add_argument('--backend', choices=BACKENDS, default=None, help='execution backend (default: process)')
+    parser.add_argument('--address', default=None, help='Dask scheduler / Ray cluster address')
+    args = parser.parse_args()
+
+    trainer = _load_trainer_module().EnhancedModelTrainer()
+    X, y, _ = trainer.load_features()
+    trainer.split_data(X, y)
+    specs = trainer.member_specs()
+
+    with get_backend(args.backend, len(specs), args.address) as backend:
+        scheduler = TrainingScheduler(n_cores=args.cores, backend=backend)
+        if args.remeasure:
+            scheduler.measure_scaling(specs, trainer.X_train, trainer.y_train, remeasure=True)
+        if args.benchmark:
+            scheduler.benchmark(specs, trainer.X_train, trainer.y_train)
+        else:
+            scheduler.train(specs, trainer.X_train, trainer.y_train)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Walk-Forward Cross-Validation
+Time-ordered evaluation of the ensemble members: every fold trains on matches
+played before its test period (expanding or sliding window by season or
+matchweek). Fold datasets are materialized once as binary booster files,
+folds x members are evaluated in parallel processes, and out-of-fold
+predictions are written to parquet for stacking and calibration.
+
+Usage:
+    python scripts/walk_forward_cv.py --unit season --window expanding
+    python scripts/walk_forward_cv.py --unit matchweek --window sliding --train-periods 30 --folds 8
+"""
+
+import argparse
+import importlib.util
+import json
+import logging
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import accuracy_score, brier_score_loss, log_loss
+
+from dataset_cache import DatasetCache, array, load_cat, load_lgb, load_split, load_xgb
+from execution import BACKENDS, get_backend
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+OOF_PATH = BASE_DIR / "models" / "oof_predictions.parquet"
+CV_REPORT_PATH = BASE_DIR / "models" / "walk_forward_cv.json"
+
+SEASON_START_MONTH = 7      # European seasons run Aug-May; July belongs to the new season
+
+
+def period_labels(dates, unit='season'):
+    """Ordinal period per match: football season (e.g. 2024 = 2024/25) or Monday-start matchweek"""
+    dates = pd.to_datetime(pd.Series(dates), errors='coerce')
+    if unit == 'season':
+        labels = dates.dt.year - (dates.dt.month < SEASON_START_MONTH).astype(int)
+    elif unit == 'matchweek':
+        labels = (dates - pd.Timestamp('1970-01-05')).dt.days // 7   # weeks since a Monday
+    else:
+        raise ValueError(f"Unknown period unit: {unit}")
+    return labels.to_numpy()
+
+
+def walk_forward_folds(periods, n_folds=5, window='expanding', train_periods=None, min_train_periods=1):
+    """
+    Split row indices into time-ordered folds.
+    Each of the last n_folds periods is a test set; its training set is every
+    earlier period (expanding) or the train_periods periods just before it (sliding).
+    Returns: list of (test_period, train_idx, test_idx)
+    """
+    if window not in ('expanding', 'sliding'):
+        raise ValueError(f"Unknown window: {window}")
+    if window == 'sliding' and not train_periods:
+        raise ValueError("sliding window needs train_periods")
+
+    periods = np.asarray(periods)
+    valid = ~pd.isna(periods)
+    ordered = np.unique(periods[valid])
+    test_periods = ordered[max(min_train_periods, len(ordered) - n_folds):]
+
+    folds = []
+    for test_period in test_periods:
+        position = np.searchsorted(ordered, test_period)
+        first = max(0, position - train_periods) if window == 'sliding' else 0
+        train_mask = valid & np.isin(periods, ordered[first:position])
+        test_mask = valid & (periods == test_period)
+        if train_mask.any() and test_mask.any():
+            folds.append((test_period.item(), np.flatnonzero(train_mask), np.flatnonzero(test_mask)))
+    return folds
+
+
+def _native_params(spec):
+    """Translate a sklearn-style member spec into (booster type, native params, rounds)"""
+    estimator_name = spec['estimator'].__name__
+    params = dict(spec['params'])
+    rounds = params.pop('n_estimators', 100)
+    if estimator_name == 'XGBClassifier':
+        native = spec['estimator'](**params).get_xgb_params()
+        native = {k: v for k, v in native.items() if v is not None}
+        native.setdefault('objective', 'binary:logistic')
+        return 'xgboost', native, rounds
+    if estimator_name == 'LGBMClassifier':
+        params.setdefault('objective', 'binary')
+        return 'lightgbm', params, rounds
+    if estimator_name == 'CatBoostClassifier':
+        params.pop('iterations', None)
+        return 'catboost', params, spec['params'].get('iterations', rounds)
+    return 'sklearn', None, None
+
+
+def _evaluate_member(fold_no, name, spec, split, n_threads):
+    """
+    Worker: train one member on a materialized fold and predict its test period.
+    `split` is the fold's cached file paths, or its arrays when workers are remote.
+    """
+    booster_type, native, rounds = _native_params(spec)
+    X_test = np.asarray(array(split, 'X_test'))
+    cat_pool = load_cat(split) if booster_type == 'catboost' else None
+    start = time.perf_counter()
+
+    if booster_type == 'xgboost':
+        import xgboost as xgb
+        booster = xgb.train({**native, 'nthread': n_threads}, load_xgb(split), num_boost_round=rounds)
+        proba = booster.inplace_predict(X_test)
+    elif booster_type == 'lightgbm':
+        import lightgbm as lgb
+        booster = lgb.train({**native, 'num_threads': n_threads}, load_lgb(split), num_boost_round=rounds)
+        proba = booster.predict(X_test)
+    elif cat_pool is not None:
+        model = spec['estimator'](**native, iterations=rounds, thread_count=n_threads)
+        model.fit(cat_pool)
+        proba = model.predict_proba(X_test)[:, 1]
+    else:
+        from training_scheduler import _fit_member
+        X_train = np.asarray(array(split, 'X_train'))
+        y_train = np.asarray(array(split, 'y_train'))
+        _, model, _ = _fit_member(name, spec, n_threads, X_train, y_train)
+        proba = model.predict_proba(X_test)[:, 1]
+
+    return fold_no, name, np.asarray(proba, dtype=np.float64), time.perf_counter() - start
+
+
+class WalkForwardCV:
+    """Time-aware cross-validation of ensemble members with cached fold datasets"""
+
+    def __init__(self, n_folds=5, unit='season', window='expanding', train_periods=None,
+                 n_workers=None, dataset_cache=None, backend=None):
+        self.n_folds = n_folds
+        self.unit = unit
+        self.window = window
+        self.train_periods = train_periods
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.dataset_cache = dataset_cache or DatasetCache()
+        self.backend = backend
+        self.folds = []
+        self.fold_paths = []
+        self.cache_stats = None
+
+    def split(self, dates):
+        self.folds = walk_forward_folds(period_labels(dates, self.unit), self.n_folds,
+                                        self.window, self.train_periods)
+        return self.folds
+
+    def materialize(self, X, y):
+        """Build (or reuse) the binary datasets for every fold"""
+        start = time.perf_counter()
+        self.fold_paths = [self.dataset_cache.materialize(X, y, train_idx, test_idx)
+                           for _, train_idx, test_idx in self.folds]
+        logger.info(f"📦 {len(self.folds)} fold datasets ready in {time.perf_counter() - start:.1f}s")
+        self.cache_stats = self.dataset_cache.report('walk-forward folds')
+        return self.fold_paths
+
+    def run(self, specs, X, y, dates, weights=None):
+        """
+        Evaluate every member on every fold.
+        Returns: (out-of-fold predictions DataFrame, per-fold/per-member metrics dict)
+        """
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        y = np.asarray(y).astype(int)
+        dates = pd.to_datetime(pd.Series(dates).reset_index(drop=True), errors='coerce')
+
+        if not self.split(dates):
+            raise ValueError(f"No walk-forward folds: need more than one {self.unit} of dated matches")
+        self.materialize(X, y)
+
+        tasks = [(fold_no, name) for fold_no in range(len(self.folds)) for name in specs]
+        backend = self.backend or get_backend(max_workers=min(len(tasks), self.n_workers))
+        threads = max(1, self.n_workers // min(len(tasks), backend.max_workers))
+        logger.info(f"🔁 Walk-forward CV: {len(self.folds)} folds x {len(specs)} members "
+                    f"on {backend.name} backend ({threads} threads per task)")
+
+        # Remote workers get each fold's arrays once through the object store
+        splits = (self.fold_paths if backend.shared_filesystem
+                  else [backend.put(load_split(paths)) for paths in self.fold_paths])
+
+        predictions = {}
+        try:
+            futures = {backend.submit(_evaluate_member, fold_no, name, specs[name], splits[fold_no], threads):
+                       (fold_no, name) for fold_no, name in tasks}
+            for future in backend.as_completed(futures):
+                fold_no, name = futures[future]
+                try:
+                    _, _, proba, elapsed = backend.result(future)
+                except Exception as e:
+                    logger.error(f"Fold {fold_no} {name} failed: {e}")
+                    continue
+                predictions[(fold_no, name)] = proba
+                logger.info(f"  ✅ fold {fold_no} {name} in {elapsed:.1f}s")
+        finally:
+            if self.backend is None:
+                backend.shutdown()
+
+        oof = self._collect(predictions, specs, y, dates, weights)
+        summary = self.summarize(oof, list(specs))
+        summary['dataset_cache'] = self.cache_stats
+        return oof, summary
+
+    def _collect(self, predictions, specs, y, dates, weights):
+        frames = []
+        for fold_no, (test_period, _, test_idx) in enumerate(self.folds):
+            frame = pd.DataFrame({
+                'row': test_idx,
+                'fold': fold_no,
+                'period': test_period,
+                'date': dates.iloc[test_idx].to_numpy(),
+                'home_win': y[test_idx],
+            })
+            for name in specs:
+                frame[name] = predictions.get((fold_no, name), np.nan)
+            frames.append(frame)
+        oof = pd.concat(frames, ignore_index=True)
+
+        members = [name for name in specs if oof[name].notna().any()]
+        member_weights = np.array([(weights or {}).get(name, 1.0) for name in members])
+        member_weights = member_weights / member_weights.sum()
+        oof['ensemble'] = oof[members].to_numpy() @ member_weights
+        return oof
+
+    @staticmethod
+    def _scores(y, proba):
+        proba = np.clip(proba, 1e-6, 1 - 1e-6)
+        return {
+            'n': int(len(y)),
+            'accuracy': float(accuracy_score(y, proba > 0.5)),
+            'log_loss': float(log_loss(y, proba, labels=[0, 1])),
+            'brier': float(brier_score_loss(y, proba)),
+        }
+
+    def summarize(self, oof, members):
+        """Accuracy / log-loss / Brier per fold and overall for each member and the ensemble"""
+        summary = {'unit': self.unit, 'window': self.window, 'folds': {}, 'overall': {}}
+        for column in members + ['ensemble']:
+            scored = oof[oof[column].notna()]
+            if scored.empty:
+                continue
+            summary['overall'][column] = self._scores(scored['home_win'], scored[column])
+            for fold_no, fold in scored.groupby('fold'):
+                summary['folds'].setdefault(str(fold_no), {'period': str(fold['period'].iloc[0])})
+                summary['folds'][str(fold_no)][column] = self._scores(fold['home_win'], fold[column])
+        return summary
+
+    def save(self, oof, summary, oof_path=OOF_PATH, report_path=CV_REPORT_PATH):
+        Path(oof_path).parent.mkdir(parents=True, exist_ok=True)
+        oof.to_parquet(oof_path, index=False)
+        with open(report_path, 'w') as f:
+            json.dump(summary, f, indent=2)
+        logger.info(f"✅ Out-of-fold predictions saved: {oof_path}")
+
+    @staticmethod
+    def print_summary(summary):
+        print(f"\nWalk-forward CV ({summary['window']} window by {summary['unit']}):")
+        print("-" * 60)
+        print(f"{'Model':<15} {'N':>7} {'Accuracy':>10} {'Log-loss':>10} {'Brier':>10}")
+        print("-" * 60)
+        for name, scores in summary['overall'].items():
+            print(f"{name:<15} {scores['n']:>7} {scores['accuracy']:>10.4f} "
+                  f"{scores['log_loss']:>10.4f} {scores['brier']:>10.4f}")
+        print("-" * 60)
+
+
+def _load_trainer_module():
+    """Import 04_train_models_v2.py (numeric module names need importlib)"""
+    path = Path(__file__).resolve().parent / "04_train_models_v2.py"
+    spec = importlib.util.spec_from_file_location("train_models_v2", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Walk-forward cross-validation of the ensemble')
+    parser.add_argument('--folds', type=int, default=5, help='number of test periods')
+    parser.add_argument('--unit', choices=['season', 'matchweek'], default='season')
+    parser.add_argument('--window', choices=['expanding', 'sliding'], default='expanding')
+    parser.add_argument('--train-periods', type=int, default=None, help='sliding window length in periods')
+    parser.add_argument('--workers', type=int, default=None, help='parallel worker processes')
+    parser.add_argument('--backend', choices=BACKENDS, default=None, help='execution backend (default: process)')
+    parser.add_argument('--address', default=None, help='Dask scheduler / Ray cluster address')
+    args = parser.parse_args()
+
+    trainer = _load_trainer_module().EnhancedModelTrainer()
+    X, y, _ = trainer.load_features()
+    if trainer.match_dates is None:
+        raise SystemExit("❌ Feature file has no date column - walk-forward CV needs match dates")
+
+    with get_backend(args.backend, args.workers, args.address) as backend:
+        cv = WalkForwardCV(args.folds, args.unit, args.window, args.train_periods, args.workers, backend=backend)
+        oof, summary = cv.run(trainer.member_specs(), X.to_numpy(), y.to_numpy(), trainer.match_dates)
+    cv.save(oof, summary)
+    cv.print_summary(summary)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""ONNX export parity: the exported graph must reproduce the Python-library ensemble"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+
+np = pytest.importorskip('numpy')
+for module in ('sklearn', 'xgboost', 'lightgbm', 'onnx', 'onnxruntime', 'onnxmltools', 'skl2onnx',
+               'requests', 'dotenv'):
+    pytest.importorskip(module)
+
+from lightgbm import LGBMClassifier  # noqa: E402
+from sklearn.ensemble import RandomForestClassifier  # noqa: E402
+from sklearn.preprocessing import StandardScaler  # noqa: E402
+from xgboost import XGBClassifier  # noqa: E402
+
+import export_onnx  # noqa: E402
+
+ATOL = 1e-3
+N_FEATURES = 12
+
+
+@pytest.fixture(scope='module')
+def ensemble():
+    """Small fitted v5-style bundle: scaler + XGBoost / LightGBM / RandomForest members"""
+    rng = np.random.default_rng(0)
+    X = rng.standard_normal((400, N_FEATURES)) * 3 + 1
+    y = (X[:, 0] - X[:, 1] + rng.standard_normal(400) > 0).astype(int)
+    scaler = StandardScaler().fit(X)
+    X_scaled = scaler.transform(X)
+    models = {
+        'xgboost': XGBClassifier(n_estimators=30, max_depth=3, n_jobs=1).fit(X_scaled, y),
+        'lightgbm': LGBMClassifier(n_estimators=30, num_leaves=8, n_jobs=1, verbose=-1).fit(X_scaled, y),
+        'random_forest': RandomForestClassifier(n_estimators=20, max_depth=5, n_jobs=1, random_state=0).fit(X_scaled, y),
+    }
+    return {
+        'models': models,
+        'weights': {'xgboost': 0.5, 'lightgbm': 0.3, 'random_forest': 0.2},
+        'scaler': scaler,
+        'features': [f"f{i}" for i in range(N_FEATURES)],
+        'version': 'test',
+    }
+
+
+@pytest.fixture(scope='module')
+def session(ensemble, tmp_path_factory):
+    proto = export_onnx.build_ensemble_graph(ensemble)
+    path = tmp_path_factory.mktemp('onnx') / 'ensemble.onnx'
+    path.write_bytes(proto.SerializeToString())
+    return export_onnx.load_onnx_session(path, num_threads=1)
+
+
+def test_probabilities_match_reference(ensemble, session):
+    X = export_onnx._sample_features(ensemble, 500)
+    ref_proba, ref_calibrated = export_onnx.reference_predict(ensemble, X.astype(np.float64))
+    onnx_proba, onnx_calibrated = session.run(
+        [export_onnx.PROBA_OUTPUT, export_onnx.CALIBRATED_OUTPUT], {export_onnx.INPUT_NAME: X}
+    )
+    np.testing.assert_allclose(onnx_proba, ref_proba, atol=ATOL)
+    np.testing.assert_allclose(onnx_calibrated[:, 0], ref_calibrated, atol=ATOL)
+
+
+def test_verify_parity_passes(ensemble, session):
+    report = export_onnx.verify_parity(ensemble, session, n_samples=300, atol=ATOL)
+    assert report['passed']
+    assert report['pick_agreement'] >= 0.99